@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+컨텍스트 수집 시간 측정 스크립트 (순차 build_context vs 동시 조회)
+사용법: python bench_async_context.py [runs] [device_serial]
+예시: python bench_async_context.py 10
+      python bench_async_context.py 20 ESP32-S3-001
+
+config/.env의 PostgreSQL 설정으로 실제 DB를 조회한다 (LLM은 호출하지 않음).
+컨텍스트 캐시를 끄고 같은 컨텍스트(사용자, 디바이스, 센서, 센서 추세, 최근 로그)를 두 방식으로 모은다.
+    1) 순차: DatabaseManager.build_context (예전 wait_run과 같음)
+    2) 동시: ChipiBrain._gather_context (reply / wait_run이 쓰는 방식)
+       - 선택 항목까지 전부 기다린 시간과, 필수 항목(사용자, 디바이스, 센서)만 기다린 시간
+         (= LLM 요청을 시작할 수 있는 시각)
+첫 실행은 스레드별 DB 연결을 여는 시간이 들어가므로 측정에서 뺀다.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.chipi_brain import ChipiBrain
+
+
+class Quiet:
+    """ChipiBrain / DatabaseManager의 진행 로그를 측정 중에는 숨김"""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = io.StringIO()
+
+    def __exit__(self, *exc):
+        sys.stdout = self.stdout
+
+
+def sequential(brain, device_serial):
+    start = time.perf_counter()
+    with Quiet():
+        brain.db_manager.build_context(
+            device_serial, sensor_data=brain.db_manager.get_sensor_data_by_serial(device_serial)
+        )
+    return time.perf_counter() - start
+
+
+def concurrent(brain, device_serial, optional_wait):
+    brain.optional_context_wait = optional_wait
+    start = time.perf_counter()
+    with Quiet():
+        brain._run_sync(brain._gather_context(device_serial, set()))
+    return time.perf_counter() - start
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    device_serial = sys.argv[2] if len(sys.argv) > 2 else os.environ.get("DEVICE_SERIAL")
+
+    brain = ChipiBrain()
+    if not brain.db_manager:
+        raise SystemExit("DB에 연결할 수 없습니다 (config/.env의 DB_* 확인)")
+    if not device_serial:
+        raise SystemExit("device_serial 인자나 DEVICE_SERIAL 환경 변수가 필요합니다")
+    brain.server_url = None
+    brain.db_manager.cache.enabled = False
+
+    # 스레드별 연결 열기 (측정에서 제외)
+    concurrent(brain, device_serial, 10.0)
+
+    results = {"순차": [], "동시 (전체)": [], "동시 (필수만)": []}
+    for _ in range(runs):
+        results["순차"].append(sequential(brain, device_serial))
+        results["동시 (전체)"].append(concurrent(brain, device_serial, 10.0))
+        results["동시 (필수만)"].append(concurrent(brain, device_serial, 0.0))
+        # 필수만 기다린 실행에서 남은 조회가 다음 측정에 겹치지 않도록 기다렸다가 정리
+        time.sleep(0.5)
+        brain._run_sync(asyncio.sleep(0))
+
+    print("=" * 50)
+    print(f"{runs}회, device_serial={device_serial}, 컨텍스트 캐시 끔, 중앙값")
+    print("-" * 50)
+    for name, values in results.items():
+        print(f"{name:<14} {median(values) * 1000:8.1f} ms")
+    saved = median(results["순차"]) - median(results["동시 (필수만)"])
+    print(f"LLM 요청을 먼저 시작할 수 있는 시간: {saved * 1000:.1f} ms")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+두뇌 서버(core/brain_server.py) 동시 디바이스 측정 스크립트
+사용법: python bench_brain_server.py [devices] [turns] [server_url]
+예시: python bench_brain_server.py 8 3
+      python bench_brain_server.py 32 2 http://localhost:8765
+
+server_url이 없으면 이 프로세스 안에서 두뇌 서버를 띄운다 (config/.env 필요, 실제 Azure OpenAI 호출).
+대화 journal은 임시 디렉터리에 쓰고 응답 캐시는 끈다.
+동시 디바이스 수를 1, 2, 4, ... devices로 늘려 가며 디바이스마다 (keep-alive 연결 하나로)
+turns번씩 POST /sessions/{serial}/reply를 보내고
+    - 턴 응답 시간 중앙값 / p95, worker를 기다린 시간 중앙값
+    - 초당 처리한 턴 수, 503(busy) 수
+를 출력한다. 서버를 이 프로세스에서 띄웠으면 세션 수와 최대 RSS도 출력한다.
+"""
+
+import io
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from core import brain_server
+
+UTTERANCES = ("상태 어때?", "좋은 아침!", "오늘 기분 어때?", "물 줄까?")
+
+
+class Quiet:
+    """두뇌 서버 / ChipiBrain의 진행 로그를 측정 중에는 숨김"""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = io.StringIO()
+
+    def __exit__(self, *exc):
+        sys.stdout = self.stdout
+
+
+def device(url, serial, turns, results, token):
+    session = requests.Session()
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    for turn in range(turns):
+        start = time.monotonic()
+        response = session.post(
+            f"{url}/sessions/{serial}/reply",
+            json={"text": UTTERANCES[turn % len(UTTERANCES)]},
+            headers=headers,
+            timeout=120,
+        )
+        elapsed = time.monotonic() - start
+        if response.status_code == 503:
+            results["busy"].append(serial)
+            continue
+        response.raise_for_status()
+        results["turns"].append(elapsed)
+        results["queued"].append(response.json()["queued_ms"] / 1000)
+
+
+def run(url, devices, turns, token):
+    results = {"turns": [], "queued": [], "busy": []}
+    threads = [
+        threading.Thread(
+            target=device, args=(url, f"bench-{i:04d}", turns, results, token)
+        )
+        for i in range(devices)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results["seconds"] = time.monotonic() - start
+    return results
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def start_local_server():
+    """이 프로세스 안에서 두뇌 서버를 띄움. (url, BrainSessions)"""
+    os.environ["BRAIN_SESSION_DIR"] = tempfile.mkdtemp()
+    os.environ["RESPONSE_CACHE"] = "false"
+    workers = int(os.environ.get("BRAIN_WORKERS", str(brain_server.WORKERS)))
+    sessions = brain_server.BrainSessions(
+        brain_server.ChipiBrain(llm_workers=workers), workers=workers
+    )
+    port = 18765
+    threading.Thread(
+        target=brain_server.serve, args=(port, sessions), daemon=True
+    ).start()
+    time.sleep(0.5)
+    return f"http://localhost:{port}", sessions
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    url = sys.argv[3].rstrip("/") if len(sys.argv) > 3 else None
+    token = os.environ.get("BRAIN_SERVER_TOKEN")
+
+    levels = []
+    count = 1
+    while count < devices:
+        levels.append(count)
+        count *= 2
+    levels.append(devices)
+
+    sessions = None
+    with Quiet():
+        if url is None:
+            url, sessions = start_local_server()
+        rows = [(count, run(url, count, turns, token)) for count in levels]
+
+    print("=" * 50)
+    print(f"{url}, 디바이스당 {turns}턴")
+    print("-" * 50)
+    print(f"{'디바이스':>6} {'중앙값':>9} {'p95':>9} {'대기':>8} {'턴/초':>7} {'503':>5}")
+    for count, results in rows:
+        print(
+            f"{count:>8} "
+            f"{percentile(results['turns'], 0.5) * 1000:8.0f}ms "
+            f"{percentile(results['turns'], 0.95) * 1000:8.0f}ms "
+            f"{percentile(results['queued'], 0.5) * 1000:6.0f}ms "
+            f"{len(results['turns']) / results['seconds']:8.2f} "
+            f"{len(results['busy']):>5}"
+        )
+    if sessions is not None:
+        info = sessions.info()
+        # ru_maxrss: Linux는 KB
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print("-" * 50)
+        print(
+            f"세션 {len(info['sessions'])}개, worker {info['workers']}, "
+            f"최대 RSS {rss:.0f} MB"
+        )
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+응답 1턴당 DB 왕복 / 시간 측정 스크립트 (컨텍스트 캐시 끔 vs 켬)
+사용법: python bench_context_cache.py [turns] [device_serial]
+예시: python bench_context_cache.py 20
+      python bench_context_cache.py 50 ESP32-S3-001
+
+config/.env의 PostgreSQL 설정으로 실제 DB를 조회한다 (LLM은 호출하지 않음).
+사용자 질문 하나마다 wait_run이 LLM 요청 전에 하는 일(특별 상황 감지, 사용자 / 센서 조회,
+build_context)을 그대로 실행하고, 그 사이의 DB 왕복 횟수와 시간을 잰다.
+센서 데이터는 서버 캐시(SERVER_URL) 대신 DB에서 읽도록 해서 DB 경로만 측정한다.
+
+1) 캐시 끔 (CONTEXT_CACHE=false와 같음)
+2) 캐시 켬: 첫 턴은 전부 miss, 이후 턴은 TTL 안이면 hit
+"""
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.chipi_brain import ChipiBrain
+
+# 센서 조회가 있는 질문과 없는 질문을 섞음 (실제 대화처럼)
+QUESTIONS = (
+    "안녕 치피",
+    "지금 상태 어때?",
+    "오늘 좀 힘들었어",
+    "온도 알려줘",
+    "물 줄게",
+    "습도는 어때?",
+    "요즘 뭐하고 지냈어?",
+)
+
+
+class Quiet:
+    """ChipiBrain의 진행 로그를 측정 중에는 숨김"""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = io.StringIO()
+
+    def __exit__(self, *exc):
+        sys.stdout = self.stdout
+
+
+def run_turns(brain, turns, device_serial):
+    """턴별 (DB 왕복 횟수, DB ms, 전체 준비 ms)"""
+    results = []
+    for i in range(turns):
+        brain.messages = []
+        brain.add_msg(QUESTIONS[i % len(QUESTIONS)])
+        start = time.perf_counter()
+        with Quiet():
+            brain._prepare_messages("chipi", device_serial)
+        elapsed = time.perf_counter() - start
+        queries, seconds, _, _ = brain.last_db_stats
+        results.append((queries, seconds * 1000, elapsed * 1000))
+    return results
+
+
+def summarize(name, results):
+    queries = [q for q, _, _ in results]
+    db_ms = [ms for _, ms, _ in results]
+    total_ms = [ms for _, _, ms in results]
+    print(
+        f"{name:<8} {sum(queries) / len(queries):8.1f} {sum(db_ms) / len(db_ms):9.1f} "
+        f"{sum(total_ms) / len(total_ms):9.1f}   (첫 턴 {queries[0]}회 {db_ms[0]:.1f} ms)"
+    )
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    device_serial = sys.argv[2] if len(sys.argv) > 2 else os.environ.get("DEVICE_SERIAL")
+
+    brain = ChipiBrain()
+    if not brain.db_manager:
+        raise SystemExit("DB에 연결할 수 없습니다 (config/.env의 DB_* 확인)")
+    if not device_serial:
+        raise SystemExit("device_serial 인자나 DEVICE_SERIAL 환경 변수가 필요합니다")
+    brain.server_url = None
+    brain.save_memory = lambda: None
+    cache = brain.db_manager.cache
+
+    print("=" * 50)
+    print(f"{turns}턴, device_serial={device_serial}, 턴당 평균")
+    print("-" * 50)
+    print(f"{'':<8} {'DB 왕복':>8} {'DB ms':>9} {'준비 ms':>9}")
+    for name, enabled in (("캐시 끔", False), ("캐시 켬", True)):
+        cache.enabled = enabled
+        cache.invalidate()
+        summarize(name, run_turns(brain, turns, device_serial))
+    print(f"캐시 hit {cache.hits} / miss {cache.misses}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
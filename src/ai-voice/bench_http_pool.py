@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+HTTPS 연결 재사용 효과 측정 스크립트 (utils/http_pool.py)
+사용법: python bench_http_pool.py [requests] [url]
+예시: python bench_http_pool.py 10
+      python bench_http_pool.py 20 https://supertoneapi.com/
+
+같은 URL에 HEAD 요청을 requests개(기본 10) 보낸다.
+    1) 기존: 요청마다 requests.head (매번 새 TCP + TLS 연결)
+    2) 연결 풀: http_pool.session().head (첫 요청만 새 연결, 나머지는 keep-alive 재사용)
+    3) 미리 연결: prewarm()으로 연결을 열어 둔 뒤 첫 요청 (말이 시작될 때 여는 것과 같음)
+응답 코드는 상관없다 (연결 시간만 봄). 요청당 시간 중앙값과 http_pool의 턴 요약을 출력한다.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from utils import http_pool
+
+DEFAULT_URL = "https://supertoneapi.com/"
+
+
+def timed(func, url):
+    start = time.perf_counter()
+    func(url, timeout=10)
+    return time.perf_counter() - start
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    url = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_URL
+
+    results = {"기존": [], "연결 풀": []}
+    for _ in range(count):
+        results["기존"].append(timed(requests.head, url))
+
+    http_pool.begin_turn()
+    for _ in range(count):
+        results["연결 풀"].append(timed(http_pool.session().head, url))
+    pooled_report = http_pool.turn_report()
+
+    # 풀을 비우고 미리 연결한 뒤 첫 요청
+    http_pool.session().get_adapter(url).poolmanager.clear()
+    http_pool.STATS.last_used.clear()
+    http_pool.register(url)
+    http_pool.begin_turn()
+    http_pool.prewarm()
+    time.sleep(1.0)
+    prewarmed_first = timed(http_pool.session().head, url)
+
+    print("=" * 50)
+    print(f"{url} HEAD {count}회, 중앙값")
+    print("-" * 50)
+    for name, values in results.items():
+        print(
+            f"{name:<8} 요청당 {median(values) * 1000:8.1f} ms "
+            f"(첫 요청 {values[0] * 1000:.1f} ms)"
+        )
+    print(f"미리 연결 후 첫 요청 {prewarmed_first * 1000:8.1f} ms")
+    print("-" * 50)
+    print(pooled_report)
+    print(http_pool.turn_report())
+    print(f"HTTP/2 (httpx, openai 1.x): {'사용' if http_pool.HAS_HTTP2 else 'h2 패키지 없음'}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
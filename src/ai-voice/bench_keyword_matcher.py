@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+키워드 감지 시간 측정 스크립트 (any() 반복 vs Aho-Corasick automaton)
+사용법: python bench_keyword_matcher.py [rounds]
+예시: python bench_keyword_matcher.py 200
+
+외부 의존성 없이 constants.py만 사용한다.
+발화 하나를 처리할 때 하던 키워드 검사를 두 방식으로 실행하고 발화당 µs를 출력한다.
+    1) 기존: 종료 / sleep / 서보 / LED / 슬픈 톤 / wait_run 특별 상황 / 응답 표정 감지를
+       카테고리마다 any(keyword in text for keyword in LIST)로 검사
+    2) automaton: 사용자 발화와 LLM 응답에 match_categories를 한 번씩
+측정 전에 모든 문장에서 카테고리 전체 결과가 같은지 확인한다.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constants import (
+    EMOTION_CHECK_ORDER,
+    EMOTION_DEFAULT,
+    EMOTION_KEYWORDS,
+    EXIT_COMMANDS,
+    KEYWORD_CATEGORIES,
+    LED_OFF_KEYWORDS,
+    LED_ON_KEYWORDS,
+    SAD_TONE_KEYWORDS,
+    SERVO_KEYWORDS,
+    SLEEP_COMMANDS,
+)
+from utils.keyword_matcher import KeywordMatcher, match_categories
+
+# ChipiBrain._prepare_messages의 특별 상황 카테고리 (위기 표현은 sad_tone과 같은 목록)
+WAIT_RUN_CATEGORIES = (
+    "water",
+    "greeting",
+    "missed",
+    "tired",
+    "sad_tone",
+    "temperature",
+    "humidity",
+    "temp_humidity",
+    "status",
+)
+
+# (사용자 발화, LLM 응답)
+TURNS = (
+    ("안녕 치피, 잘 잤어?", "좋은 아침! 어제 물 줘서 오늘 컨디션 최고야. 오늘도 힘내!"),
+    ("지금 상태 어때?", "지금 온도는 24도, 습도는 45%야. 딱 좋아서 기분이 좋아~"),
+    ("오늘 너무 피곤하고 힘들어", "요즘 많이 힘들구나.. 오늘은 푹 쉬었으면 좋겠어."),
+    ("물 줄게", "와 고마워! 목말랐는데 정말 신나!"),
+    ("불 켜줘", "불 켰어! 이제 환하다."),
+    ("LED 꺼", "알겠어, 불 끌게. 잘 자~"),
+    ("춤 춰봐", "신난다! 빙글빙글 돌아볼게!"),
+    ("요즘 뭐했어? 잘 지냈어?", "너무 보고 싶었어~ 나는 햇빛 받으면서 잘 지냈어."),
+    ("온도 알려줘", "지금 온도는 22도야. 살짝 서늘하네."),
+    ("너무 건조한 것 같아", "습도가 30%라서 조금 목이 말라. 물 좀 줄래?"),
+    ("오늘 회사에서 화나는 일이 있었어", "헐, 진짜 짜증났겠다. 무슨 일이었어?"),
+    ("깜짝 놀랐어 갑자기 비가 와서", "어머 깜짝이야! 우산은 챙겼어?"),
+    ("그만 자러 갈게", "응 잘 자! 내일 또 얘기하자."),
+    ("이제 종료", "안녕! 다음에 또 봐."),
+    (
+        "오늘은 그냥 평범한 하루였어. 점심은 회사 근처에서 김치찌개를 먹었고 저녁에는 산책을 했어.",
+        "평범한 하루도 소중하지. 산책하면서 바람 쐬니까 마음이 편안해졌겠다.",
+    ),
+)
+
+
+def naive_turn(user_text, response):
+    """기존 코드와 같은 순서 / 방식의 검사"""
+    lowered = user_text.lower()
+    results = [
+        any(cmd in lowered for cmd in EXIT_COMMANDS),
+        any(cmd in lowered for cmd in SLEEP_COMMANDS),
+        any(keyword in lowered for keyword in SERVO_KEYWORDS),
+    ]
+    if any(keyword in lowered for keyword in LED_ON_KEYWORDS):
+        results.append("on")
+    elif any(keyword in lowered for keyword in LED_OFF_KEYWORDS):
+        results.append("off")
+    results.append(any(keyword in user_text for keyword in SAD_TONE_KEYWORDS))
+    # wait_run 특별 상황
+    for name in WAIT_RUN_CATEGORIES:
+        results.append(any(k in lowered for k in KEYWORD_CATEGORIES[name]))
+    # 응답 표정
+    response_lower = response.lower()
+    emotion = EMOTION_DEFAULT
+    for candidate in EMOTION_CHECK_ORDER:
+        if any(k in response_lower for k in EMOTION_KEYWORDS.get(candidate, [])):
+            emotion = candidate
+            break
+    results.append(emotion)
+    return results
+
+
+def automaton_turn(user_text, response):
+    found = match_categories(user_text)
+    response_found = match_categories(response)
+    emotion = EMOTION_DEFAULT
+    for candidate in EMOTION_CHECK_ORDER:
+        if f"emotion:{candidate}" in response_found:
+            emotion = candidate
+            break
+    return found, emotion
+
+
+def naive_categories(text):
+    """카테고리 전체를 any()로 검사한 결과 (정확성 확인용)"""
+    lowered = text.lower()
+    return {
+        name
+        for name, keywords in KEYWORD_CATEGORIES.items()
+        if any(keyword.lower() in lowered for keyword in keywords)
+    }
+
+
+def measure(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for user_text, response in TURNS:
+            func(user_text, response)
+    return (time.perf_counter() - start) / (rounds * len(TURNS)) * 1e6
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    for text in [t for turn in TURNS for t in turn]:
+        expected = naive_categories(text)
+        found = match_categories(text)
+        if found != expected:
+            raise SystemExit(f"결과 불일치: {text!r}\n  any(): {expected}\n  automaton: {found}")
+
+    keywords = sum(len(k) for k in KEYWORD_CATEGORIES.values())
+    start = time.perf_counter()
+    matcher = KeywordMatcher(KEYWORD_CATEGORIES)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print("=" * 50)
+    print(
+        f"카테고리 {len(KEYWORD_CATEGORIES)}개, 키워드 {keywords}개, "
+        f"상태 {len(matcher.goto)}개 (생성 {build_ms:.1f} ms)"
+    )
+    print(f"{rounds}회 x 턴 {len(TURNS)}개, 결과 일치 확인 완료")
+    print("-" * 50)
+    naive_us = measure(naive_turn, rounds)
+    automaton_us = measure(automaton_turn, rounds)
+    print(f"{'기존 any() 반복':<18} {naive_us:9.1f} µs/턴")
+    print(f"{'automaton':<18} {automaton_us:9.1f} µs/턴")
+    print(f"속도 향상: {naive_us / automaton_us:.1f}x")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+LLM 첫 문장 지연 비교 스크립트 (ChipiBrain.wait_run vs wait_run_stream)
+사용법: python bench_llm_stream.py [runs] [ai_name] [device_serial]
+예시: python bench_llm_stream.py 5
+      python bench_llm_stream.py 10 chipi ESP32-S3-001
+
+config/.env의 Azure OpenAI 설정으로 실제 API를 호출한다. 같은 질문을
+블로킹(wait_run)과 스트리밍(wait_run_stream)으로 번갈아 보내고 다음을 출력한다.
+    - 블로킹: 응답 전체가 도착한 시각 = TTS를 시작할 수 있는 시각
+    - 스트리밍: 첫 delta, 첫 문장, 전체 응답이 도착한 시각
+시각은 모두 메서드 호출부터 잰다 (프롬프트 구성, DB 컨텍스트 조회 포함).
+대화 히스토리(memory.jsonl)는 건드리지 않도록 매 요청마다 비우고 저장하지 않는다.
+"""
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.chipi_brain import ChipiBrain
+
+QUESTIONS = (
+    "안녕 치피, 오늘 기분 어때?",
+    "지금 상태 어때?",
+    "오늘 좀 힘들었어",
+    "물 줄게",
+    "요즘 뭐하고 지냈어?",
+)
+
+
+class Quiet:
+    """ChipiBrain의 진행 로그를 측정 중에는 숨김"""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = io.StringIO()
+
+    def __exit__(self, *exc):
+        sys.stdout = self.stdout
+
+
+def reset(brain, question):
+    brain.messages = []
+    brain.add_msg(question)
+
+
+def blocking(brain, question, ai_name, device_serial):
+    reset(brain, question)
+    start = time.perf_counter()
+    with Quiet():
+        reply = brain.wait_run(ai_name, device_serial)
+    return time.perf_counter() - start, reply
+
+
+def streaming(brain, question, ai_name, device_serial):
+    """(첫 delta, 첫 문장, 전체) 초와 첫 문장"""
+    reset(brain, question)
+    first_delta = first_sentence = None
+    sentence = ""
+    start = time.perf_counter()
+    with Quiet():
+        for kind, text in brain.wait_run_stream(ai_name, device_serial):
+            elapsed = time.perf_counter() - start
+            if kind == "delta" and first_delta is None:
+                first_delta = elapsed
+            if kind == "sentence" and first_sentence is None:
+                first_sentence, sentence = elapsed, text
+    total = time.perf_counter() - start
+    # 빈 응답 / 오류면 delta 없이 대체 문구만 옴
+    if first_delta is None:
+        first_delta = first_sentence
+    return first_delta, first_sentence, total, sentence
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    ai_name = sys.argv[2] if len(sys.argv) > 2 else "chipi"
+    device_serial = sys.argv[3] if len(sys.argv) > 3 else None
+
+    brain = ChipiBrain()
+    brain.save_memory = lambda: None
+
+    # 연결 / 인증 준비 (첫 요청의 TLS 핸드셰이크를 측정에서 제외)
+    blocking(brain, QUESTIONS[0], ai_name, device_serial)
+
+    results = {"blocking": [], "delta": [], "sentence": [], "total": []}
+    print("=" * 50)
+    print(f"{runs}회 x 질문 {len(QUESTIONS)}개, ai_name={ai_name}, device_serial={device_serial}")
+    print("-" * 50)
+    for i in range(runs):
+        for question in QUESTIONS:
+            # 순서에 따른 편향을 줄이려고 번갈아 먼저 보냄
+            if i % 2 == 0:
+                block, _ = blocking(brain, question, ai_name, device_serial)
+                delta, sentence, total, first = streaming(brain, question, ai_name, device_serial)
+            else:
+                delta, sentence, total, first = streaming(brain, question, ai_name, device_serial)
+                block, _ = blocking(brain, question, ai_name, device_serial)
+            results["blocking"].append(block)
+            results["delta"].append(delta)
+            results["sentence"].append(sentence)
+            results["total"].append(total)
+            print(
+                f"{question[:14]:<14} 블로킹 {block * 1000:6.0f} ms | 스트리밍 첫 문장 "
+                f"{sentence * 1000:6.0f} ms (전체 {total * 1000:6.0f} ms) {first[:20]}"
+            )
+
+    print("-" * 50)
+    print(f"{'중앙값':<22} {'ms':>8}")
+    print(f"{'블로킹 (전체 응답)':<22} {median(results['blocking']) * 1000:8.0f}")
+    print(f"{'스트리밍 첫 delta':<22} {median(results['delta']) * 1000:8.0f}")
+    print(f"{'스트리밍 첫 문장':<22} {median(results['sentence']) * 1000:8.0f}")
+    print(f"{'스트리밍 전체 응답':<22} {median(results['total']) * 1000:8.0f}")
+    saved = median([b - s for b, s in zip(results["blocking"], results["sentence"])])
+    print(f"TTS 시작이 앞당겨지는 시간 (중앙값): {saved * 1000:.0f} ms")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+응답 캐시 hit rate 시뮬레이션 스크립트 (core/response_cache.py)
+사용법: python bench_response_cache.py [turns] [variants] [interval]
+예시: python bench_response_cache.py 500
+      python bench_response_cache.py 1000 5 120
+
+외부 의존성 없이 ResponseCache만 사용한다 (LLM은 호출하지 않고 호출 횟수만 센다).
+자주 하는 질문(앞쪽일수록 자주)과 매번 다른 긴 발화를 섞은 대화를 턴마다 interval초
+(기본 90초) 간격으로 흘려보내고, variant 개수 / TTL에 따른 hit rate와 아낀 LLM 호출 수를 출력한다.
+센서 질문은 온도가 조금씩 바뀌므로 구간이 바뀌면 다른 key가 된다.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.response_cache import ResponseCache, sensor_bucket
+
+# (발화, 센서 질문 여부). 앞쪽일수록 자주 나옴
+QUESTIONS = (
+    ("상태 어때?", True),
+    ("좋은 아침", False),
+    ("내 이름 뭐야?", False),
+    ("물 줄게", False),
+    ("온도 알려줘", True),
+    ("잘 잤어?", False),
+    ("심심해", False),
+    ("습도는 어때?", True),
+    ("오늘 기분 어때?", False),
+    ("사랑해 치피", False),
+)
+LONG_UTTERANCE_RATIO = 0.3  # 캐시되지 않는 긴 발화 비율
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(turns, variants, interval, seed=0):
+    """(hit 수, miss 수, LLM 호출 수)"""
+    rng = random.Random(seed)
+    random.seed(seed)  # ResponseCache의 variant 선택
+    clock = Clock()
+    cache = ResponseCache(variants=variants, enabled=True, clock=clock)
+    weights = [1.0 / (rank + 1) for rank in range(len(QUESTIONS))]
+    llm_calls = 0
+    temperature = 22.0
+    for turn in range(turns):
+        clock.now += interval
+        temperature += rng.uniform(-0.3, 0.3)
+        if rng.random() < LONG_UTTERANCE_RATIO:
+            utterance = f"오늘 있었던 일 얘기해줄게 {turn}번째 이야기인데 들어볼래"
+            is_sensor = False
+        else:
+            utterance, is_sensor = rng.choices(QUESTIONS, weights)[0]
+        bucket = sensor_bucket({"temperature": temperature, "humidity": 45}) if is_sensor else None
+        key = cache.key(utterance, ("chipi", "ESP32-S3-001", "민수", bucket))
+        if cache.get(key) is None:
+            llm_calls += 1
+            cache.put(key, f"응답 {llm_calls}")
+    return cache.hits, cache.misses, llm_calls
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    variants = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else 90.0
+
+    print("=" * 50)
+    print(f"{turns}턴, 턴 간격 {interval:.0f}초, 긴 발화 {LONG_UTTERANCE_RATIO:.0%}")
+    print("-" * 50)
+    print(f"{'variants':>8} {'hit rate':>9} {'LLM 호출':>9} {'아낀 호출':>9}")
+    for n in sorted({1, variants, variants * 2}):
+        hits, misses, llm_calls = run(turns, n, interval)
+        rate = hits / (hits + misses) if hits + misses else 0.0
+        print(f"{n:>8} {rate:>9.0%} {llm_calls:>9} {turns - llm_calls:>9}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+LLM 미리 요청(speculative reply) 효과 측정 스크립트 (core/speculative_reply.py)
+사용법: python bench_speculative_reply.py [rounds] [lead]
+예시: python bench_speculative_reply.py 3
+      python bench_speculative_reply.py 5 0.8
+
+실제 Azure OpenAI를 호출한다 (config/.env 필요, DB 컨텍스트는 DEVICE_SERIAL이 있으면 사용).
+(안정된 중간 결과, final transcript) 쌍마다
+    1) 기존: final을 받은 뒤 wait_run
+    2) 미리 요청: 중간 결과로 speculate, lead초(기본 0.6) 뒤 final을 받아 wait_run(speculation=...)
+final을 받은 시각부터 응답이 준비될 때까지의 시간 중앙값과, 아낀 지연 / 버린 토큰 누적을 출력한다.
+중간 결과와 final이 다른 쌍은 미리 요청을 취소하고 다시 요청한다.
+대화 journal은 임시 파일을 쓰고 응답 캐시는 끈다.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["MEMORY_JOURNAL"] = os.path.join(tempfile.mkdtemp(), "memory.jsonl")
+os.environ["RESPONSE_CACHE"] = "false"
+
+from core.chipi_brain import ChipiBrain
+from core.speculative_reply import Speculator
+
+# (안정된 중간 결과, final transcript)
+UTTERANCES = (
+    ("상태 어때", "상태 어때?"),
+    ("좋은 아침", "좋은 아침!"),
+    ("오늘 날씨", "오늘 날씨 어때"),  # 다름: 취소 후 다시 요청
+    ("물 줄까", "물 줄까?"),
+)
+
+
+class Quiet:
+    """ChipiBrain / Speculator의 진행 로그를 측정 중에는 숨김"""
+
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = io.StringIO()
+
+    def __exit__(self, *exc):
+        sys.stdout = self.stdout
+
+
+def baseline(brain, final, device_serial):
+    brain.add_msg(final)
+    start = time.monotonic()
+    brain.wait_run("chipi", device_serial)
+    return time.monotonic() - start
+
+
+def speculative(brain, speculator, interim, final, lead, device_serial):
+    speculator.on_interim(interim, 1.0, True)
+    time.sleep(lead)
+    brain.add_msg(final)
+    heard_at = time.monotonic()
+    speculation = speculator.take(final, heard_at)
+    brain.wait_run("chipi", device_serial, speculation=speculation)
+    return time.monotonic() - heard_at
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    lead = float(sys.argv[2]) if len(sys.argv) > 2 else 0.6
+    device_serial = os.environ.get("DEVICE_SERIAL")
+
+    results = {"기존": [], "미리 요청": []}
+    with Quiet():
+        brain = ChipiBrain()
+        speculator = Speculator(brain, device_serial=device_serial)
+        for _ in range(rounds):
+            for interim, final in UTTERANCES:
+                results["기존"].append(baseline(brain, final, device_serial))
+                results["미리 요청"].append(
+                    speculative(brain, speculator, interim, final, lead, device_serial)
+                )
+        # 집계 스레드(버린 토큰 / 아낀 지연)가 끝나도록 잠깐 기다림
+        time.sleep(1.0)
+
+    print("=" * 50)
+    print(f"{rounds}회 x {len(UTTERANCES)}문장, final까지 {lead:.1f}초, 중앙값")
+    print("-" * 50)
+    for name, values in results.items():
+        print(f"{name:<10} final -> 응답 {median(values) * 1000:8.1f} ms")
+    print(speculator.report())
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
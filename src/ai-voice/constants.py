@@ -579,3 +579,77 @@ LED_OFF_KEYWORDS = [
     "불 꺼줘요",
     "조명 꺼줘요",
 ]
+
+# ============================================================================
+# 대화 특별 상황 키워드 (ChipiBrain.wait_run)
+# ============================================================================
+
+# 물 주기 표현
+WATER_KEYWORDS = ["물 줄게", "물 줘", "물을 줄게", "물을 줘"]
+
+# 아침 인사 / 잘잤어 질문
+GREETING_KEYWORDS = [
+    "잘잤어",
+    "잘 잤어",
+    "잘자",
+    "잘 잤니",
+    "아침이야",
+    "좋은 아침",
+    "안녕",
+    "일어났어",
+]
+
+# 잘 있었는지 질문
+MISSED_KEYWORDS = [
+    "잘 있었어",
+    "잘 지냈어",
+    "어떻게 지냈어",
+    "뭐했어",
+    "어디갔어",
+    "다녀왔어",
+]
+
+# 힘들다는 표현 (SAD_TONE_KEYWORDS가 같이 있으면 제외)
+TIRED_KEYWORDS = ["힘들어", "힘들", "어려워", "막막해", "지쳐", "피곤"]
+
+# 온습도 질문
+TEMPERATURE_KEYWORDS = ["온도", "따뜻", "더워", "추워"]
+HUMIDITY_KEYWORDS = ["습도", "건조", "말라"]
+TEMP_HUMIDITY_KEYWORDS = ["온습도", "온도 습도", "온도와 습도", "온도 습도 알려줘"]
+
+# 상태 질문
+STATUS_KEYWORDS = [
+    "상태 어때",
+    "상태 어떠냐",
+    "지금 상태",
+    "네 상태",
+    "너 상태",
+    "상태 어떠",
+    "상태 어떤가",
+    "상태가 어때",
+]
+
+# ============================================================================
+# 키워드 카테고리 (utils/keyword_matcher.py가 한 번에 검사)
+# ============================================================================
+
+KEYWORD_CATEGORIES = {
+    **{
+        f"emotion:{emotion}": keywords
+        for emotion, keywords in EMOTION_KEYWORDS.items()
+    },
+    "servo": SERVO_KEYWORDS,
+    "sad_tone": SAD_TONE_KEYWORDS,
+    "exit": EXIT_COMMANDS,
+    "sleep": SLEEP_COMMANDS,
+    "led_on": LED_ON_KEYWORDS,
+    "led_off": LED_OFF_KEYWORDS,
+    "water": WATER_KEYWORDS,
+    "greeting": GREETING_KEYWORDS,
+    "missed": MISSED_KEYWORDS,
+    "tired": TIRED_KEYWORDS,
+    "temperature": TEMPERATURE_KEYWORDS,
+    "humidity": HUMIDITY_KEYWORDS,
+    "temp_humidity": TEMP_HUMIDITY_KEYWORDS,
+    "status": STATUS_KEYWORDS,
+}
@@ -0,0 +1,385 @@
+"""
+여러 디바이스의 ChipiBrain 세션을 한 프로세스에서 돌리는 두뇌 서버 (JSON over HTTP)
+
+ChipiBrain은 프로세스에 하나, 대화 journal 하나, DB 연결 하나라서 LLM 쪽을 서버에서
+돌리려면 디바이스마다 프로세스를 하나씩 띄워야 했다. 이 서버는 ChipiBrain 하나를 만들어
+LLM 클라이언트 / DB 연결 / 컨텍스트 실행기를 공유하고, 디바이스마다
+ChipiBrain.session()으로 대화 히스토리 / 페르소나 / 응답 캐시를 따로 둔다.
+
+    POST   /sessions/{serial}/reply    {"text": "상태 어때?", "ai_name": "chipi"}
+           -> {"reply": "...", "queued_ms": 3.1, "elapsed_ms": 812.4}
+    PUT    /sessions/{serial}/persona  {"system_prompt": "...", "ai_name": "chipi"}
+    DELETE /sessions/{serial}          대화 히스토리 초기화 (create_new_memory)
+    GET    /sessions                   메모리에 있는 세션 목록
+    GET    /health
+
+- 동시에 응답을 만드는 턴은 BRAIN_WORKERS개까지. 기다리는 턴이 BRAIN_QUEUE개를 넘으면 503
+- 세션마다 lock: 같은 디바이스의 턴은 순서대로 (lock을 기다리는 동안 worker를 잡지 않음)
+- 대화 journal은 BRAIN_SESSION_DIR/{serial}.jsonl, 페르소나는 {serial}.persona.json.
+  메모리에는 세션을 BRAIN_MAX_SESSIONS개까지 두고, 넘으면 가장 오래 안 쓴 세션을 닫음
+  (journal은 파일에 남으므로 다음 요청 때 다시 불러옴)
+- BRAIN_SERVER_TOKEN이 있으면 Authorization: Bearer 토큰이 맞는 요청만 받음
+
+사용법: python core/brain_server.py [port]
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from core.chipi_brain import ChipiBrain
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.chipi_brain import ChipiBrain
+
+PORT = 8765
+WORKERS = 8  # 동시에 응답을 만드는 턴 수 (= LLM 동시 요청 수)
+QUEUE = 32  # worker를 기다리는 턴이 이보다 많으면 503
+MAX_SESSIONS = 256  # 메모리에 둘 세션 수
+TURN_TIMEOUT = 60.0  # 세션 lock / worker를 기다리는 최대 시간 (초)
+SESSION_DIR = "brain_sessions"
+
+# journal 파일 이름으로 쓰므로 경로 문자는 받지 않음
+_SERIAL = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class BrainBusy(Exception):
+    """worker 대기열이 가득 찼거나 세션 lock을 TURN_TIMEOUT 안에 못 얻음 (503)"""
+
+
+class BrainSession:
+    """디바이스 하나의 ChipiBrain 세션과 lock, 통계"""
+
+    def __init__(self, serial, brain, persona):
+        self.serial = serial
+        self.brain = brain
+        self.persona = persona  # {"ai_name": ..., "system_prompt": ...} 또는 {}
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.last_used = time.time()
+        self.closed = False  # 메모리에서 내보냄 (다시 get하면 새 세션)
+
+    @property
+    def ai_name(self):
+        return self.persona.get("ai_name", "chipi")
+
+    def summarizing(self):
+        """요약 스레드가 아직 도는 중 (journal에 요약을 쓰거나 compaction할 수 있음)"""
+        thread = self.brain.summary_thread
+        return thread is not None and thread.is_alive()
+
+    def close(self):
+        """요약 스레드를 기다린 뒤 journal / 이벤트 루프를 닫음 (lock을 잡은 상태에서 호출)"""
+        self.closed = True
+        if self.brain.summary_thread is not None:
+            self.brain.summary_thread.join()
+        self.brain.journal.close()
+        self.brain.loop.close()
+
+    def info(self):
+        return {
+            "serial": self.serial,
+            "ai_name": self.ai_name,
+            "custom_persona": bool(self.persona.get("system_prompt")),
+            "turns": self.turns,
+            "messages": len(self.brain.messages),
+            "busy": self.lock.locked(),
+            "idle_seconds": round(time.time() - self.last_used, 1),
+        }
+
+
+class BrainSessions:
+    """
+    디바이스별 세션 관리 + worker 수 제한
+
+        sessions = BrainSessions(ChipiBrain(llm_workers=8))
+        answer, queued, elapsed = sessions.reply("ESP32-S3-001", "상태 어때?")
+    """
+
+    def __init__(
+        self, base, workers=None, queue=None, max_sessions=None, directory=None
+    ):
+        self.base = base
+        self.workers = workers or int(os.environ.get("BRAIN_WORKERS", str(WORKERS)))
+        self.queue = queue or int(os.environ.get("BRAIN_QUEUE", str(QUEUE)))
+        self.max_sessions = max_sessions or int(
+            os.environ.get("BRAIN_MAX_SESSIONS", str(MAX_SESSIONS))
+        )
+        self.directory = directory or os.environ.get("BRAIN_SESSION_DIR", SESSION_DIR)
+        self.turn_timeout = float(
+            os.environ.get("BRAIN_TURN_TIMEOUT", str(TURN_TIMEOUT))
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="brain-turn"
+        )
+        self.sessions = OrderedDict()  # serial -> BrainSession (LRU 순서)
+        self.lock = threading.Lock()
+        self.pending = 0  # worker에 넣었지만 아직 끝나지 않은 턴 (실행 중 포함)
+        # 누적 통계
+        self.turns = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    def _path(self, serial, suffix):
+        return os.path.join(self.directory, f"{serial}{suffix}")
+
+    def _load_persona(self, serial):
+        try:
+            with open(self._path(serial, ".persona.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, serial):
+        """세션 (없으면 journal / 페르소나 파일에서 불러와 만듦)"""
+        if not _SERIAL.match(serial or ""):
+            raise ValueError(f"잘못된 디바이스 시리얼: {serial!r}")
+        with self.lock:
+            session = self.sessions.get(serial)
+            if session is not None:
+                self.sessions.move_to_end(serial)
+                return session
+            persona = self._load_persona(serial)
+            brain = self.base.session(
+                self._path(serial, ".jsonl"),
+                serial,
+                system_prompt=persona.get("system_prompt"),
+                ai_name=persona.get("ai_name", "chipi"),
+            )
+            session = BrainSession(serial, brain, persona)
+            self.sessions[serial] = session
+            self._evict_locked()
+            return session
+
+    def _evict_locked(self):
+        """
+        max_sessions를 넘으면 오래 안 쓴 세션부터 닫음
+
+        턴 진행 중인 세션, 요약 스레드가 도는 세션, 방금 만든 세션은 건너뜀.
+        요약 스레드는 journal을 다시 열거나 os.replace로 바꿀 수 있어서, 닫은 뒤 같은
+        디바이스를 다시 불러오면 journal 두 개가 한 파일에 쓰게 된다.
+        """
+        for serial in list(self.sessions)[:-1]:
+            if len(self.sessions) <= self.max_sessions:
+                return
+            session = self.sessions[serial]
+            if not session.lock.acquire(blocking=False):
+                continue
+            try:
+                # 요약 스레드는 턴(lock 안)에서만 시작하므로 lock을 잡은 뒤 확인
+                if session.summarizing():
+                    continue
+                del self.sessions[serial]
+                session.close()
+                self.evicted += 1
+            finally:
+                session.lock.release()
+
+    def set_persona(self, serial, system_prompt=None, ai_name="chipi"):
+        """페르소나 변경 (파일에 저장, 다음 턴부터 적용)"""
+        persona = {"ai_name": ai_name}
+        if system_prompt:
+            persona["system_prompt"] = system_prompt
+        with self._locked(serial) as session:
+            with open(
+                self._path(serial, ".persona.json"), "w", encoding="utf-8"
+            ) as f:
+                json.dump(persona, f, ensure_ascii=False)
+            session.persona = persona
+            prompts = dict(self.base.system_prompts)
+            if system_prompt:
+                prompts[ai_name] = system_prompt
+            session.brain.system_prompts = prompts
+            session.brain.response_cache.invalidate()
+
+    def reset(self, serial):
+        """대화 히스토리 초기화"""
+        with self._locked(serial) as session:
+            session.brain.create_new_memory()
+
+    @contextmanager
+    def _locked(self, serial):
+        """세션 lock을 잡은 세션. turn_timeout 안에 못 잡으면 BrainBusy"""
+        deadline = time.monotonic() + self.turn_timeout
+        while True:
+            session = self.get(serial)
+            timeout = max(0.0, deadline - time.monotonic())
+            if not session.lock.acquire(timeout=timeout):
+                raise BrainBusy(f"{serial}: 이전 턴이 끝나지 않음")
+            if not session.closed:
+                break
+            # 기다리는 동안 메모리에서 내보내진 세션: 다시 불러옴
+            session.lock.release()
+        try:
+            yield session
+        finally:
+            session.lock.release()
+
+    def reply(self, serial, text, ai_name=None):
+        """
+        사용자 메시지에 대한 응답 (요청 스레드에서 호출, worker에서 생성)
+
+        Returns:
+            (응답, worker를 기다린 초, 전체 초)
+        """
+        start = time.monotonic()
+        # 같은 디바이스의 턴은 순서대로. lock은 요청 스레드가 잡으므로
+        # 기다리는 동안 worker를 쓰지 않음
+        with self._locked(serial) as session:
+            with self.lock:
+                if self.pending >= self.workers + self.queue:
+                    self.rejected += 1
+                    raise BrainBusy(f"대기 중인 턴 {self.pending}개")
+                self.pending += 1
+            submitted = time.monotonic()
+            try:
+                future = self.executor.submit(
+                    self._turn, session, text, ai_name or session.ai_name, submitted
+                )
+                answer, queued = future.result()
+            finally:
+                with self.lock:
+                    self.pending -= 1
+        return answer, queued, time.monotonic() - start
+
+    def _turn(self, session, text, ai_name, submitted):
+        queued = time.monotonic() - submitted
+        session.brain.add_msg(text)
+        answer = session.brain.wait_run(ai_name, session.serial)
+        session.brain.summarize_in_background()
+        session.turns += 1
+        session.last_used = time.time()
+        with self.lock:
+            self.turns += 1
+        return answer, queued
+
+    def info(self):
+        with self.lock:
+            sessions = [session.info() for session in self.sessions.values()]
+            return {
+                "sessions": sessions,
+                "workers": self.workers,
+                "pending": self.pending,
+                "turns": self.turns,
+                "rejected": self.rejected,
+                "evicted": self.evicted,
+            }
+
+
+class BrainRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive (디바이스가 연결을 재사용)
+    sessions = None  # BrainSessions (serve에서 설정)
+    token = None
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(body, dict):
+            raise ValueError("JSON object가 필요합니다")
+        return body
+
+    def _route(self, method):
+        if self.token and self.headers.get("Authorization") != f"Bearer {self.token}":
+            self._send(401, {"error": "unauthorized"})
+            return
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        try:
+            body = self._body() if method in ("POST", "PUT") else {}
+            if method == "GET" and parts == ["health"]:
+                self._send(200, {"ok": True})
+            elif method == "GET" and parts == ["sessions"]:
+                self._send(200, self.sessions.info())
+            elif method == "POST" and len(parts) == 3 and parts[2] == "reply":
+                text = body.get("text")
+                if not text:
+                    raise ValueError("text가 필요합니다")
+                answer, queued, elapsed = self.sessions.reply(
+                    parts[1], text, body.get("ai_name")
+                )
+                self._send(
+                    200,
+                    {
+                        "reply": answer,
+                        "queued_ms": round(queued * 1000, 1),
+                        "elapsed_ms": round(elapsed * 1000, 1),
+                    },
+                )
+            elif method == "PUT" and len(parts) == 3 and parts[2] == "persona":
+                self.sessions.set_persona(
+                    parts[1], body.get("system_prompt"), body.get("ai_name", "chipi")
+                )
+                self._send(200, {"ok": True})
+            elif method == "DELETE" and len(parts) == 2:
+                self.sessions.reset(parts[1])
+                self._send(200, {"ok": True})
+            else:
+                self._send(404, {"error": "not found"})
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+        except BrainBusy as e:
+            self._send(503, {"error": f"busy: {e}"})
+        except Exception as e:
+            print(f"❌ 두뇌 서버 오류 ({method} {self.path}): {e}")
+            self._send(500, {"error": str(e)})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=None, sessions=None):
+    """두뇌 서버 실행 (Ctrl+C로 종료)"""
+    port = port or int(os.environ.get("BRAIN_SERVER_PORT", str(PORT)))
+    if sessions is None:
+        workers = int(os.environ.get("BRAIN_WORKERS", str(WORKERS)))
+        sessions = BrainSessions(ChipiBrain(llm_workers=workers), workers=workers)
+    BrainRequestHandler.sessions = sessions
+    BrainRequestHandler.token = os.environ.get("BRAIN_SERVER_TOKEN") or None
+    server = ThreadingHTTPServer(("0.0.0.0", port), BrainRequestHandler)
+    server.daemon_threads = True
+    print(
+        f"🧠 두뇌 서버: http://0.0.0.0:{port} (worker {sessions.workers}, "
+        f"대기 {sessions.queue}, 세션 최대 {sessions.max_sessions}, "
+        f"journal {sessions.directory}/)",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 두뇌 서버 종료")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else None)
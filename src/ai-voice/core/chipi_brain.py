@@ -4,12 +4,21 @@ import sys
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
 
+import asyncio
+import copy
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(
     0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 )
 
+from datetime import datetime
+
+import requests
 from dotenv import load_dotenv
 
 # openai 버전에 따라 다른 import (Python 3.7.3 호환)
@@ -73,9 +82,99 @@ except (ImportError, Exception):
             print("⚠️  데이터베이스 기능 없이 계속 진행합니다.")
             DatabaseManager = None
 
+try:
+    from core.conversation_memory import (
+        KEEP_TURNS,
+        SUMMARY_MAX_TOKENS,
+        TOKEN_BUDGET,
+        estimate_tokens,
+        fold_count,
+        message_tokens,
+        summary_request,
+        window_start,
+    )
+    from core.conversation_journal import ConversationJournal
+    from core.response_cache import ResponseCache, sensor_bucket
+    from core.speculative_reply import Speculation
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from conversation_journal import ConversationJournal
+    from response_cache import ResponseCache, sensor_bucket
+    from speculative_reply import Speculation
+    from conversation_memory import (
+        KEEP_TURNS,
+        SUMMARY_MAX_TOKENS,
+        TOKEN_BUDGET,
+        estimate_tokens,
+        fold_count,
+        message_tokens,
+        summary_request,
+        window_start,
+    )
+
+try:
+    from utils import http_pool
+    from utils.keyword_matcher import match_categories
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils import http_pool
+    from utils.keyword_matcher import match_categories
+
+
+# 응답 대신 말할 문구 (콘텐츠 필터 / 빈 응답 / API 오류)
+CONTENT_FILTER_MESSAGE = (
+    "어, 그건 제가 도와드리기 어려운 것 같아요. 다른 걸 말씀해 주실 수 있을까요?"
+)
+EMPTY_RESPONSE_MESSAGE = "어, 지금은 잘 모르겠어. 잠시만 기다려줄래?"
+ERROR_MESSAGE = "어, 뭔가 잘못됐나봐. 잠시만 기다려줄래?"
+
+# 답이 센서 값에 따라 달라지는 질문 (응답 캐시 key에 센서 구간을 넣음)
+SENSOR_QUESTION_CATEGORIES = {"temperature", "humidity", "temp_humidity", "status"}
+
+# 컨텍스트 동시 조회 스레드 수 (스레드마다 DB 연결 하나)
+CONTEXT_WORKERS = 4
+# 필수 컨텍스트가 모인 뒤 선택 컨텍스트(센서 추세, 최근 로그)를 더 기다리는 시간 (초)
+OPTIONAL_CONTEXT_WAIT = 0.05
+
+# 문장 끝: 마침표/느낌표/물음표/물결/말줄임표 뒤에 공백이 오거나 줄바꿈
+# ("3.5도"처럼 숫자 사이 마침표는 뒤에 공백이 없으므로 문장 끝이 아님)
+SENTENCE_END = re.compile(r"[.!?~…]+[\"')\]]*\s+|\n+")
+
+
+class SentenceSplitter:
+    """스트리밍 delta를 모아서 완성된 문장 단위로 잘라냄"""
 
-class ChipiBrain:
     def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        """delta 추가. 이번에 완성된 문장 목록 반환"""
+        self.buffer += text
+        sentences = []
+        while True:
+            match = SENTENCE_END.search(self.buffer)
+            if not match:
+                break
+            sentence = self.buffer[: match.end()].strip()
+            self.buffer = self.buffer[match.end() :]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        """스트림 끝: 남은 텍스트 (문장 부호로 끝나지 않았어도)"""
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        return sentence
+
+
+class ChipiBrain:
+    def __init__(self, llm_workers=1):
+        """
+        Args:
+            llm_workers: 동시에 보낼 수 있는 LLM 요청 수 (디바이스 하나면 1,
+                core/brain_server.py처럼 세션 여러 개가 같이 쓰면 worker 수만큼)
+        """
         # Python 3.7.3 호환: encoding 파라미터는 Python 3.9+에서만 지원
         current_dir = os.path.dirname(os.path.abspath(__file__))
         config_path = os.path.join(
@@ -105,14 +204,20 @@ class ChipiBrain:
             raise ValueError("AZURE_OPENAI_ENDPOINT가 설정되지 않았습니다.")
 
         # Azure OpenAI 클라이언트 초기화 (openai 버전에 따라 다르게 처리)
+        # 연결은 utils/http_pool.py의 keep-alive 풀을 쓰고, 말이 시작되면 미리 연결해 둠
         if HAS_AZURE_OPENAI_CLASS:
             # openai 1.x 버전
+            http_client = http_pool.httpx_client()
+            client_options = {"http_client": http_client} if http_client else {}
+            if http_client:
+                http_pool.register(azure_endpoint, http_client)
             if azure_api_key:
                 # API 키 인증
                 self.client = AzureOpenAI(
                     api_version=api_version,
                     azure_endpoint=azure_endpoint,
                     api_key=azure_api_key,
+                    **client_options,
                 )
             else:
                 # 암호 없는 인증 (Managed Identity 등)
@@ -126,6 +231,7 @@ class ChipiBrain:
                         azure_ad_token_provider=lambda: credential.get_token(
                             "https://cognitiveservices.azure.com/.default"
                         ).token,
+                        **client_options,
                     )
                 except ImportError:
                     raise ValueError("azure-identity 패키지가 필요합니다.")
@@ -137,10 +243,23 @@ class ChipiBrain:
             openai.api_base = azure_endpoint
             openai.api_key = azure_api_key
             openai.api_version = api_version
+            openai.requestssession = http_pool.session()
+            http_pool.register(azure_endpoint)
             self.client = None  # 0.28.x에서는 클라이언트 객체가 없음
 
         self.deployment_name = deployment_name
-        self.messages = self.load_memory()
+
+        # 대화 히스토리: 최근 대화는 원문, 오래된 대화는 요약 (core/conversation_memory.py)
+        self.memory_token_budget = int(
+            os.environ.get("MEMORY_TOKEN_BUDGET", str(TOKEN_BUDGET))
+        )
+        self.memory_keep_turns = int(
+            os.environ.get("MEMORY_KEEP_TURNS", str(KEEP_TURNS))
+        )
+        # 대화 journal (append-only, core/conversation_journal.py). memory.txt가 있으면 한 번 옮김
+        self._init_memory(
+            os.environ.get("MEMORY_JOURNAL", "memory.jsonl"), legacy_path="memory.txt"
+        )
 
         # ==========================================
         # 3. 데이터베이스 초기화
@@ -179,154 +298,404 @@ class ChipiBrain:
             "chipi": os.environ.get("SYSTEM_PROMPT_CHIPI"),
         }
 
-    def load_memory(self):
-        """대화 히스토리 로드"""
-        history_file = "memory.txt"
-        messages = []
+        # ==========================================
+        # 4. 최신 센서 데이터 (서버 메모리 캐시)
+        # ==========================================
+        # 서버의 GET /devices/{serial}/sensor/latest를 먼저 보고, 실패하거나
+        # 값이 SENSOR_LATEST_MAX_AGE초보다 오래됐으면 DB에서 조회
+        self.server_url = os.environ.get("SERVER_URL")
+        http_pool.register(self.server_url)
+        self.sensor_latest_max_age = float(
+            os.environ.get("SENSOR_LATEST_MAX_AGE", "900")
+        )
+        # 마지막 응답의 (DB 왕복 횟수, DB 시간 초, 캐시 hit, 캐시 miss)
+        self.last_db_stats = None
 
-        if os.path.exists(history_file):
-            try:
-                with open(history_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        if ":" in line:
-                            # 첫 번째 콜론만 분리 (내용에 콜론이 있을 수 있으므로)
-                            role, content = line.split(":", 1)
-                            messages.append(
-                                {"role": role.strip(), "content": content.strip()}
-                            )
-            except Exception as e:
-                print(f"히스토리 로드 오류: {e}")
+        # ==========================================
+        # 5. 응답 캐시 (core/response_cache.py)
+        # ==========================================
+        # 반복되는 짧은 질문은 모아 둔 응답 중 하나로 LLM 호출 없이 답함
+        self.response_cache = ResponseCache()
+        # 이번 질문의 캐시 key (_prepare_messages가 정함, 캐시하지 않으면 None)
+        self.response_cache_key = None
+
+        # ==========================================
+        # 6. 비동기 처리 (await brain.reply(...))
+        # ==========================================
+        # 사용자 / 디바이스 / 센서 조회는 context_executor에서 동시에,
+        # LLM 요청은 조회에 밀리지 않도록 별도 스레드에서
+        self.context_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("CONTEXT_WORKERS", str(CONTEXT_WORKERS))),
+            thread_name_prefix="chipi-context",
+        )
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=llm_workers, thread_name_prefix="chipi-llm"
+        )
+        self.optional_context_wait = float(
+            os.environ.get("OPTIONAL_CONTEXT_WAIT", str(OPTIONAL_CONTEXT_WAIT))
+        )
+        # 동기 API(wait_run 등)가 쓰는 이벤트 루프
+        self.loop = asyncio.new_event_loop()
+        self.loop_lock = threading.Lock()
+
+        # session()으로 만든 디바이스 세션이면 True (공유 자원을 닫지 않음)
+        self.is_session = False
+        # create_new_memory 때 지울 컨텍스트 캐시의 디바이스 (None이면 전체)
+        self.device_serial = None
+
+    def _init_memory(self, journal_path, legacy_path=None):
+        """대화 히스토리 상태를 만들고 journal에서 불러옴 (__init__, session 공용)"""
+        # self.messages / self.summary는 요약 스레드와 같이 바꾸므로 lock 안에서 수정
+        self.memory_lock = threading.Lock()
+        self.summary_thread = None
+        self.summary = ""
+        self.journal = ConversationJournal(journal_path)
+        if legacy_path and self.journal.import_legacy(legacy_path):
+            print(f"📝 {legacy_path}를 대화 journal로 옮김")
+        # self.messages 중 journal에 이미 쓴 메시지 수 (system 제외)
+        self.saved_count = 0
+        self.messages = self.load_memory()
 
+    def session(self, journal_path, device_serial, system_prompt=None, ai_name="chipi"):
+        """
+        디바이스 하나의 대화 세션 (core/brain_server.py용)
+
+        LLM 클라이언트, DB 연결, 컨텍스트 / LLM 실행기는 이 ChipiBrain과 같이 쓰고
+        대화 히스토리(journal), 페르소나(시스템 프롬프트), 응답 캐시, 이벤트 루프는 따로 둔다.
+        컨텍스트 캐시는 DatabaseManager가 디바이스별로 들고 있다.
+        한 세션에는 한 번에 한 턴만 보낸다 (호출하는 쪽에서 lock).
+
+        Args:
+            journal_path: 이 디바이스의 대화 journal 경로
+            device_serial: 디바이스 시리얼 (create_new_memory는 이 디바이스 컨텍스트만 지움)
+            system_prompt: ai_name 페르소나의 시스템 프롬프트 (None이면 .env 값)
+        """
+        brain = copy.copy(self)
+        brain.is_session = True
+        brain.device_serial = device_serial
+        brain.system_prompts = dict(self.system_prompts)
+        if system_prompt:
+            brain.system_prompts[ai_name] = system_prompt
+        brain.last_db_stats = None
+        brain.response_cache = ResponseCache()
+        brain.response_cache_key = None
+        brain.loop = asyncio.new_event_loop()
+        brain.loop_lock = threading.Lock()
+        brain._init_memory(journal_path)
+        return brain
+
+    def load_memory(self):
+        """대화 히스토리 로드 (journal 끝에서 요약 + 대화 창에 필요한 최근 메시지만)"""
+        try:
+            # 다음 요청 창(keep_turns턴) + 요약 스레드가 접을 여유 한 턴
+            summary, messages = self.journal.load_tail(
+                2 * (self.memory_keep_turns + 1)
+            )
+        except Exception as e:
+            print(f"히스토리 로드 오류: {e}")
+            return []
+        self.summary = summary
+        self.saved_count = len(messages)
         return messages
 
+    def _save_locked(self):
+        """아직 journal에 쓰지 않은 메시지를 덧붙임 (memory_lock 안에서 호출)"""
+        history = self.messages[self._history_offset() :]
+        # 시스템 메시지는 저장하지 않음 (매번 설정에 따라 달라질 수 있으므로)
+        for msg in history[self.saved_count :]:
+            self.journal.append(msg["role"], msg["content"])
+        self.saved_count = len(history)
+
     def save_memory(self):
-        """대화 히스토리 저장"""
-        history_file = "memory.txt"
+        """대화 히스토리 저장 (새 메시지만 journal에 덧붙임)"""
         try:
-            with open(history_file, "w", encoding="utf-8") as f:
-                for msg in self.messages:
-                    # 시스템 메시지는 저장하지 않음 (매번 설정에 따라 달라질 수 있으므로)
-                    if msg.get("role") != "system":
-                        # 줄바꿈 문자가 있을 경우 파일 형식이 깨질 수 있으므로 replace 처리 등을 고려할 수 있음
-                        clean_content = msg["content"].replace("\n", " ")
-                        f.write(f"{msg['role']}:{clean_content}\n")
+            with self.memory_lock:
+                self._save_locked()
         except Exception as e:
             print(f"히스토리 저장 오류: {e}")
 
     def create_new_memory(self):
         """새 대화 히스토리 생성 (초기화)"""
-        self.messages = []
-        # 파일을 비움
-        with open("memory.txt", "w", encoding="utf-8") as f:
-            pass
+        with self.memory_lock:
+            self.messages = []
+            self.summary = ""
+            self.saved_count = 0
+            # journal 파일을 비움
+            self.journal.reset()
+        # 새 대화 (다른 사용자일 수 있음): 캐시된 사용자 / 디바이스 정보와 응답도 버림
+        self.invalidate_context(self.device_serial)
+        self.response_cache.invalidate()
+
+    def invalidate_context(self, device_serial=None):
+        """컨텍스트 캐시(사용자 / 디바이스 / 센서) 삭제. device_serial이 없으면 전체"""
+        if getattr(self, "db_manager", None):
+            self.db_manager.invalidate_context(device_serial)
 
     def add_msg(self, msg):
         """사용자 메시지 추가"""
-        self.messages.append({"role": "user", "content": msg})
+        with self.memory_lock:
+            self.messages.append({"role": "user", "content": msg})
+
+    def _history_offset(self):
+        """self.messages에서 system 메시지를 뺀 히스토리의 시작 index"""
+        if self.messages and self.messages[0].get("role") == "system":
+            return 1
+        return 0
+
+    def _request_messages(self, system_content=None, pending_user=None):
+        """API에 보낼 messages: system(+ 이전 대화 요약) + 토큰 예산 안의 최근 대화 원문
+
+        미리 요청(speculate)은 self.messages를 바꾸지 않고 system_content(시스템 프롬프트)와
+        pending_user(아직 add_msg하지 않은 사용자 메시지)를 넘긴다.
+        """
+        with self.memory_lock:
+            offset = self._history_offset()
+            history = self.messages[offset:]
+            if pending_user is not None:
+                history = history + [{"role": "user", "content": pending_user}]
+            start = window_start(
+                history, self.memory_token_budget, self.memory_keep_turns
+            )
+            window = history[start:]
+            if system_content is not None:
+                system = {"role": "system", "content": system_content}
+            else:
+                system = dict(self.messages[0]) if offset else None
+            summary = self.summary
+
+        if system is not None and summary:
+            system["content"] += f"\n\n## 이전 대화 요약\n{summary}"
+        tokens = sum(message_tokens(m) for m in window)
+        print(
+            f"📝 히스토리: {len(history)}개 중 최근 {len(window)}개 전송 "
+            f"(약 {tokens} 토큰), 요약 {len(summary)}자"
+        )
+        return ([system] if system is not None else []) + window
+
+    def _create_completion(self, messages, max_tokens):
+        """스트리밍 없는 chat completion. (content, finish_reason) 반환"""
+        if HAS_AZURE_OPENAI_CLASS:
+            # openai 1.x 버전
+            response = self.client.chat.completions.create(
+                model=self.deployment_name,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.3,
+            )
+            choice = response.choices[0]
+            return choice.message.content, choice.finish_reason
+        # openai 0.28.x 버전
+        response = openai.ChatCompletion.create(
+            engine=self.deployment_name,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.3,
+        )
+        choice = response["choices"][0]
+        return choice["message"].get("content"), choice.get("finish_reason")
+
+    def summarize_in_background(self):
+        """창 밖으로 밀려난 오래된 대화를 별도 스레드에서 요약에 접음
+
+        응답 생성 중에는 요청 크기만 줄이고(_request_messages), 요약 LLM 호출은
+        응답을 다 말한 뒤 이 메서드로 한다. 접을 대화가 없거나 이미 요약 중이면
+        아무것도 하지 않는다.
+
+        Returns:
+            시작한 요약 스레드 또는 None
+        """
+        if self.summary_thread is not None and self.summary_thread.is_alive():
+            return None
+        with self.memory_lock:
+            history = self.messages[self._history_offset() :]
+            # 다음 요청에서는 새 user 메시지가 한 턴을 차지하므로 한 턴 적게 남김
+            start = window_start(
+                history, self.memory_token_budget, max(1, self.memory_keep_turns - 1)
+            )
+            if start > 0:
+                folded = history[: fold_count(history, start)]
+            elif self.journal.needs_compaction():
+                folded = []
+            else:
+                return None
+            summary = self.summary
+
+        self.summary_thread = threading.Thread(
+            target=self._fold_into_summary, args=(summary, folded), daemon=True
+        )
+        self.summary_thread.start()
+        return self.summary_thread
+
+    def _fold_into_summary(self, summary, folded):
+        """요약 스레드: folded 메시지를 요약에 합치고 히스토리에서 제거, 필요하면 journal compaction"""
+        if folded:
+            self._summarize(summary, folded)
+        if self.journal.needs_compaction():
+            try:
+                before, after = self.journal.compact()
+                print(f"📝 대화 journal 정리: {before:,} -> {after:,} bytes")
+            except Exception as e:
+                print(f"⚠️  대화 journal 정리 오류: {e}")
+
+    def _summarize(self, summary, folded):
+        try:
+            new_summary, finish_reason = self._create_completion(
+                summary_request(summary, folded), SUMMARY_MAX_TOKENS
+            )
+        except Exception as e:
+            print(f"⚠️  대화 요약 오류: {e}")
+            return
+
+        if finish_reason == "content_filter" or not new_summary:
+            # 같은 메시지로 매번 다시 시도하지 않도록 요약 없이 버림
+            print("⚠️  대화 요약 실패 (콘텐츠 필터 또는 빈 응답): 기존 요약 유지")
+            new_summary = summary
+
+        with self.memory_lock:
+            offset = self._history_offset()
+            # 그 사이 create_new_memory 등으로 히스토리가 바뀌었으면 버림
+            if self.messages[offset : offset + len(folded)] != folded:
+                return
+            # 접을 메시지가 journal에 먼저 있어야 요약 레코드의 순번(upto)이 맞음
+            self._save_locked()
+            del self.messages[offset : offset + len(folded)]
+            self.saved_count -= len(folded)
+            self.summary = new_summary.strip()
+            try:
+                self.journal.append_summary(self.summary, len(folded))
+            except Exception as e:
+                print(f"히스토리 저장 오류: {e}")
+        print(f"📝 대화 {len(folded)}개를 요약에 합침 (요약 {len(self.summary)}자)")
+
+    def get_sensor_data(self, device_serial):
+        """최신 센서 데이터 (temperature, humidity 포함) 조회
+
+        서버가 메모리에 들고 있는 마지막 reading을 먼저 사용하고, 서버에 없거나
+        오래된 값이면 DB(get_sensor_data_by_serial)로 돌아간다.
+        """
+        if self.server_url:
+            url = f"{self.server_url}/devices/{device_serial}/sensor/latest"
+            try:
+                response = http_pool.session().get(url, timeout=1)
+                if response.status_code == 200:
+                    data = response.json()
+                    if data.get("age", float("inf")) <= self.sensor_latest_max_age:
+                        # DB 행과 같은 모양으로 (build_context의 측정시간 표시용)
+                        data["created_at"] = datetime.fromtimestamp(data["timestamp"])
+                        return data
+            except (requests.exceptions.RequestException, ValueError):
+                pass
+
+        if self.db_manager:
+            return self.db_manager.get_sensor_data_by_serial(device_serial)
+        return None
 
     def get_run_id(self, ai_name):
         """호환성을 위한 메서드"""
         return ai_name
 
-    def wait_run(self, ai_name, device_serial=None):
-        """AI 응답 생성 및 반환
+    def _run_sync(self, coro):
+        """코루틴을 ChipiBrain 전용 이벤트 루프에서 끝까지 실행 (동기 API용)
 
-        Args:
-            ai_name: AI 페르소나 이름 (chipi, jarvis_4 등)
-            device_serial: 디바이스 시리얼 (DB 컨텍스트 추가용, 선택사항)
+        루프를 닫지 않고 계속 쓰므로, 선택 컨텍스트처럼 이번 턴에 기다리지 않은 조회도
+        다음 실행 때 마저 정리된다. 이미 이벤트 루프가 도는 스레드에서는 await brain.reply(...)를 쓴다.
         """
-        # 0. 최근 사용자 메시지 가져오기
-        last_user_msg = ""
-        for msg in reversed(self.messages):
-            if msg.get("role") == "user":
-                last_user_msg = msg.get("content", "").lower()
-                break
+        with self.loop_lock:
+            return self.loop.run_until_complete(coro)
 
-        # 0-1. 특정 상황 감지 및 시스템 프롬프트 수정 (LLM이 다양하게 응답하도록)
-        user_name = None
-        special_context = ""
+    def _call_logged(self, func, *args):
+        """컨텍스트 조회 1건 (executor 스레드). 오류는 출력하고 None"""
+        try:
+            return func(*args)
+        except Exception as e:
+            print(f"❌ 컨텍스트 조회 오류 ({func.__name__}): {e}")
+            return None
 
-        if device_serial and self.db_manager:
-            user_info = self.db_manager.get_user_by_device_serial(device_serial)
-            user_name = user_info.get("name") if user_info else None
+    async def _gather_context(self, device_serial, found):
+        """
+        사용자 / 디바이스 / 센서(필수)와 센서 추세 / 최근 로그(선택)를 동시에 조회
+
+        필수 항목이 다 모이면 선택 항목은 optional_context_wait초만 더 기다린다.
+        그때까지 안 온 항목은 None으로 두고 LLM 요청을 시작한다 (조회는 계속되어
+        컨텍스트 캐시에 들어가므로 다음 턴에는 바로 쓰인다).
+
+        Returns:
+            (user, device_info, sensor_data, recent_sensor_data, recent_logs)
+        """
+        if not device_serial:
+            return None, None, None, None, None
+        loop = asyncio.get_event_loop()
+        db = self.db_manager
+
+        def run(func, *args):
+            return loop.run_in_executor(
+                self.context_executor, self._call_logged, func, *args
+            )
+
+        # 센서: DB 컨텍스트에 항상 들어가고, DB가 없어도 온습도 / 상태 질문에는 필요
+        sensor = None
+        if db or found & SENSOR_QUESTION_CATEGORIES:
+            sensor = run(self.get_sensor_data, device_serial)
+        if not db:
+            return None, None, (await sensor if sensor else None), None, None
+
+        user = run(db.resolve_user, device_serial)
+        device = run(db.get_device_info, device_serial)
+        trend = run(db.get_latest_sensor_data, device_serial, 3)
+
+        async def recent_logs():
+            # 로그는 user_id가 필요하므로 사용자 조회가 끝나면 바로 시작
+            user_info = await user
+            user_id = user_info.get("id") if user_info else None
+            if not user_id:
+                return None
+            return await run(db.get_recent_logs, user_id, 3)
+
+        logs = asyncio.ensure_future(recent_logs())
+
+        user_info, device_info, sensor_data = await asyncio.gather(
+            user, device, sensor
+        )
+        _, pending = await asyncio.wait(
+            [trend, logs], timeout=self.optional_context_wait
+        )
+        if pending:
+            print(f"⏩ 선택 컨텍스트 {len(pending)}건 없이 진행 (다음 턴에 캐시에서 사용)")
+        return (
+            user_info,
+            device_info,
+            sensor_data,
+            trend.result() if trend.done() else None,
+            logs.result() if logs.done() else None,
+        )
+
+    @staticmethod
+    def _special_context(found, sensor_data):
+        """특별 상황 감지 결과로 시스템 프롬프트에 덧붙일 지시 (LLM이 다양하게 응답하도록)"""
+        special_context = ""
 
         # 물 주기 표현 감지
-        if any(
-            k in last_user_msg for k in ["물 줄게", "물 줘", "물을 줄게", "물을 줘"]
-        ):
+        if "water" in found:
             special_context += "## 특별 상황: user가 물을 주려고 해!\n감사를 표현하고 user의 건강을 먼저 생각해줘. 다양하게 응답해.\n"
 
         # 아침 인사/잘잤어 질문 감지
-        if any(
-            k in last_user_msg
-            for k in [
-                "잘잤어",
-                "잘 잤어",
-                "잘자",
-                "잘 잤니",
-                "아침이야",
-                "좋은 아침",
-                "안녕",
-                "일어났어",
-            ]
-        ):
+        if "greeting" in found:
             special_context += "## 특별 상황: user가 아침 인사를 하고 있어!\n좋은 아침 인사를 하고, 물을 준 것에 감사하며, 컨디션이 좋다고 말하고 응원해줘. 예: '좋은 아침! 어제 물 줘서 오늘 컨디션 최고야. 오늘도 힘내!' 이런 식으로 응답해.\n"
 
         # 잘 있었는지 질문 감지
-        if any(
-            k in last_user_msg
-            for k in [
-                "잘 있었어",
-                "잘 지냈어",
-                "어떻게 지냈어",
-                "뭐했어",
-                "어디갔어",
-                "다녀왔어",
-            ]
-        ):
+        if "missed" in found:
             special_context += "## 특별 상황: user가 잘 있었는지 물어봤어!\n반가움을 표현하고 보고 싶었다는 감정을 자연스럽게 말해줘. 예: '잘 다녀왔어? 너무 보고 싶었어~' 이런 식으로 응답해.\n"
 
-        # 힘들다는 표현 감지 (짧게 공감)
-        if any(
-            k in last_user_msg
-            for k in ["힘들어", "힘들", "어려워", "막막해", "지쳐", "피곤"]
-        ) and not any(
-            k in last_user_msg
-            for k in [
-                "죽고",
-                "자살",
-                "끝내고",
-                "절망",
-                "극도로 힘들",
-                "살기싫",
-                "뛰어내리",
-            ]
-        ):
+        # 힘들다는 표현 감지 (짧게 공감, 위기 표현이 있으면 제외)
+        if "tired" in found and "sad_tone" not in found:
             special_context += "## 특별 상황: user가 힘들다고 말하고 있어!\n짧게 공감해줘. 예: '요즘 많이 힘들구나..' 이런 식으로 간단하게 공감 표현해.\n"
 
         # 온습도 관련 키워드 감지
-        has_temp_keyword = any(
-            k in last_user_msg for k in ["온도", "따뜻", "더워", "추워"]
-        )
-        has_humidity_keyword = any(k in last_user_msg for k in ["습도", "건조", "말라"])
-        has_temp_humidity_keyword = any(
-            k in last_user_msg
-            for k in ["온습도", "온도 습도", "온도와 습도", "온도 습도 알려줘"]
-        )
+        has_temp_keyword = "temperature" in found
+        has_humidity_keyword = "humidity" in found
+        has_temp_humidity_keyword = "temp_humidity" in found
         # 상태 질문 감지 (더 구체적인 패턴으로)
-        has_status_keyword = any(
-            k in last_user_msg
-            for k in [
-                "상태 어때",
-                "상태 어떠냐",
-                "지금 상태",
-                "네 상태",
-                "너 상태",
-                "상태 어떠",
-                "상태 어떤가",
-                "상태가 어때",
-            ]
-        )
+        has_status_keyword = "status" in found
 
         # 온습도 둘 다 묻는 경우 (온습도, 상태 어때 등)
         # 상태 질문은 무조건 온습도 정보를 제공
@@ -336,9 +705,7 @@ class ChipiBrain:
             or (has_temp_keyword and has_humidity_keyword)
         )
 
-        # 온습도 둘 다 묻는 경우 (온습도, 상태 어때 등)
-        if ask_for_both and device_serial and self.db_manager:
-            sensor_data = self.db_manager.get_sensor_data_by_serial(device_serial)
+        if ask_for_both:
             if sensor_data:
                 temp = sensor_data.get("temperature")
                 humidity = sensor_data.get("humidity")
@@ -351,19 +718,57 @@ class ChipiBrain:
 
         # 온도만 묻는 경우 (상태 질문이 아닐 때만)
         elif has_temp_keyword and not has_humidity_keyword and not has_status_keyword:
-            if device_serial and self.db_manager:
-                sensor_data = self.db_manager.get_sensor_data_by_serial(device_serial)
-                if sensor_data and sensor_data.get("temperature") is not None:
-                    temp = sensor_data.get("temperature")
-                    special_context += f"## 특별 상황: user가 온도를 묻고 있어!\n현재 온도는 {temp}도야. 이 정보를 바탕으로 다양하게 응답해.\n"
+            if sensor_data and sensor_data.get("temperature") is not None:
+                temp = sensor_data.get("temperature")
+                special_context += f"## 특별 상황: user가 온도를 묻고 있어!\n현재 온도는 {temp}도야. 이 정보를 바탕으로 다양하게 응답해.\n"
 
         # 습도만 묻는 경우 (상태 질문이 아닐 때만)
         elif has_humidity_keyword and not has_temp_keyword and not has_status_keyword:
-            if device_serial and self.db_manager:
-                sensor_data = self.db_manager.get_sensor_data_by_serial(device_serial)
-                if sensor_data and sensor_data.get("humidity") is not None:
-                    humidity = sensor_data.get("humidity")
-                    special_context += f"## 특별 상황: user가 습도를 묻고 있어!\n현재 습도는 {humidity}%야. 이 정보를 바탕으로 다양하게 응답해.\n"
+            if sensor_data and sensor_data.get("humidity") is not None:
+                humidity = sensor_data.get("humidity")
+                special_context += f"## 특별 상황: user가 습도를 묻고 있어!\n현재 습도는 {humidity}%야. 이 정보를 바탕으로 다양하게 응답해.\n"
+
+        return special_context
+
+    async def _build_system_prompt_async(
+        self, ai_name, device_serial=None, user_text=None
+    ):
+        """특별 상황 감지 + DB 컨텍스트로 시스템 프롬프트를 만듦 (self.messages는 바꾸지 않음)
+
+        Args:
+            user_text: 응답할 사용자 메시지. None이면 히스토리의 마지막 user 메시지
+                (미리 요청은 아직 add_msg하지 않은 STT 중간 결과를 넘김)
+
+        Returns:
+            (최종 시스템 프롬프트, 응답 캐시 key)
+        """
+        db_before = self.db_manager.stats() if self.db_manager else None
+        gather_start = time.perf_counter()
+
+        # 0. 최근 사용자 메시지 가져오기
+        last_user_msg = ""
+        if user_text is not None:
+            last_user_msg = user_text.lower()
+        else:
+            with self.memory_lock:
+                for msg in reversed(self.messages):
+                    if msg.get("role") == "user":
+                        last_user_msg = msg.get("content", "").lower()
+                        break
+
+        # 0-1. 특별 상황 키워드는 한 번에 검사 (constants.KEYWORD_CATEGORIES)
+        found = match_categories(last_user_msg)
+
+        # 0-2. 사용자 / 디바이스 / 센서 컨텍스트 동시 조회
+        (
+            user,
+            device_info,
+            sensor_data,
+            recent_sensor_data,
+            recent_logs,
+        ) = await self._gather_context(device_serial, found)
+        user_name = user.get("name") if user else None
+        special_context = self._special_context(found, sensor_data)
 
         # 1. 선택된 AI의 시스템 프롬프트 가져오기
         system_prompt = self.system_prompts.get(
@@ -373,7 +778,13 @@ class ChipiBrain:
         # 2. DB 컨텍스트 추가 (device_serial이 있을 경우)
         db_context = ""
         if device_serial and self.db_manager:
-            db_context, user_name = self.db_manager.build_context(device_serial)
+            try:
+                db_context = self.db_manager.format_context(
+                    sensor_data, device_info, recent_sensor_data, recent_logs
+                )
+            except Exception as e:
+                print(f"❌ 컨텍스트 생성 오류: {e}")
+                user_name = None
 
         # 최종 시스템 프롬프트 (DB 정보 포함)
         final_system_prompt = system_prompt
@@ -400,22 +811,170 @@ class ChipiBrain:
             final_system_prompt += "\n\n## 일반 대화 모드\nuser와 자연스럽게 대화해. 친근하게 질문하고 관심 보여줘."
             print("📝 일반 대화 모드")
 
-        # 3. 시스템 메시지 처리
+        response_cache_key = self._response_cache_key(
+            last_user_msg,
+            found,
+            ai_name,
+            device_serial,
+            user_name,
+            sensor_data,
+            pending=user_text is not None,
+        )
+
+        # 이번 응답의 DB 왕복 (컨텍스트 캐시 hit이면 왕복 없음). 조회는 동시에 하므로
+        # DB 시간 합계가 컨텍스트 수집 시간보다 길 수 있음
+        if db_before is not None:
+            queries, seconds, hits, misses = (
+                after - before
+                for after, before in zip(self.db_manager.stats(), db_before)
+            )
+            self.last_db_stats = (queries, seconds, hits, misses)
+            print(
+                f"🗄️  컨텍스트 수집 {(time.perf_counter() - gather_start) * 1000:.0f} ms: "
+                f"DB 조회 {queries}회 (합계 {seconds * 1000:.0f} ms), "
+                f"컨텍스트 캐시 hit {hits} / miss {misses}"
+            )
+
+        return final_system_prompt, response_cache_key
+
+    async def _prepare_messages_async(self, ai_name, device_serial=None):
+        """시스템 프롬프트를 만들어 self.messages[0]에 넣고 이번 질문의 응답 캐시 key를 정함
+
+        reply, wait_run, wait_run_stream 공용. 최종 시스템 프롬프트를 반환한다.
+        """
+        final_system_prompt, response_cache_key = (
+            await self._build_system_prompt_async(ai_name, device_serial)
+        )
+        self._install_system_prompt(final_system_prompt, response_cache_key)
+        return final_system_prompt
+
+    def _install_system_prompt(self, final_system_prompt, response_cache_key):
         # 현재 메시지 목록에 시스템 메시지가 없거나, 다른 페르소나의 메시지일 수 있으므로
         # 가장 첫 번째 메시지가 system인지 확인하고 교체하거나 추가합니다.
-        if self.messages and self.messages[0].get("role") == "system":
-            self.messages[0] = {"role": "system", "content": final_system_prompt}
-        else:
-            self.messages.insert(0, {"role": "system", "content": final_system_prompt})
+        with self.memory_lock:
+            if self.messages and self.messages[0].get("role") == "system":
+                self.messages[0] = {"role": "system", "content": final_system_prompt}
+            else:
+                self.messages.insert(
+                    0, {"role": "system", "content": final_system_prompt}
+                )
+        self.response_cache_key = response_cache_key
+
+    def _prepare_messages(self, ai_name, device_serial=None):
+        """_prepare_messages_async의 동기 버전 (wait_run_stream, 벤치마크용)"""
+        return self._run_sync(self._prepare_messages_async(ai_name, device_serial))
+
+    def _response_cache_key(
+        self,
+        last_user_msg,
+        found,
+        ai_name,
+        device_serial,
+        user_name,
+        sensor_data,
+        pending=False,
+    ):
+        """이번 질문의 응답 캐시 key (캐시하지 않을 질문이면 None)
+
+        pending: 질문이 아직 히스토리에 없음 (미리 요청)
+        """
+        # 위기 표현에는 매번 새로 응답
+        if "sad_tone" in found:
+            return None
+        # 치피가 되물은 말에 대한 대답("응", "좋아")은 앞 대화에 따라 뜻이 달라짐
+        with self.memory_lock:
+            history = self.messages[self._history_offset() :]
+        previous = history if pending else history[:-1]
+        if (
+            previous
+            and previous[-1].get("role") == "assistant"
+            and previous[-1].get("content", "").rstrip().endswith("?")
+        ):
+            return None
+        bucket = None
+        if found & SENSOR_QUESTION_CATEGORIES:
+            bucket = sensor_bucket(sensor_data)
+        return self.response_cache.key(
+            last_user_msg, (ai_name, device_serial, user_name, bucket)
+        )
+
+    def _cached_reply(self):
+        """응답 캐시 hit이면 캐시된 응답 (히스토리에 추가하고 저장), miss면 None"""
+        if self.response_cache_key is None:
+            return None
+        cache = self.response_cache
+        reply = cache.get(self.response_cache_key)
+        print(
+            f"💾 응답 캐시 {'hit' if reply else 'miss'} "
+            f"(hit rate {cache.hit_rate():.0%}, {cache.hits}/{cache.hits + cache.misses})"
+        )
+        if reply is None:
+            return None
+        with self.memory_lock:
+            self.messages.append({"role": "assistant", "content": reply})
+        self.save_memory()
+        return reply
+
+    async def reply(self, user_text=None, ai_name="chipi", device_serial=None):
+        """AI 응답 생성 및 반환 (asyncio)
+
+        컨텍스트(사용자 / 디바이스 / 센서)를 동시에 조회하고, 필수 항목이 모이는 대로
+        LLM 요청을 시작한다. 같은 ChipiBrain(대화 히스토리 하나)에 reply를 동시에 여러 번
+        부르지 않는다.
+
+            brain = ChipiBrain()
+            answer = await brain.reply("상태 어때?", device_serial=serial)
+
+        Args:
+            user_text: 사용자 메시지 (None이면 add_msg로 이미 추가한 메시지에 응답)
+            ai_name: AI 페르소나 이름 (chipi, jarvis_4 등)
+            device_serial: 디바이스 시리얼 (DB 컨텍스트 추가용, 선택사항)
+        """
+        if user_text is not None:
+            self.add_msg(user_text)
+        final_system_prompt = await self._prepare_messages_async(ai_name, device_serial)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.llm_executor, self._complete_reply, final_system_prompt
+        )
+
+    def wait_run(self, ai_name, device_serial=None, speculation=None):
+        """AI 응답 생성 및 반환 (reply의 동기 wrapper, main_*.py용)
+
+        Args:
+            ai_name: AI 페르소나 이름 (chipi, jarvis_4 등)
+            device_serial: 디바이스 시리얼 (DB 컨텍스트 추가용, 선택사항)
+            speculation: 이번 사용자 메시지로 미리 시작한 요청 (Speculator.take, 선택사항)
+        """
+        if speculation is not None and self._adopt_speculation(speculation):
+            events = self._stream_reply(
+                self._speculation_chunks(speculation),
+                speculation.system_prompt,
+                speculation.request_messages,
+            )
+            while True:
+                try:
+                    next(events)
+                except StopIteration as stop:
+                    return stop.value
+        return self._run_sync(self.reply(None, ai_name, device_serial))
+
+    def _complete_reply(self, final_system_prompt):
+        """시스템 프롬프트가 준비된 뒤의 응답 생성 (응답 캐시 -> LLM 요청 -> 히스토리 저장)"""
+        cached = self._cached_reply()
+        if cached is not None:
+            print(f"✓ 응답 메시지 (캐시): {cached}")
+            return cached
+        request_messages = self._request_messages()
 
         try:
-            print(f"📤 API 요청 중... (메시지 개수: {len(self.messages)})")
+            print(f"📤 API 요청 중... (메시지 개수: {len(request_messages)})")
 
             if HAS_AZURE_OPENAI_CLASS:
                 # openai 1.x 버전
                 response = self.client.chat.completions.create(
                     model=self.deployment_name,
-                    messages=self.messages,
+                    messages=request_messages,
                     max_tokens=100,
                     temperature=0.7,  # 치피의 감성적인 대화를 위해 약간 높임
                     top_p=1.0,
@@ -438,14 +997,14 @@ class ChipiBrain:
                 # finish_reason이 content_filter인 경우 처리
                 if finish_reason == "content_filter":
                     print("⚠️  콘텐츠 필터에 의해 응답이 차단되었습니다.")
-                    assistant_message = "어, 그건 제가 도와드리기 어려운 것 같아요. 다른 걸 말씀해 주실 수 있을까요?"
+                    assistant_message = CONTENT_FILTER_MESSAGE
                 else:
                     assistant_message = response.choices[0].message.content
             else:
                 # openai 0.28.x 버전
                 response = openai.ChatCompletion.create(
                     engine=self.deployment_name,
-                    messages=self.messages,
+                    messages=request_messages,
                     max_tokens=100,
                     temperature=0.7,
                     top_p=1.0,
@@ -459,7 +1018,7 @@ class ChipiBrain:
                 # finish_reason이 content_filter인 경우 처리
                 if finish_reason == "content_filter":
                     print("⚠️  콘텐츠 필터에 의해 응답이 차단되었습니다.")
-                    assistant_message = "어, 그건 제가 도와드리기 어려운 것 같아요. 다른 걸 말씀해 주실 수 있을까요?"
+                    assistant_message = CONTENT_FILTER_MESSAGE
                 else:
                     assistant_message = response["choices"][0]["message"]["content"]
 
@@ -477,21 +1036,27 @@ class ChipiBrain:
 
                     if current_finish_reason == "content_filter":
                         print("   → 원인: Azure 콘텐츠 필터 (안전 정책 위반)")
-                        assistant_message = "어, 그건 제가 도와드리기 어려운 것 같아요. 다른 걸 말씀해 주실 수 있을까요?"
+                        assistant_message = CONTENT_FILTER_MESSAGE
                     else:
-                        assistant_message = "어, 지금은 잘 모르겠어. 잠시만 기다려줄래?"
+                        assistant_message = EMPTY_RESPONSE_MESSAGE
                 except:
-                    assistant_message = "어, 지금은 잘 모르겠어. 잠시만 기다려줄래?"
+                    assistant_message = EMPTY_RESPONSE_MESSAGE
+            elif finish_reason == "stop":
+                # 끝까지 생성된 정상 응답만 캐시 (max_tokens에서 잘린 응답 제외)
+                self.response_cache.put(self.response_cache_key, assistant_message)
 
             # 응답 추가 및 저장
-            self.messages.append({"role": "assistant", "content": assistant_message})
+            with self.memory_lock:
+                self.messages.append(
+                    {"role": "assistant", "content": assistant_message}
+                )
             self.save_memory()
 
             return assistant_message
 
         except Exception as e:
             error_str = str(e)
-            error_msg = "어, 뭔가 잘못됐나봐. 잠시만 기다려줄래?"
+            error_msg = ERROR_MESSAGE
 
             # 콘텐츠 필터 관련 에러 체크
             if (
@@ -499,17 +1064,255 @@ class ChipiBrain:
                 or "content management policy" in error_str.lower()
             ):
                 print(f"⚠️  콘텐츠 필터 에러: {e}")
-                error_msg = "어, 그건 제가 도와드리기 어려운 것 같아요. 다른 걸 말씀해 주실 수 있을까요?"
+                error_msg = CONTENT_FILTER_MESSAGE
             else:
                 print(f"❌ 응답 생성 오류: {e}")
                 print(f"❌ 최종 시스템 프롬프트:\n{final_system_prompt}\n")
-                print(f"❌ 메시지 목록:\n{self.messages}\n")
+                print(f"❌ 메시지 목록:\n{request_messages}\n")
 
             import traceback
 
             traceback.print_exc()
             return error_msg
 
+    def _stream_chunks(self, messages):
+        """chat completion 스트리밍 요청. (content delta, finish_reason)을 받는 대로 반환
+
+        openai 1.x / 0.28.x 응답 형식 차이를 여기서 맞춘다.
+        Azure는 첫 chunk(prompt_filter_results)처럼 choices가 빈 chunk도 보낸다.
+        generator를 close()하면 스트림도 닫는다.
+        """
+        if HAS_AZURE_OPENAI_CLASS:
+            # openai 1.x 버전
+            stream = self.client.chat.completions.create(
+                model=self.deployment_name,
+                messages=messages,
+                max_tokens=100,
+                temperature=0.7,
+                top_p=1.0,
+                stream=True,
+            )
+        else:
+            # openai 0.28.x 버전
+            stream = openai.ChatCompletion.create(
+                engine=self.deployment_name,
+                messages=messages,
+                max_tokens=100,
+                temperature=0.7,
+                top_p=1.0,
+                stream=True,
+            )
+        try:
+            for chunk in stream:
+                if HAS_AZURE_OPENAI_CLASS:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    delta = getattr(choice, "delta", None)
+                    yield getattr(delta, "content", None), choice.finish_reason
+                else:
+                    if not chunk.get("choices"):
+                        continue
+                    choice = chunk["choices"][0]
+                    delta = choice.get("delta") or {}
+                    yield delta.get("content"), choice.get("finish_reason")
+        finally:
+            # 중간에 그만 받으면 (미리 요청 취소 등) 연결을 바로 닫음
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    def speculate(self, user_text, ai_name="chipi", device_serial=None):
+        """STT 중간 결과로 응답 생성을 미리 시작 (core/speculative_reply.py)
+
+        대화 히스토리, 시스템 메시지, 응답 캐시 key는 바꾸지 않는다. final transcript가
+        같으면 add_msg 뒤에 wait_run / wait_run_stream의 speculation으로 넘겨 쓰고,
+        다르면 Speculation.cancel()로 버린다.
+
+        Returns:
+            Speculation (별도 스레드에서 스트리밍으로 채워짐)
+        """
+        speculation = Speculation(user_text, ai_name, device_serial)
+        threading.Thread(
+            target=self._run_speculation, args=(speculation,), daemon=True
+        ).start()
+        return speculation
+
+    def _run_speculation(self, speculation):
+        """미리 요청 스레드: 컨텍스트 수집 -> 응답 캐시 -> LLM 스트리밍 (취소되면 중단)"""
+        finish_reason = None
+        error = None
+        try:
+            speculation.system_prompt, speculation.cache_key = self._run_sync(
+                self._build_system_prompt_async(
+                    speculation.ai_name, speculation.device_serial, speculation.text
+                )
+            )
+            if speculation.cancelled.is_set():
+                return
+            cached = self.response_cache.get(speculation.cache_key)
+            if cached is not None:
+                speculation.cached = True
+                speculation.push(cached)
+                finish_reason = "stop"
+                return
+            messages = self._request_messages(
+                speculation.system_prompt, speculation.text
+            )
+            speculation.request_messages = messages
+            speculation.prompt_tokens = sum(message_tokens(m) for m in messages)
+            chunks = self._stream_chunks(messages)
+            try:
+                for content, chunk_finish_reason in chunks:
+                    if speculation.cancelled.is_set():
+                        break
+                    if chunk_finish_reason:
+                        finish_reason = chunk_finish_reason
+                    if finish_reason == "content_filter":
+                        break
+                    if content:
+                        speculation.completion_tokens += estimate_tokens(content)
+                        speculation.push(content)
+            finally:
+                chunks.close()
+        except Exception as e:
+            error = e
+        finally:
+            speculation.finish(finish_reason, error)
+
+    def _adopt_speculation(self, speculation):
+        """미리 요청을 이번 응답으로 씀 (시스템 프롬프트, 응답 캐시 key 설치)
+
+        미리 요청이 아무것도 받기 전에 실패했으면 False (wait_run / wait_run_stream이 다시 요청)
+        """
+        if not speculation.usable():
+            print(f"⚠️  미리 요청 실패 ({speculation.error}): 다시 요청")
+            return False
+        self._install_system_prompt(speculation.system_prompt, speculation.cache_key)
+        if speculation.cached:
+            print(f"💾 응답 캐시 hit (미리 요청): {''.join(speculation.parts)}")
+        return True
+
+    @staticmethod
+    def _speculation_chunks(speculation):
+        """미리 요청이 받은 delta를 _stream_chunks와 같은 (content, finish_reason) 형식으로"""
+        for content in speculation.iter_parts():
+            yield content, None
+        if speculation.error is not None:
+            raise speculation.error
+        yield None, speculation.finish_reason
+
+    def wait_run_stream(self, ai_name, device_serial=None, speculation=None):
+        """AI 응답을 스트리밍으로 생성 (wait_run의 스트리밍 버전)
+
+        응답 전체를 기다리지 않고 받는 대로 반환하므로, 첫 문장이 완성되는 즉시
+        TTS를 시작할 수 있다. 다음 두 종류의 이벤트를 순서대로 yield한다.
+            ("delta", 텍스트): API에서 받은 조각 그대로
+            ("sentence", 문장): 완성된 문장 (SentenceSplitter 기준, 마지막 문장은 스트림 끝에)
+
+        콘텐츠 필터 / 빈 응답 / 오류는 wait_run과 같은 문구를 "sentence"로 보낸다.
+        콘텐츠 필터가 응답 중간에 걸리면 이미 보낸 문장은 되돌릴 수 없으므로
+        남은 텍스트를 버리고 필터 문구를 이어서 보낸다.
+        대화 히스토리에는 wait_run과 같은 최종 응답이 저장된다 (오류 시에는 저장하지 않음).
+
+        Args:
+            ai_name: AI 페르소나 이름 (chipi, jarvis_4 등)
+            device_serial: 디바이스 시리얼 (DB 컨텍스트 추가용, 선택사항)
+            speculation: 이번 사용자 메시지로 미리 시작한 요청 (Speculator.take, 선택사항).
+                아직 받는 중이면 받는 대로 이어서 yield
+        """
+        if speculation is not None and self._adopt_speculation(speculation):
+            yield from self._stream_reply(
+                self._speculation_chunks(speculation),
+                speculation.system_prompt,
+                speculation.request_messages,
+            )
+            return
+        final_system_prompt = self._prepare_messages(ai_name, device_serial)
+        splitter = SentenceSplitter()
+        cached = self._cached_reply()
+        if cached is not None:
+            print(f"✓ 응답 메시지 (캐시): {cached}")
+            yield "delta", cached
+            for sentence in splitter.feed(cached):
+                yield "sentence", sentence
+            rest = splitter.flush()
+            if rest:
+                yield "sentence", rest
+            return
+        request_messages = self._request_messages()
+        print(f"📤 API 스트리밍 요청 중... (메시지 개수: {len(request_messages)})")
+        yield from self._stream_reply(
+            self._stream_chunks(request_messages), final_system_prompt, request_messages
+        )
+
+    def _stream_reply(self, chunks, final_system_prompt, request_messages):
+        """(content, finish_reason) chunk를 wait_run_stream 이벤트로 바꾸고 히스토리에 저장
+
+        최종 응답을 반환한다 (generator의 return 값, 오류면 저장하지 않은 오류 문구).
+        """
+        splitter = SentenceSplitter()
+        parts = []
+        finish_reason = None
+        try:
+            for content, chunk_finish_reason in chunks:
+                if chunk_finish_reason:
+                    finish_reason = chunk_finish_reason
+                if finish_reason == "content_filter":
+                    break
+                if content:
+                    parts.append(content)
+                    yield "delta", content
+                    for sentence in splitter.feed(content):
+                        yield "sentence", sentence
+
+            print(f"📥 API 스트리밍 완료: finish_reason={finish_reason}")
+
+        except Exception as e:
+            error_str = str(e)
+            if (
+                "content_filter" in error_str.lower()
+                or "content management policy" in error_str.lower()
+            ):
+                print(f"⚠️  콘텐츠 필터 에러: {e}")
+                error_msg = CONTENT_FILTER_MESSAGE
+            else:
+                print(f"❌ 응답 생성 오류: {e}")
+                print(f"❌ 최종 시스템 프롬프트:\n{final_system_prompt}\n")
+                print(f"❌ 메시지 목록:\n{request_messages}\n")
+                error_msg = ERROR_MESSAGE
+            yield "sentence", error_msg
+
+            import traceback
+
+            traceback.print_exc()
+            return error_msg
+
+        if finish_reason == "content_filter":
+            print("⚠️  콘텐츠 필터에 의해 응답이 차단되었습니다.")
+            assistant_message = CONTENT_FILTER_MESSAGE
+            yield "sentence", assistant_message
+        elif not parts:
+            # wait_run의 content None 처리와 같음
+            print("⚠️  응답이 None입니다! (content 값이 비어있음)")
+            assistant_message = EMPTY_RESPONSE_MESSAGE
+            yield "sentence", assistant_message
+        else:
+            assistant_message = "".join(parts)
+            rest = splitter.flush()
+            if rest:
+                yield "sentence", rest
+            if finish_reason == "stop":
+                self.response_cache.put(self.response_cache_key, assistant_message)
+
+        print(f"✓ 응답 메시지: {assistant_message}")
+
+        # 응답 추가 및 저장
+        with self.memory_lock:
+            self.messages.append({"role": "assistant", "content": assistant_message})
+        self.save_memory()
+        return assistant_message
+
     # def _generate_continuation(self, ai_name, device_serial, system_prompt):
     #     """대화 이어가기용 내부 메서드 (후속 질문/제안 생성)
     #     [대화 이어가기는 system prompt에 포함되어 자동으로 동작함]
@@ -617,12 +1420,23 @@ class ChipiBrain:
     #         return ""
 
     def __del__(self):
-        """소멸자: 데이터베이스 연결 종료"""
-        if hasattr(self, "db_manager") and self.db_manager:
+        """소멸자: 데이터베이스 연결 종료 (세션은 자기 이벤트 루프 / journal만 닫음)"""
+        is_session = getattr(self, "is_session", False)
+        for executor in ("context_executor", "llm_executor"):
+            if hasattr(self, executor) and not is_session:
+                getattr(self, executor).shutdown(wait=False)
+        if hasattr(self, "loop") and not self.loop.is_running():
+            self.loop.close()
+        if hasattr(self, "db_manager") and self.db_manager and not is_session:
             try:
                 self.db_manager.close()
             except:
                 pass
+        if hasattr(self, "journal"):
+            try:
+                self.journal.close()
+            except Exception:
+                pass
 
 
 # ==========================================
@@ -0,0 +1,285 @@
+"""
+대화 히스토리 journal (append-only JSON lines, ChipiBrain용)
+
+memory.txt는 매 턴마다 히스토리 전체를 다시 써서 (SD 카드에 O(히스토리) 쓰기)
+줄바꿈도 공백으로 바뀌었다. journal은 새 메시지만 한 줄씩 덧붙인다.
+
+    {"n": 12, "role": "user", "content": "...", "ts": 1700000000.0}
+    {"summary": "...", "upto": 10, "ts": 1700000000.0}
+
+- n: 메시지 순번 (0부터 계속 증가)
+- summary 레코드: 이전 대화 요약. 순번 upto 미만의 메시지는 이 요약에 접혔으므로 읽지 않는다.
+- fsync는 묶어서 한다: 쓰기는 매번 flush(프로세스가 죽어도 OS에 남음)하고, fsync는
+  마지막 쓰기 후 fsync_interval초 뒤 한 번 (전원이 나가면 그 사이 쓰기만 잃음)
+- 로드할 때는 파일 끝에서부터 필요한 만큼만 읽는다 (최신 요약 + 최근 메시지 max_messages개).
+  창 밖인데 아직 요약되지 않은 메시지는 로드하지 않으므로 요약에서도 빠진다.
+- 쓰다가 전원이 나가서 마지막 줄이 잘렸으면 로드할 때 잘라낸다.
+- compaction: 파일이 compact_bytes를 넘으면 최신 요약 + 살아 있는 메시지만 새 파일에 쓰고
+  os.replace로 바꾼다 (ChipiBrain이 요약 스레드에서 호출).
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+
+FSYNC_INTERVAL = 2.0  # seconds, 마지막 쓰기 후 fsync까지
+COMPACT_BYTES = 256 * 1024  # 파일이 이보다 크면 compaction
+READ_BLOCK = 8192
+
+
+class ConversationJournal:
+    def __init__(
+        self, path, fsync_interval=FSYNC_INTERVAL, compact_bytes=COMPACT_BYTES
+    ):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.sync_timer = None
+        self.next_seq = 0
+        # 메모리(ChipiBrain.messages)에 올라온 첫 메시지의 순번. 요약이 접은 만큼 증가
+        self.memory_start = 0
+        self.compacted_size = 0
+        atexit.register(self.close)
+
+    # --- 로드 ---
+
+    def _repair_tail(self):
+        """마지막 줄이 줄바꿈 없이 끝났으면 (쓰다가 중단) 잘라냄"""
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - READ_BLOCK)
+                f.seek(start)
+                block = f.read(end - start)
+                if end == size and block.endswith(b"\n"):
+                    return
+                newline = block.rfind(b"\n")
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                end = start
+            f.truncate(0)
+
+    def _reversed_lines(self):
+        """파일 끝에서부터 한 줄씩 (bytes)"""
+        with open(self.path, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            rest = b""
+            while end > 0:
+                start = max(0, end - READ_BLOCK)
+                f.seek(start)
+                lines = (f.read(end - start) + rest).split(b"\n")
+                # 블록 첫 줄은 앞 블록과 이어질 수 있으므로 다음 블록으로 넘김
+                rest = lines[0] if start > 0 else b""
+                for line in reversed(lines if start == 0 else lines[1:]):
+                    yield line
+                end = start
+
+    @staticmethod
+    def _parse(line):
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line.decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            return None
+        return record if isinstance(record, dict) else None
+
+    def load_tail(self, max_messages):
+        """
+        최신 요약과 그 뒤의 최근 메시지 max_messages개
+
+        Returns:
+            (요약 문자열, [{"role", "content"}, ...])
+        """
+        with self.lock:
+            if not os.path.exists(self.path):
+                return "", []
+            self._repair_tail()
+
+            summary = None
+            upto = 0
+            last_seq = None
+            messages = []
+            for line in self._reversed_lines():
+                # 메시지를 다 모았으면 요약 레코드를 찾을 때까지 JSON 해석 없이 건너뜀
+                if len(messages) >= max_messages and not line.startswith(b'{"summary"'):
+                    continue
+                record = self._parse(line)
+                if record is None:
+                    continue
+                if "summary" in record:
+                    if summary is None:
+                        summary = record["summary"]
+                        upto = record.get("upto", 0)
+                        self.next_seq = max(self.next_seq, upto)
+                        if len(messages) >= max_messages:
+                            break
+                    continue
+                seq = record.get("n")
+                if seq is None:
+                    continue
+                if last_seq is None:
+                    last_seq = seq
+                if summary is not None and seq < upto:
+                    break
+                if len(messages) < max_messages:
+                    messages.append((seq, record))
+                elif summary is not None:
+                    break
+
+            messages = [(seq, r) for seq, r in messages if seq >= upto]
+            messages.reverse()
+            if last_seq is not None:
+                self.next_seq = max(self.next_seq, last_seq + 1)
+            self.memory_start = messages[0][0] if messages else self.next_seq
+            self.compacted_size = os.path.getsize(self.path)
+            return summary or "", [
+                {"role": r["role"], "content": r["content"]} for _, r in messages
+            ]
+
+    # --- 쓰기 ---
+
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+
+    def _write(self, record):
+        self._open()
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        # fsync는 마지막 쓰기 후 fsync_interval초 뒤 한 번
+        if self.sync_timer is None:
+            self.sync_timer = threading.Timer(self.fsync_interval, self.sync)
+            self.sync_timer.daemon = True
+            self.sync_timer.start()
+
+    def append(self, role, content):
+        with self.lock:
+            self._write(
+                {"n": self.next_seq, "role": role, "content": content, "ts": time.time()}
+            )
+            self.next_seq += 1
+
+    def append_summary(self, summary, folded):
+        """메모리의 앞쪽 메시지 folded개가 요약에 접힘"""
+        with self.lock:
+            self.memory_start = min(self.memory_start + folded, self.next_seq)
+            self._write(
+                {"summary": summary, "upto": self.memory_start, "ts": time.time()}
+            )
+
+    def sync(self):
+        with self.lock:
+            self.sync_timer = None
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        # 닫은 journal을 atexit이 종료 때까지 붙잡지 않게 (두뇌 서버는 세션을 계속 닫고 다시 만듦)
+        atexit.unregister(self.close)
+        with self.lock:
+            if self.sync_timer is not None:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
+
+    def _replace(self, lines):
+        """lines로 파일을 원자적으로 교체 (임시 파일 fsync -> os.replace -> 디렉토리 fsync)"""
+        if self.sync_timer is not None:
+            self.sync_timer.cancel()
+            self.sync_timer = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        try:
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def reset(self):
+        """히스토리 전체 삭제 (새 대화)"""
+        with self.lock:
+            self._replace([])
+            self.next_seq = 0
+            self.memory_start = 0
+            self.compacted_size = 0
+
+    # --- compaction ---
+
+    def needs_compaction(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        # 살아 있는 레코드만으로도 크면 매번 다시 쓰지 않도록 직전 compaction 크기의 2배까지 기다림
+        return size > max(self.compact_bytes, 2 * self.compacted_size)
+
+    def compact(self):
+        """최신 요약 + 아직 접히지 않은 메시지만 남김. 순번은 유지"""
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+            summary = None
+            messages = []
+            with open(self.path, "rb") as f:
+                for line in f:
+                    record = self._parse(line)
+                    if record is None:
+                        continue
+                    if "summary" in record:
+                        summary = record
+                    elif "n" in record:
+                        messages.append(record)
+            upto = summary["upto"] if summary else 0
+            lines = [json.dumps(summary, ensure_ascii=False) + "\n"] if summary else []
+            lines += [
+                json.dumps(r, ensure_ascii=False) + "\n" for r in messages if r["n"] >= upto
+            ]
+            before = os.path.getsize(self.path)
+            self._replace(lines)
+            self.compacted_size = os.path.getsize(self.path)
+            return before, self.compacted_size
+
+    # --- memory.txt 이전 ---
+
+    def import_legacy(self, path):
+        """memory.txt(role:content 줄) 내용을 journal로 옮김. journal이 없을 때만"""
+        if os.path.exists(self.path) or not os.path.exists(path):
+            return False
+        summary = None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if ":" not in line:
+                    continue
+                role, content = line.split(":", 1)
+                if role.strip() == "summary":
+                    summary = content.strip()
+                else:
+                    self.append(role.strip(), content.strip())
+        if summary:
+            # 요약은 memory.txt에 남아 있던 메시지보다 앞의 대화
+            with self.lock:
+                self._write({"summary": summary, "upto": 0, "ts": time.time()})
+        self.sync()
+        return True
@@ -0,0 +1,104 @@
+"""
+대화 히스토리 토큰 예산 관리 (ChipiBrain용)
+
+히스토리를 전부 보내면 대화가 쌓일수록 프롬프트가 커져서 지연과 비용이 계속 늘어난다.
+요청에는 최근 대화만 원문으로 보내고, 그보다 오래된 대화는 요약 한 개로 접는다.
+
+    [system + 이전 대화 요약] + [최근 keep_turns턴 원문 (token_budget 이내)]
+
+- 원문 창(window): 마지막 메시지부터 거꾸로, keep_turns턴과 token_budget을 넘지 않을 때까지.
+  마지막 user 메시지는 예산을 넘어도 항상 포함한다.
+- 창 밖으로 밀려난 메시지는 요약될 때까지 히스토리에 남아 있지만 요청에는 들어가지 않는다.
+  (요약이 늦어도 요청 크기는 항상 예산 안)
+- 요약은 ChipiBrain.summarize_in_background()가 응답을 말한 뒤 별도 스레드에서 만든다.
+  한 번에 fold_tokens 정도씩 접으므로 창 밖에 많이 쌓인 대화도 몇 턴에 걸쳐 줄어든다.
+
+토큰 수는 tiktoken이 있으면 그걸로 세고, 없으면 (라즈베리 파이 제로) 문자 수로 어림한다.
+"""
+
+# tiktoken은 선택사항 (라즈베리 파이 제로에서는 설치하지 않음)
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+TOKEN_BUDGET = 1200  # 요청에 원문으로 넣을 히스토리 토큰 (system 프롬프트 제외)
+KEEP_TURNS = 6  # 원문으로 유지할 최대 턴 수 (user + assistant = 1턴)
+FOLD_TOKENS = 1500  # 요약 한 번에 접을 최대 토큰
+SUMMARY_MAX_CHARS = 400
+SUMMARY_MAX_TOKENS = 400
+MESSAGE_OVERHEAD = 4  # 메시지당 role, 구분자 토큰
+
+SUMMARY_PROMPT = (
+    "너는 대화 기록을 요약하는 도우미야. 기존 요약과 새 대화를 합쳐서 "
+    f"{SUMMARY_MAX_CHARS}자 이내의 한국어 요약 하나로 만들어줘. "
+    "사용자의 이름, 취향, 근황, 약속, 식물(치피)에 대해 한 말처럼 다음 대화에 "
+    "필요한 사실 위주로 남기고, 인사나 잡담은 빼. 요약만 출력해."
+)
+
+
+def estimate_tokens(text):
+    """텍스트 토큰 수 (tiktoken이 없으면 한글 등 비ASCII 1자 = 1토큰, ASCII 4자 = 1토큰으로 어림)"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+def message_tokens(message):
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+def window_start(messages, token_budget=TOKEN_BUDGET, keep_turns=KEEP_TURNS):
+    """
+    원문으로 보낼 메시지의 시작 index (messages[start:]가 창)
+
+    messages에는 system 메시지가 없어야 한다.
+    """
+    start = len(messages)
+    tokens = 0
+    turns = 0
+    while start > 0:
+        message = messages[start - 1]
+        cost = message_tokens(message)
+        is_turn_start = message.get("role") == "user"
+        # 마지막 user 메시지는 예산과 상관없이 포함
+        required = is_turn_start and turns == 0
+        if not required and (tokens + cost > token_budget or turns >= keep_turns):
+            break
+        start -= 1
+        tokens += cost
+        if is_turn_start:
+            turns += 1
+    # 창이 assistant 메시지로 시작하지 않도록 (턴 중간에서 자르지 않음)
+    while start < len(messages) and messages[start].get("role") != "user":
+        start += 1
+    return start
+
+
+def fold_count(messages, start, fold_tokens=FOLD_TOKENS):
+    """창 밖(messages[:start]) 중 이번 요약에 접을 앞쪽 메시지 수 (최소 1개)"""
+    count = 0
+    tokens = 0
+    while count < start:
+        tokens += message_tokens(messages[count])
+        if count > 0 and tokens > fold_tokens:
+            break
+        count += 1
+    return count
+
+
+def summary_request(summary, messages):
+    """요약 요청용 messages (chat completion에 그대로 넣음)"""
+    lines = [f"{m['role']}: {m['content']}" for m in messages]
+    content = (
+        f"## 기존 요약\n{summary or '(없음)'}\n\n## 새 대화\n" + "\n".join(lines)
+    )
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": content},
+    ]
@@ -0,0 +1,142 @@
+"""
+자주 반복되는 질문의 응답 캐시 (ChipiBrain용)
+
+"상태 어때", "내 이름 뭐야", "좋은 아침"처럼 같은 질문이 계속 오는데 매번 LLM을 호출했다.
+정규화한 발화 + 관련 컨텍스트(페르소나, 디바이스, 사용자 이름, 센서 구간)의 해시를 key로
+응답을 저장해 두고 재사용한다.
+
+- 같은 key에 응답을 variants개까지 모은다. k개 모였으면 k/variants 확률로 그중 하나를
+  무작위로 고르고 (직전에 고른 것은 피함), 나머지는 miss로 LLM을 불러 variant를 늘린다.
+  매번 같은 말을 하지 않으면서도 다 모이기 전부터 hit이 난다.
+- TTL: key가 처음 만들어진 뒤 ttl초가 지나면 variant 전부 버림
+- LRU: 항목이 max_entries를 넘으면 가장 오래 안 쓴 key부터 버림
+- 센서 값은 구간(온도 2도, 습도 10%)으로 묶어서 key에 넣는다. 구간이 바뀌면 다른 key
+- 긴 발화는 캐시하지 않는다 (MAX_UTTERANCE_CHARS). 반복되는 건 짧은 질문이고,
+  긴 발화는 거의 같은 문장이 다시 오지 않는다.
+"""
+
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 128
+TTL = 1800.0  # seconds
+VARIANTS = 3
+MAX_UTTERANCE_CHARS = 30  # 정규화 후 글자 수
+TEMP_BUCKET = 2.0  # 도
+HUMIDITY_BUCKET = 10.0  # %
+
+# 공백, 문장 부호, 이모지 등 (한글 / 영문 / 숫자만 남김)
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def normalize_utterance(text):
+    """소문자 + 한글 / 영문 / 숫자만 ("상태 어때?" == "상태어때")"""
+    return _NON_WORD.sub("", (text or "").lower())
+
+
+def sensor_bucket(sensor_data):
+    """센서 값 구간 (온도 구간, 습도 구간). 값이 없으면 None"""
+    if not sensor_data:
+        return None
+    temp = sensor_data.get("temperature")
+    humidity = sensor_data.get("humidity")
+    return (
+        int(float(temp) // TEMP_BUCKET) if temp is not None else None,
+        int(float(humidity) // HUMIDITY_BUCKET) if humidity is not None else None,
+    )
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ("true", "1", "yes")
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries=None,
+        ttl=None,
+        variants=None,
+        enabled=None,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries or int(
+            os.environ.get("RESPONSE_CACHE_SIZE", str(MAX_ENTRIES))
+        )
+        self.ttl = ttl or float(os.environ.get("RESPONSE_CACHE_TTL", str(TTL)))
+        self.variants = variants or int(
+            os.environ.get("RESPONSE_CACHE_VARIANTS", str(VARIANTS))
+        )
+        if enabled is None:
+            enabled = _env_flag("RESPONSE_CACHE", "true")
+        self.enabled = enabled
+        self.clock = clock
+        # key -> [만료 시각, [응답, ...], 직전에 고른 index]
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, utterance, context=()):
+        """
+        캐시 key. 캐시하지 않을 발화(너무 길거나 비었음)면 None
+
+        Args:
+            utterance: 사용자 발화
+            context: 응답을 바꾸는 값들의 tuple (페르소나, 사용자 이름, 센서 구간 등)
+        """
+        if not self.enabled:
+            return None
+        normalized = normalize_utterance(utterance)
+        if not normalized or len(normalized) > MAX_UTTERANCE_CHARS:
+            return None
+        digest = hashlib.sha1(repr(context).encode("utf-8")).hexdigest()[:16]
+        return f"{normalized}:{digest}"
+
+    def get(self, key):
+        """캐시된 응답 중 하나 또는 None (variant가 덜 모였으면 그 비율만큼 None)"""
+        if key is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self.entries[key]
+                entry = None
+            count = len(entry[1]) if entry is not None else 0
+            if count == 0 or (
+                count < self.variants and random.random() >= count / self.variants
+            ):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            choices = [i for i in range(len(entry[1])) if i != entry[2]]
+            entry[2] = random.choice(choices or [0])
+            self.hits += 1
+            return entry[1][entry[2]]
+
+    def put(self, key, reply):
+        """LLM 응답을 key의 variant로 추가 (같은 응답은 한 번만)"""
+        if key is None or not reply:
+            return
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                entry = [self.clock() + self.ttl, [], None]
+                self.entries[key] = entry
+            if reply not in entry[1] and len(entry[1]) < self.variants:
+                entry[1].append(reply)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,218 @@
+"""
+STT 중간 결과(interim)로 LLM 응답을 미리 요청 (speculative reply)
+
+Google STT는 말하는 동안 중간 결과를 계속 보내는데, 예전에는 final transcript가
+나온 뒤에야 ChipiBrain을 불렀다. 중간 결과가 안정되면(stability가 높거나 발화 끝이
+감지되면) 그 텍스트로 응답 생성을 먼저 시작하고, final이 나오면
+
+- 정규화한 텍스트(core/response_cache.normalize_utterance)가 같으면 미리 만든 응답을 그대로 씀
+- 다르면 미리 한 요청을 취소(스트림을 닫음)하고 final로 다시 요청
+
+같은 텍스트로는 한 번만 요청한다 (중간 결과가 여러 번 와도, final이 같아도 중복 요청 없음).
+아낀 지연(final 시점에 요청을 시작했을 때보다 응답이 빨리 준비된 시간)과
+버린 토큰(취소된 요청의 prompt + 받은 completion 추정치)을 턴마다 / 누적으로 출력한다.
+"""
+
+import os
+import threading
+import time
+
+try:
+    from core.response_cache import normalize_utterance
+except ImportError:
+    from response_cache import normalize_utterance
+
+STABILITY = 0.8  # 이 이상이면 중간 결과가 안정됐다고 봄 (Google STT stability, 0~1)
+MIN_CHARS = 2  # 정규화 후 이보다 짧은 중간 결과로는 요청하지 않음
+
+
+class Speculation:
+    """미리 시작한 응답 요청 하나 (ChipiBrain.speculate가 만들고 별도 스레드가 채움)"""
+
+    def __init__(self, text, ai_name, device_serial):
+        self.text = text
+        self.key = normalize_utterance(text)
+        self.ai_name = ai_name
+        self.device_serial = device_serial
+        self.started_at = time.monotonic()
+        self.done_at = None
+        # 요청 결과 (스레드가 채움)
+        self.system_prompt = None
+        self.cache_key = None
+        self.request_messages = None
+        self.cached = False  # 응답 캐시 hit이면 LLM 요청 없음
+        self.parts = []
+        self.finish_reason = None
+        self.error = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cancelled = threading.Event()
+        self.condition = threading.Condition()
+
+    def push(self, content):
+        with self.condition:
+            self.parts.append(content)
+            self.condition.notify_all()
+
+    def finish(self, finish_reason=None, error=None):
+        with self.condition:
+            self.finish_reason = finish_reason
+            self.error = error
+            self.done_at = time.monotonic()
+            self.condition.notify_all()
+
+    @property
+    def done(self):
+        return self.done_at is not None
+
+    def cancel(self):
+        """요청 취소 (스트림은 다음 chunk에서 닫힘)"""
+        self.cancelled.set()
+
+    def usable(self):
+        """첫 delta가 오거나 요청이 끝날 때까지 기다림. 아무것도 받기 전에 실패했으면 False"""
+        with self.condition:
+            while not self.parts and not self.done:
+                self.condition.wait()
+            return bool(self.parts) or self.error is None
+
+    def iter_parts(self):
+        """받은 delta를 순서대로 (요청이 끝날 때까지 기다리며) 반환"""
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.parts) and not self.done:
+                    self.condition.wait()
+                parts = self.parts[index:]
+                done = self.done
+            index += len(parts)
+            for part in parts:
+                yield part
+            if done and not parts:
+                return
+
+    def wasted_tokens(self):
+        """버려질 때 쓴 토큰 추정치 (캐시 hit이면 0)"""
+        return self.prompt_tokens + self.completion_tokens
+
+
+class Speculator:
+    """
+    STT 중간 결과를 받아 ChipiBrain.speculate를 부르고, final transcript와 맞춰 봄
+
+        speculator = Speculator(brain, device_serial=serial)
+        text = recognize(on_interim=speculator.on_interim)
+        brain.add_msg(text)
+        answer = brain.wait_run("chipi", serial, speculation=speculator.take(text, heard_at))
+    """
+
+    def __init__(self, brain, ai_name="chipi", device_serial=None, stability=None):
+        self.brain = brain
+        self.ai_name = ai_name
+        self.device_serial = device_serial
+        self.stability = stability or float(
+            os.environ.get("SPECULATIVE_STABILITY", str(STABILITY))
+        )
+        self.current = None
+        self.lock = threading.Lock()
+        # 누적 통계
+        self.started = 0
+        self.adopted = 0
+        self.discarded = 0
+        self.saved_seconds = 0.0
+        self.wasted = 0
+
+    def on_interim(self, text, stability=0.0, end_of_utterance=False):
+        """STT 중간 결과. 안정됐으면(또는 발화가 끝났으면) 그 텍스트로 응답 요청 시작"""
+        if end_of_utterance or stability >= self.stability:
+            self.speculate(text)
+
+    def speculate(self, text):
+        key = normalize_utterance(text)
+        if len(key) < MIN_CHARS:
+            return None
+        with self.lock:
+            # 같은 텍스트로 이미 요청 중이면 그대로 둠 (중복 요청 방지)
+            if self.current is not None and self.current.key == key:
+                return self.current
+            self._discard_locked()
+            self.current = self.brain.speculate(text, self.ai_name, self.device_serial)
+            self.started += 1
+        print(f'🔮 미리 요청: "{text}"', flush=True)
+        return self.current
+
+    def take(self, final_text, heard_at=None):
+        """
+        final transcript에 쓸 수 있는 Speculation (없거나 텍스트가 다르면 None)
+
+        텍스트가 다른 요청은 취소한다 (버린 토큰으로 집계).
+
+        Args:
+            final_text: final transcript (ChipiBrain에 add_msg한 텍스트)
+            heard_at: final transcript를 받은 시각 (time.monotonic). 아낀 지연 계산용
+        """
+        heard_at = heard_at or time.monotonic()
+        with self.lock:
+            speculation = self.current
+            self.current = None
+            if speculation is None:
+                return None
+            if speculation.key != normalize_utterance(final_text):
+                print(
+                    f'🔮 미리 요청 취소: "{speculation.text}" != "{final_text}"',
+                    flush=True,
+                )
+                self._discard(speculation)
+                return None
+            self.adopted += 1
+        # final 시점에 요청을 시작했다면 준비됐을 시각 - 실제 준비된 시각
+        # = min(final 시각, 응답 완료 시각) - 미리 요청 시작 시각
+        threading.Thread(
+            target=self._count_saved, args=(speculation, heard_at), daemon=True
+        ).start()
+        return speculation
+
+    def cancel(self):
+        """이번 턴에 LLM을 부르지 않을 때 (종료 / sleep / 오디오 매핑 등) 진행 중인 요청을 버림"""
+        with self.lock:
+            self._discard_locked()
+
+    def _discard_locked(self):
+        if self.current is not None:
+            self._discard(self.current)
+            self.current = None
+
+    def _discard(self, speculation):
+        speculation.cancel()
+        self.discarded += 1
+        # 받은 completion 토큰은 스트림이 닫힌 뒤 확정되므로 기다렸다가 집계
+        threading.Thread(
+            target=self._count_wasted, args=(speculation,), daemon=True
+        ).start()
+
+    def _count_wasted(self, speculation):
+        for _ in speculation.iter_parts():
+            pass
+        with self.lock:
+            self.wasted += speculation.wasted_tokens()
+        print(
+            f"🔮 버린 토큰 약 {speculation.wasted_tokens()} "
+            f"(prompt {speculation.prompt_tokens} + completion {speculation.completion_tokens})",
+            flush=True,
+        )
+
+    def _count_saved(self, speculation, heard_at):
+        for _ in speculation.iter_parts():
+            pass
+        saved = max(0.0, min(heard_at, speculation.done_at) - speculation.started_at)
+        with self.lock:
+            self.saved_seconds += saved
+        print(f"🔮 미리 요청 사용: 응답 {saved * 1000:.0f} ms 앞당김", flush=True)
+        print(f"🔮 {self.report()}", flush=True)
+
+    def report(self):
+        """누적 통계 한 줄"""
+        return (
+            f"미리 요청 {self.started}회 (사용 {self.adopted}, 취소 {self.discarded}), "
+            f"아낀 지연 합계 {self.saved_seconds:.1f}초, 버린 토큰 약 {self.wasted}"
+        )
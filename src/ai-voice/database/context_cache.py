@@ -0,0 +1,85 @@
+"""
+디바이스별 컨텍스트 캐시 (DatabaseManager용)
+
+응답 한 번에 wait_run과 build_context가 사용자, 디바이스, 센서, 로그를 각각 조회해서
+PostgreSQL 왕복이 8~10번씩 생긴다. 같은 시리얼의 조회 결과를 종류별 TTL 동안 메모리에
+들고 있다가 재사용한다. wait_run과 build_context는 같은 DatabaseManager를 쓰므로
+캐시도 공유한다.
+
+- key: (종류, serial 또는 email/user_id, 추가 인자)
+- TTL: 종류별 (TTLS). 결과가 없음(None, 빈 목록)도 캐시하지만 NEGATIVE_TTL까지만
+  (새로 등록된 디바이스/사용자를 오래 놓치지 않도록)
+- 조회 오류는 캐시하지 않는다 (DatabaseManager가 성공했을 때만 put)
+- invalidate(serial): 그 디바이스의 항목 전부 삭제. invalidate(): 전체 삭제
+- 캐시된 dict / list는 호출한 쪽과 공유되므로 수정하지 않는다
+"""
+
+import os
+import threading
+import time
+
+# 종류별 TTL (초)
+TTLS = {
+    "user_email": 600.0,  # 사용자 정보는 거의 바뀌지 않음
+    "user_serial": 600.0,
+    "device": 300.0,
+    "sensor": 30.0,  # 펌웨어 업로드 주기 (30초)
+    "sensor_recent": 30.0,
+    "logs": 60.0,
+}
+NEGATIVE_TTL = 60.0
+
+MISS = object()
+
+
+class ContextCache:
+    def __init__(self, ttls=None, enabled=None, clock=time.monotonic):
+        self.ttls = dict(TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        if enabled is None:
+            enabled = os.environ.get("CONTEXT_CACHE", "true").lower() in (
+                "true",
+                "1",
+                "yes",
+            )
+        self.enabled = enabled
+        self.clock = clock
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind, key, extra=None):
+        """캐시된 값 또는 MISS"""
+        if not self.enabled:
+            return MISS
+        with self.lock:
+            entry = self.entries.get((kind, key, extra))
+            if entry is not None and entry[0] > self.clock():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return MISS
+
+    def put(self, kind, key, value, extra=None):
+        if not self.enabled:
+            return
+        ttl = self.ttls[kind]
+        if not value:
+            ttl = min(ttl, NEGATIVE_TTL)
+        with self.lock:
+            self.entries[(kind, key, extra)] = (self.clock() + ttl, value)
+
+    def invalidate(self, serial=None, kinds=None):
+        """serial의 항목 (kinds가 있으면 그 종류만) 삭제. serial이 None이면 전체"""
+        with self.lock:
+            if serial is None and kinds is None:
+                self.entries.clear()
+                return
+            for entry_key in list(self.entries):
+                kind, key, _ = entry_key
+                if (serial is None or key == serial) and (
+                    kinds is None or kind in kinds
+                ):
+                    del self.entries[entry_key]
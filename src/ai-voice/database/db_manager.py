@@ -1,7 +1,16 @@
 import os
+import sys
+import threading
+import time
 
 from dotenv import load_dotenv
 
+try:
+    from database.context_cache import MISS, ContextCache
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from context_cache import MISS, ContextCache
+
 # psycopg2 import (시스템 라이브러리 없어도 계속 진행 가능하도록)
 # ImportError뿐만 아니라 OSError(시스템 라이브러리 누락)도 처리
 try:
@@ -23,7 +32,13 @@ except (ImportError, OSError, Exception) as e:
 
 
 class DatabaseManager:
-    """PostgreSQL 데이터베이스 연결 및 조회"""
+    """PostgreSQL 데이터베이스 연결 및 조회
+
+    조회 결과는 serial별로 ContextCache(database/context_cache.py)에 TTL 동안 캐시된다.
+    연결은 스레드마다 하나씩 쓴다 (psycopg2는 한 연결의 쿼리를 직렬화하므로
+    ChipiBrain이 여러 스레드에서 동시에 조회할 때 서로 기다리지 않도록).
+    connect()를 부른 스레드의 연결이 먼저 열리고, 다른 스레드는 처음 조회할 때 연다.
+    """
 
     def __init__(self):
         if not HAS_PSYCOPG2:
@@ -51,7 +66,63 @@ class DatabaseManager:
         if not self.host:
             raise ValueError("DB_HOST가 설정되지 않았습니다.")
 
-        self.conn = None
+        # 스레드별 연결 (self.conn), 열린 연결 전체 (close용)
+        self.local = threading.local()
+        self.connections = []
+        self.connect_timeout = None  # connect()를 부르기 전에는 연결을 열지 않음
+        self.lock = threading.Lock()
+
+        # 디바이스별 컨텍스트 캐시 (CONTEXT_CACHE=false면 끔)
+        self.cache = ContextCache()
+        # DB 왕복 횟수 / 시간 (응답마다 차이를 출력)
+        self.query_count = 0
+        self.query_seconds = 0.0
+
+    @property
+    def conn(self):
+        """현재 스레드의 연결 (없으면 새로 열고, connect() 전이면 None)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None and self.connect_timeout is not None:
+            conn = self._open(self.connect_timeout)
+        return conn
+
+    def _open(self, timeout):
+        conn = psycopg2.connect(
+            host=self.host,
+            port=self.port,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            connect_timeout=timeout,  # 연결 타임아웃 설정
+        )
+        self.local.conn = conn
+        with self.lock:
+            self.connections.append(conn)
+        return conn
+
+    def _execute(self, cur, query, params):
+        """cur.execute + 왕복 횟수 / 시간 집계"""
+        start = time.perf_counter()
+        try:
+            cur.execute(query, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.query_count += 1
+                self.query_seconds += elapsed
+
+    def stats(self):
+        """(DB 왕복 횟수, DB 시간 초, 캐시 hit, 캐시 miss) 누적값"""
+        return (
+            self.query_count,
+            self.query_seconds,
+            self.cache.hits,
+            self.cache.misses,
+        )
+
+    def invalidate_context(self, serial=None):
+        """serial(없으면 전체)의 캐시된 사용자 / 디바이스 / 센서 정보 삭제"""
+        self.cache.invalidate(serial)
 
     def connect(self, timeout=5):
         """데이터베이스 연결
@@ -63,14 +134,9 @@ class DatabaseManager:
             raise ImportError("psycopg2가 설치되지 않았습니다.")
 
         try:
-            self.conn = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                database=self.database,
-                user=self.user,
-                password=self.password,
-                connect_timeout=timeout,  # 연결 타임아웃 설정
-            )
+            self._open(timeout)
+            # 다른 스레드도 처음 조회할 때 같은 타임아웃으로 연결
+            self.connect_timeout = timeout
             print("✓ PostgreSQL 연결 성공")
         except psycopg2.OperationalError as e:
             # 연결 오류는 상세 메시지 없이 간단하게만 표시
@@ -83,9 +149,14 @@ class DatabaseManager:
             raise
 
     def close(self):
-        """데이터베이스 연결 종료"""
-        if self.conn:
-            self.conn.close()
+        """데이터베이스 연결 종료 (모든 스레드의 연결)"""
+        with self.lock:
+            connections, self.connections = self.connections, []
+        self.connect_timeout = None
+        self.local = threading.local()
+        if connections:
+            for conn in connections:
+                conn.close()
             print("✓ PostgreSQL 연결 종료")
 
     def get_user_by_email(self, email):
@@ -98,13 +169,19 @@ class DatabaseManager:
         Returns:
             dict: 사용자 정보 (id, name, email, etc.)
         """
+        cached = self.cache.get("user_email", email)
+        if cached is not MISS:
+            return cached
+
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
 
             try:
-                cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+                self._execute(cur, "SELECT * FROM users WHERE email = %s", (email,))
                 user = cur.fetchone()
-                return dict(user) if user else None
+                user = dict(user) if user else None
+                self.cache.put("user_email", email, user)
+                return user
             finally:
                 cur.close()
 
@@ -123,27 +200,36 @@ class DatabaseManager:
         Returns:
             dict: 사용자 정보 (id, name, email, etc.)
         """
+        cached = self.cache.get("user_serial", serial)
+        if cached is not MISS:
+            return cached
+
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
 
             try:
                 # 디바이스에서 user_id 조회
-                cur.execute("SELECT user_id FROM devices WHERE serial = %s", (serial,))
+                self._execute(
+                    cur, "SELECT user_id FROM devices WHERE serial = %s", (serial,)
+                )
                 device = cur.fetchone()
 
                 if not device:
                     print(
                         f"⚠️  시리얼 '{serial}'에 해당하는 디바이스를 찾을 수 없습니다."
                     )
+                    self.cache.put("user_serial", serial, None)
                     return None
 
                 user_id = device["user_id"]
 
                 # 사용자 정보 조회
-                cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+                self._execute(cur, "SELECT * FROM users WHERE id = %s", (user_id,))
                 user = cur.fetchone()
 
-                return dict(user) if user else None
+                user = dict(user) if user else None
+                self.cache.put("user_serial", serial, user)
+                return user
             finally:
                 cur.close()
 
@@ -162,14 +248,20 @@ class DatabaseManager:
         Returns:
             dict: 디바이스 정보
         """
+        cached = self.cache.get("device", serial)
+        if cached is not MISS:
+            return cached
+
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
 
-            cur.execute("SELECT * FROM devices WHERE serial = %s", (serial,))
+            self._execute(cur, "SELECT * FROM devices WHERE serial = %s", (serial,))
             device = cur.fetchone()
             cur.close()
 
-            return dict(device) if device else None
+            device = dict(device) if device else None
+            self.cache.put("device", serial, device)
+            return device
 
         except Exception as e:
             print(f"❌ 디바이스 조회 오류: {e}")
@@ -186,11 +278,16 @@ class DatabaseManager:
         Returns:
             list: 센서 데이터 리스트
         """
+        cached = self.cache.get("sensor_recent", serial, limit)
+        if cached is not MISS:
+            return cached
+
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
 
             try:
-                cur.execute(
+                self._execute(
+                    cur,
                     """
                     SELECT * FROM sensor_data
                     WHERE serial = %s
@@ -200,7 +297,9 @@ class DatabaseManager:
                     (serial, limit),
                 )
                 data = cur.fetchall()
-                return [dict(row) for row in data] if data else []
+                data = [dict(row) for row in data] if data else []
+                self.cache.put("sensor_recent", serial, data, limit)
+                return data
             finally:
                 cur.close()
 
@@ -220,12 +319,17 @@ class DatabaseManager:
         Returns:
             dict: 최신 센서 데이터 (temperature, humidity 포함)
         """
+        cached = self.cache.get("sensor", serial)
+        if cached is not MISS:
+            return cached
+
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
 
             try:
                 # sensor_data 테이블에서 직접 serial로 최신 데이터 조회 (updated_at 기준)
-                cur.execute(
+                self._execute(
+                    cur,
                     """
                     SELECT * FROM sensor_data
                     WHERE serial = %s
@@ -237,11 +341,13 @@ class DatabaseManager:
                 data = cur.fetchone()
 
                 if data:
-                    print(f"✓ 센서 데이터 조회 성공: {dict(data)}")
-                    return dict(data)
+                    data = dict(data)
+                    print(f"✓ 센서 데이터 조회 성공: {data}")
                 else:
+                    data = None
                     print(f"⚠️  센서 데이터 없음 (시리얼: {serial})")
-                    return None
+                self.cache.put("sensor", serial, data)
+                return data
             finally:
                 cur.close()
 
@@ -264,10 +370,15 @@ class DatabaseManager:
         Returns:
             list: 로그 리스트
         """
+        cached = self.cache.get("logs", user_id, limit)
+        if cached is not MISS:
+            return cached
+
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
 
-            cur.execute(
+            self._execute(
+                cur,
                 """
                 SELECT * FROM logs
                 WHERE user_id = %s
@@ -279,7 +390,9 @@ class DatabaseManager:
             logs = cur.fetchall()
             cur.close()
 
-            return [dict(row) for row in logs] if logs else []
+            logs = [dict(row) for row in logs] if logs else []
+            self.cache.put("logs", user_id, logs, limit)
+            return logs
 
         except Exception as e:
             print(f"❌ 로그 조회 오류: {e}")
@@ -369,7 +482,42 @@ class DatabaseManager:
                 "issues": [],
             }
 
-    def build_context(self, device_serial, only_temperature=False, only_humidity=False):
+    def resolve_user(self, device_serial):
+        """
+        컨텍스트용 사용자 조회 (USER_EMAIL이 있으면 이메일로 먼저, 못 찾으면 시리얼로)
+
+        Returns:
+            dict: 사용자 정보 또는 None
+        """
+        user = None
+        user_name = None
+
+        # 1. 환경 변수에서 USER_EMAIL 가져오기
+        user_email = os.environ.get("USER_EMAIL")
+
+        # 2. 이메일로 먼저 조회 시도
+        if user_email:
+            user = self.get_user_by_email(user_email)
+            user_name = user.get("name") if user else None
+            if user_name:
+                print(f"✓ 사용자 조회 성공 (이메일): {user_name}")
+
+        # 3. 이메일로 못 찾으면 시리얼로 조회
+        if not user_name:
+            user = self.get_user_by_device_serial(device_serial)
+            user_name = user.get("name") if user else None
+            if user_name:
+                print(f"✓ 사용자 조회 성공 (시리얼): {user_name}")
+
+        # 4. 못 찾으면 None 설정 (시스템 프롬프트에서 기본값 '주인님' 사용)
+        if not user_name:
+            print("⚠️  사용자 정보를 찾을 수 없습니다. 기본값 'user' 사용")
+
+        return user
+
+    def build_context(
+        self, device_serial, only_temperature=False, only_humidity=False, sensor_data=None
+    ):
         """
         디바이스 시리얼을 기반으로 AI에 전달할 컨텍스트 생성
         (sensor_data 테이블에서 직접 조회)
@@ -378,172 +526,179 @@ class DatabaseManager:
             device_serial: 디바이스 시리얼 번호
             only_temperature: True면 온도만 포함
             only_humidity: True면 습도만 포함
+            sensor_data: 이미 조회한 최신 센서 데이터 (없으면 DB에서 조회)
 
         Returns:
             tuple: (context: str, user_name: str or None) - 컨텍스트 문자열과 사용자 이름
         """
         try:
-            user_name = None
-            user = None
-            user_id = None
-
-            # 1. 환경 변수에서 USER_EMAIL 가져오기
-            user_email = os.environ.get("USER_EMAIL")
-
-            # 2. 이메일로 먼저 조회 시도
-            if user_email:
-                user = self.get_user_by_email(user_email)
-                user_name = user.get("name") if user else None
-                if user_name:
-                    print(f"✓ 사용자 조회 성공 (이메일): {user_name}")
-
-            # 3. 이메일로 못 찾으면 시리얼로 조회
-            if not user_name:
-                user = self.get_user_by_device_serial(device_serial)
-                user_name = user.get("name") if user else None
-                if user_name:
-                    print(f"✓ 사용자 조회 성공 (시리얼): {user_name}")
-
-            # 4. 못 찾으면 None 설정 (시스템 프롬프트에서 기본값 '주인님' 사용)
-            if not user_name:
-                print("⚠️  사용자 정보를 찾을 수 없습니다. 기본값 'user' 사용")
+            user = self.resolve_user(device_serial)
+            user_name = user.get("name") if user else None
 
             # 사용자 정보가 있으면 user_id 가져오기 (추가 컨텍스트용)
-            if user:
-                user_id = user.get("id")
+            user_id = user.get("id") if user else None
 
             # 디바이스 정보 조회 (추가 컨텍스트)
             device_info = self.get_device_info(device_serial)
 
             # 최신 센서 데이터 직접 조회 (시리얼 기반)
-            sensor_data = self.get_sensor_data_by_serial(device_serial)
-
-            # 컨텍스트 생성
-            context = "## 현재 센서 데이터\n"
-
-            if sensor_data:
-                temperature = sensor_data.get("temperature", "N/A")
-                humidity = sensor_data.get("humidity", "N/A")
-                measured_time = sensor_data.get("created_at", "N/A")
-
-                # datetime 객체를 문자열로 변환
-                if hasattr(measured_time, "strftime"):
-                    measured_time = measured_time.strftime("%Y-%m-%d %H:%M:%S")
-
-                # 온도만 표시
-                if only_temperature:
-                    context += f"- 온도: {temperature}도\n"
-                # 습도만 표시
-                elif only_humidity:
-                    context += f"- 습도: {humidity}%\n"
-                # 둘 다 표시 (기본)
-                else:
-                    context += f"- 온도: {temperature}도\n"
-                    context += f"- 습도: {humidity}%\n"
-
-                context += f"- 측정시간: {measured_time}\n"
-
-                # 식물 상태 판단 (온도와 습도 둘 다 필요할 때만)
-                if (
-                    not only_temperature
-                    and not only_humidity
-                    and temperature != "N/A"
-                    and humidity != "N/A"
-                ):
-                    plant_status = self.get_plant_status(
-                        float(temperature), float(humidity)
-                    )
-                    context += "\n## 현재 치피 상태\n"
-                    context += f"- 조건: {plant_status['condition_status']}\n"
-                    if plant_status["issues"]:
-                        context += f"- 문제: {', '.join(plant_status['issues'])}\n"
-                    context += f"- 상태 메시지: {plant_status['message']}\n"
+            if sensor_data is None:
+                sensor_data = self.get_sensor_data_by_serial(device_serial)
 
-            else:
-                context += "- 현재 센서 데이터를 불러올 수 없습니다.\n"
-
-            # 디바이스 정보 추가 (있는 경우)
-            if device_info:
-                context += "\n## 디바이스 정보\n"
-                device_name = device_info.get("name")
-                device_status = device_info.get("status")
-                if device_name:
-                    context += f"- 디바이스명: {device_name}\n"
-                if device_status:
-                    context += f"- 상태: {device_status}\n"
-
-            # 최근 센서 데이터 추세 분석 (있는 경우, 최근 3개)
-            # serial 기반으로 조회
+            # 최근 센서 데이터 추세 분석용 (serial 기반, 최근 3개)
             recent_sensor_data = self.get_latest_sensor_data(device_serial, limit=3)
-            if recent_sensor_data and len(recent_sensor_data) > 1:
-                context += "\n## 최근 센서 데이터 추세 (참고용)\n"
-                temps = [
-                    float(d.get("temperature", 0))
-                    for d in recent_sensor_data
-                    if d.get("temperature") is not None
-                ]
-                humids = [
-                    float(d.get("humidity", 0))
-                    for d in recent_sensor_data
-                    if d.get("humidity") is not None
-                ]
-                if temps:
-                    avg_temp = sum(temps) / len(temps)
-                    context += f"- 최근 평균 온도: {avg_temp:.1f}도\n"
-                    if len(temps) > 1:
-                        temp_change = temps[0] - temps[-1]
-                        trend = (
-                            "상승"
-                            if temp_change > 0
-                            else "하락" if temp_change < 0 else "유지"
-                        )
-                        context += f"- 온도 추세: {trend}\n"
-                if humids:
-                    avg_humid = sum(humids) / len(humids)
-                    context += f"- 최근 평균 습도: {avg_humid:.1f}%\n"
-                    if len(humids) > 1:
-                        humid_change = humids[0] - humids[-1]
-                        trend = (
-                            "상승"
-                            if humid_change > 0
-                            else "하락" if humid_change < 0 else "유지"
-                        )
-                        context += f"- 습도 추세: {trend}\n"
-
-            # 사용자 키트 정보 추가 (있는 경우)
-            # 주의: kits 테이블 구조에 따라 get_user_kits 메서드가 작동하지 않을 수 있음
-            # if user_id:
-            #     try:
-            #         kits = self.get_user_kits(user_id)
-            #         if kits:
-            #             context += "\n## 사용자 키트 정보\n"
-            #             context += f"- 보유 키트 수: {len(kits)}개\n"
-            #             # 첫 번째 키트 정보만 간단히 추가
-            #             first_kit = kits[0]
-            #             kit_name = first_kit.get("name") or first_kit.get("plant_name")
-            #             if kit_name:
-            #                 context += f"- 키트명: {kit_name}\n"
-            #     except Exception as e:
-            #         # 키트 조회 실패 시 무시하고 계속 진행
-            #         pass
-
-            # 최근 사용 로그 추가 (있는 경우, 최근 3개만)
-            if user_id:
-                recent_logs = self.get_recent_logs(user_id, limit=3)
-                if recent_logs:
-                    context += "\n## 최근 활동 (참고용)\n"
-                    for log in recent_logs[:3]:  # 최근 3개만
-                        log_type = log.get("type") or log.get("action")
-                        log_time = log.get("created_at")
-                        if log_time and hasattr(log_time, "strftime"):
-                            log_time = log_time.strftime("%Y-%m-%d %H:%M:%S")
-                        if log_type:
-                            context += (
-                                f"- {log_type} ({log_time if log_time else '최근'})\n"
-                            )
 
+            # 최근 사용 로그 (있는 경우, 최근 3개만)
+            recent_logs = self.get_recent_logs(user_id, limit=3) if user_id else None
+
+            context = self.format_context(
+                sensor_data,
+                device_info,
+                recent_sensor_data,
+                recent_logs,
+                only_temperature=only_temperature,
+                only_humidity=only_humidity,
+            )
             return context, user_name
 
         except Exception as e:
             print(f"❌ 컨텍스트 생성 오류: {e}")
             return "", None
+
+    def format_context(
+        self,
+        sensor_data,
+        device_info=None,
+        recent_sensor_data=None,
+        recent_logs=None,
+        only_temperature=False,
+        only_humidity=False,
+    ):
+        """
+        조회해 둔 데이터로 컨텍스트 문자열 생성 (DB 조회 없음)
+
+        build_context와 ChipiBrain의 비동기 컨텍스트 수집이 같이 쓴다.
+        device_info / recent_sensor_data / recent_logs가 None이면 그 항목은 빠진다.
+        """
+        # 컨텍스트 생성
+        context = "## 현재 센서 데이터\n"
+
+        if sensor_data:
+            temperature = sensor_data.get("temperature", "N/A")
+            humidity = sensor_data.get("humidity", "N/A")
+            measured_time = sensor_data.get("created_at", "N/A")
+
+            # datetime 객체를 문자열로 변환
+            if hasattr(measured_time, "strftime"):
+                measured_time = measured_time.strftime("%Y-%m-%d %H:%M:%S")
+
+            # 온도만 표시
+            if only_temperature:
+                context += f"- 온도: {temperature}도\n"
+            # 습도만 표시
+            elif only_humidity:
+                context += f"- 습도: {humidity}%\n"
+            # 둘 다 표시 (기본)
+            else:
+                context += f"- 온도: {temperature}도\n"
+                context += f"- 습도: {humidity}%\n"
+
+            context += f"- 측정시간: {measured_time}\n"
+
+            # 식물 상태 판단 (온도와 습도 둘 다 필요할 때만)
+            if (
+                not only_temperature
+                and not only_humidity
+                and temperature != "N/A"
+                and humidity != "N/A"
+            ):
+                # 서버 캐시에서 온 데이터면 서버가 판단해 둔 상태(hysteresis 적용)를 사용
+                plant_status = sensor_data.get(
+                    "plant_status"
+                ) or self.get_plant_status(float(temperature), float(humidity))
+                context += "\n## 현재 치피 상태\n"
+                context += f"- 조건: {plant_status['condition_status']}\n"
+                if plant_status["issues"]:
+                    context += f"- 문제: {', '.join(plant_status['issues'])}\n"
+                context += f"- 상태 메시지: {plant_status['message']}\n"
+
+        else:
+            context += "- 현재 센서 데이터를 불러올 수 없습니다.\n"
+
+        # 디바이스 정보 추가 (있는 경우)
+        if device_info:
+            context += "\n## 디바이스 정보\n"
+            device_name = device_info.get("name")
+            device_status = device_info.get("status")
+            if device_name:
+                context += f"- 디바이스명: {device_name}\n"
+            if device_status:
+                context += f"- 상태: {device_status}\n"
+
+        # 최근 센서 데이터 추세 분석 (있는 경우, 최근 3개)
+        if recent_sensor_data and len(recent_sensor_data) > 1:
+            context += "\n## 최근 센서 데이터 추세 (참고용)\n"
+            temps = [
+                float(d.get("temperature", 0))
+                for d in recent_sensor_data
+                if d.get("temperature") is not None
+            ]
+            humids = [
+                float(d.get("humidity", 0))
+                for d in recent_sensor_data
+                if d.get("humidity") is not None
+            ]
+            if temps:
+                avg_temp = sum(temps) / len(temps)
+                context += f"- 최근 평균 온도: {avg_temp:.1f}도\n"
+                if len(temps) > 1:
+                    temp_change = temps[0] - temps[-1]
+                    trend = (
+                        "상승"
+                        if temp_change > 0
+                        else "하락" if temp_change < 0 else "유지"
+                    )
+                    context += f"- 온도 추세: {trend}\n"
+            if humids:
+                avg_humid = sum(humids) / len(humids)
+                context += f"- 최근 평균 습도: {avg_humid:.1f}%\n"
+                if len(humids) > 1:
+                    humid_change = humids[0] - humids[-1]
+                    trend = (
+                        "상승"
+                        if humid_change > 0
+                        else "하락" if humid_change < 0 else "유지"
+                    )
+                    context += f"- 습도 추세: {trend}\n"
+
+        # 사용자 키트 정보 추가 (있는 경우)
+        # 주의: kits 테이블 구조에 따라 get_user_kits 메서드가 작동하지 않을 수 있음
+        # if user_id:
+        #     try:
+        #         kits = self.get_user_kits(user_id)
+        #         if kits:
+        #             context += "\n## 사용자 키트 정보\n"
+        #             context += f"- 보유 키트 수: {len(kits)}개\n"
+        #             # 첫 번째 키트 정보만 간단히 추가
+        #             first_kit = kits[0]
+        #             kit_name = first_kit.get("name") or first_kit.get("plant_name")
+        #             if kit_name:
+        #                 context += f"- 키트명: {kit_name}\n"
+        #     except Exception as e:
+        #         # 키트 조회 실패 시 무시하고 계속 진행
+        #         pass
+
+        # 최근 사용 로그 추가 (있는 경우, 최근 3개만)
+        if recent_logs:
+            context += "\n## 최근 활동 (참고용)\n"
+            for log in recent_logs[:3]:  # 최근 3개만
+                log_type = log.get("type") or log.get("action")
+                log_time = log.get("created_at")
+                if log_time and hasattr(log_time, "strftime"):
+                    log_time = log_time.strftime("%Y-%m-%d %H:%M:%S")
+                if log_type:
+                    context += (
+                        f"- {log_type} ({log_time if log_time else '최근'})\n"
+                    )
+
+        return context
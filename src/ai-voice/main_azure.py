@@ -30,15 +30,6 @@ except ImportError:
     print("python-dotenv가 설치되지 않았습니다: pip3 install python-dotenv")
     sys.exit(1)
 
-try:
-    import requests
-
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
-    print("requests가 설치되지 않았습니다: pip3 install requests")
-    sys.exit(1)
-
 # openai 버전에 따라 다른 import
 try:
     import openai
@@ -98,6 +89,9 @@ except ImportError:
         logger.error("play_intro_audio 함수를 사용할 수 없습니다.")
         return False
 
+# 클라우드 API 공용 HTTPS 연결 풀 (keep-alive, 미리 연결, 핸드셰이크 측정)
+from utils import http_pool
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
@@ -200,13 +194,18 @@ class AzureOpenAIClient:
             "당신은 친절하고 도움이 되는 AI 어시스턴트입니다. 이름은 '치피'입니다. 이모지를 사용하지 않고 한국어로 자연스럽고 간결하게 대답해주세요.",
         )
 
-        # OpenAI 클라이언트 초기화
+        # OpenAI 클라이언트 초기화 (연결은 utils/http_pool.py의 keep-alive 풀 사용)
         if HAS_AZURE_OPENAI_CLASS:
             # openai 1.x 버전
+            http_client = http_pool.httpx_client()
+            client_options = {"http_client": http_client} if http_client else {}
+            if http_client:
+                http_pool.register(self.endpoint, http_client)
             self.client = AzureOpenAI(
                 api_key=self.api_key,
                 api_version=self.api_version,
                 azure_endpoint=self.endpoint,
+                **client_options,
             )
             logger.info("Azure OpenAI 클라이언트 초기화 완료 (openai 1.x)")
         else:
@@ -215,6 +214,8 @@ class AzureOpenAIClient:
             openai.api_base = self.endpoint
             openai.api_key = self.api_key
             openai.api_version = self.api_version
+            openai.requestssession = http_pool.session()
+            http_pool.register(self.endpoint)
             self.client = None
             logger.info("Azure OpenAI 클라이언트 초기화 완료 (openai 0.28.x)")
 
@@ -277,6 +278,7 @@ class AzureSpeechRESTSTT:
 
         # STT API URL (전역 엔드포인트 사용)
         self.stt_url = f"{AZURE_SPEECH_ENDPOINT}/speech/recognition/conversation/cognitiveservices/v1"
+        http_pool.register(self.stt_url)
         logger.info(f"Azure Speech REST API STT 초기화 완료 (언어: {language})")
 
     def recognize_from_file(self, audio_file_path):
@@ -306,7 +308,7 @@ class AzureSpeechRESTSTT:
 
             # 요청
             logger.info("음성 인식 중...")
-            response = requests.post(
+            response = http_pool.session().post(
                 self.stt_url,
                 headers=headers,
                 params=params,
@@ -379,6 +381,7 @@ class AzureSpeechRESTTTS:
         self.api_key = AZURE_SPEECH_API_KEY
         self.endpoint = AZURE_SPEECH_TTS_ENDPOINT
         self.tts_url = f"{self.endpoint}/cognitiveservices/v1"
+        http_pool.register(self.tts_url)
         logger.info(f"Azure Speech REST API TTS 초기화 완료 (음성: {voice_name})")
 
     def synthesize(self, text):
@@ -404,7 +407,7 @@ class AzureSpeechRESTTTS:
 
             # 요청 (참고 코드처럼 빠르게 처리)
             logger.debug(f"TTS 음성 생성 중: {text[:50]}...")
-            response = requests.post(
+            response = http_pool.session().post(
                 self.tts_url, headers=headers, data=ssml.encode("utf-8"), timeout=15
             )
 
@@ -655,6 +658,11 @@ class VoiceAssistant:
             else:
                 self.board.led.state = Led.OFF
 
+    def _on_speech_start(self):
+        """음성 감지: 말하는 동안 STT / LLM / TTS 서버에 미리 연결 (최근에 쓴 호스트는 건너뜀)"""
+        self._indicate_listening(True)
+        http_pool.prewarm()
+
 
     def _contains_trigger_word(self, text):
         """텍스트에 트리거 단어가 포함되어 있는지 확인"""
@@ -788,6 +796,12 @@ class VoiceAssistant:
                     mode_str = "WAKE" if not self.sleep_mode else "SLEEP"
                     logger.debug(f"[{mode_str} MODE] 음성 입력 대기 중...")
 
+                    # 지난 턴의 HTTPS 연결 재사용 / 핸드셰이크 시간
+                    http_report = http_pool.turn_report()
+                    if http_report:
+                        print(http_report, flush=True)
+                    http_pool.begin_turn()
+
                     # 듣는 중 표시
                     self._indicate_listening(True)
 
@@ -797,7 +811,7 @@ class VoiceAssistant:
 
                     try:
                         audio_data = self.vad.record(
-                            on_start=lambda: self._indicate_listening(True),
+                            on_start=self._on_speech_start,
                             on_stop=lambda: self._indicate_listening(False),
                             filename=temp_wav.name,
                         )
@@ -59,6 +59,15 @@ except ImportError:
     print("AIY Projects가 설치되어 있는지 확인하세요.")
     sys.exit(1)
 
+# 중간 결과(interim)를 받는 음성 인식용 (CloudSpeechClient.recognize는 final만 반환)
+try:
+    from aiy.cloudspeech import AUDIO_FORMAT, END_OF_SINGLE_UTTERANCE, speech
+    from aiy.voice.audio import Recorder
+
+    HAS_INTERIM_STT = True
+except ImportError:
+    HAS_INTERIM_STT = False
+
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -103,6 +112,22 @@ SLEEP_TIMEOUT = float(os.environ.get("SLEEP_TIMEOUT", "10.0"))
 # Google Cloud Speech 언어 코드
 GOOGLE_SPEECH_LANGUAGE = os.environ.get("GOOGLE_SPEECH_LANGUAGE", "ko_KR")
 
+# LLM 응답 스트리밍 (ChipiBrain.wait_run_stream)
+# 켜면 응답 전체를 기다리지 않고 완성된 문장부터 바로 TTS로 말함
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "false").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
+# LLM 미리 요청 (core/speculative_reply.py)
+# 켜면 STT 중간 결과가 안정되는 대로 LLM 요청을 시작하고, final transcript가 같으면 그 응답을 씀
+SPECULATIVE_LLM = os.environ.get("SPECULATIVE_LLM", "false").lower() in (
+    "true",
+    "1",
+    "yes",
+)
+
 # 얼굴 표정 제어 설정
 DEVICE_SERIAL = os.environ.get("DEVICE_SERIAL")
 SERVER_URL = os.environ.get(
@@ -129,6 +154,9 @@ except ImportError:
     print("requests가 설치되지 않았습니다: pip3 install requests")
     sys.exit(1)
 
+# 클라우드 API 공용 HTTPS 연결 풀 (keep-alive, 미리 연결, 핸드셰이크 측정)
+from utils import http_pool
+
 try:
     import tempfile
 except ImportError:
@@ -162,6 +190,7 @@ class SupertonTTS:
         if not self.api_key:
             raise ValueError("❌ SUPERTON_API_KEY가 설정되지 않았습니다.")
 
+        http_pool.register("https://supertoneapi.com")
         logger.info("SuperTone TTS 초기화 완료 (음성 ID: %s)", self.voice_id)
 
     def generate(
@@ -208,7 +237,9 @@ class SupertonTTS:
 
         try:
             logger.debug(f"SuperTone 음성 생성 중: {text[:20]}...")
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = http_pool.session().post(
+                url, json=payload, headers=headers, timeout=30
+            )
 
             if response.status_code == 200:
                 logger.debug("SuperTone 음성 생성 완료")
@@ -312,18 +343,14 @@ except ImportError:
             print(f"❌ ChipiBrain을 import할 수 없습니다: {e}")
             sys.exit(1)
 
+# ChipiBrain과 같은 경로의 core 패키지
+from core.speculative_reply import Speculator
+
 # 상수 import
 try:
     from constants import (
         EMOTION_CHECK_ORDER,
         EMOTION_DEFAULT,
-        EMOTION_KEYWORDS,
-        EXIT_COMMANDS,
-        LED_OFF_KEYWORDS,
-        LED_ON_KEYWORDS,
-        SAD_TONE_KEYWORDS,
-        SERVO_KEYWORDS,
-        SLEEP_COMMANDS,
     )
 except ImportError:
     # 현재 디렉토리 기준으로 시도
@@ -333,13 +360,6 @@ except ImportError:
     from constants import (
         EMOTION_CHECK_ORDER,
         EMOTION_DEFAULT,
-        EMOTION_KEYWORDS,
-        EXIT_COMMANDS,
-        LED_OFF_KEYWORDS,
-        LED_ON_KEYWORDS,
-        SAD_TONE_KEYWORDS,
-        SERVO_KEYWORDS,
-        SLEEP_COMMANDS,
     )
 
 
@@ -530,6 +550,107 @@ def _run_servo_async():
     return thread
 
 
+def _speak_streaming_response(
+    brain, tts, device_serial, is_sad_topic, speculation=None
+):
+    """LLM 응답을 스트리밍으로 받아 완성된 문장부터 말함. 전체 응답 반환
+
+    표정과 서보 모터는 첫 문장 기준으로 정한다 (전체 응답을 기다리지 않기 위해).
+    speculation: 이번 발화로 미리 시작한 요청 (Speculator.take)
+    """
+    response_style = "sad" if is_sad_topic else "neutral"
+    pitch_shift = -10 if is_sad_topic else 0
+    sentences = []
+    for kind, text in brain.wait_run_stream(
+        ai_name="chipi", device_serial=device_serial, speculation=speculation
+    ):
+        if kind != "sentence":
+            continue
+        if not sentences:
+            print("✅ 첫 문장 도착", flush=True)
+            detected_emotion = _detect_face_emotion_from_response(text)
+            print(f"😊 감지된 표정: {detected_emotion}", flush=True)
+            if DEVICE_SERIAL:
+                threading.Thread(
+                    target=lambda: _set_face_emotion(detected_emotion),
+                    daemon=True,
+                ).start()
+            _run_servo_async()
+        sentences.append(text)
+        print(f"🤖 치피: {text}", flush=True)
+        tts.speak(
+            text,
+            language="ko",
+            style=response_style,
+            pitch_shift=pitch_shift,
+        )
+    return " ".join(sentences)
+
+
+def _recognize_with_interim(client, language_code, hint_phrases, on_interim):
+    """CloudSpeechClient.recognize와 같지만 중간 결과(interim_results)를 on_interim으로 넘김
+
+    on_interim(text, stability, end_of_utterance)는 중간 결과마다 호출되고, 발화 끝
+    (END_OF_SINGLE_UTTERANCE)이 감지되면 마지막 중간 결과로 한 번 더 호출된다.
+    aiy.cloudspeech 내부 구성이 다르면 client.recognize로 대신한다 (중간 결과 없음).
+    """
+    if not HAS_INTERIM_STT or not hasattr(client, "_make_config"):
+        return client.recognize(language_code=language_code, hint_phrases=hint_phrases)
+
+    streaming_config = speech.types.StreamingRecognitionConfig(
+        config=client._make_config(language_code, hint_phrases),
+        single_utterance=True,
+        interim_results=True,
+    )
+    interim = ""
+    with Recorder() as recorder:
+        chunks = recorder.record(
+            AUDIO_FORMAT,
+            chunk_duration_sec=0.1,
+            on_start=client.start_listening,
+            on_stop=client.stop_listening,
+        )
+        audio_requests = (
+            speech.types.StreamingRecognizeRequest(audio_content=data)
+            for data in chunks
+        )
+        responses = client._client.streaming_recognize(
+            config=streaming_config, requests=audio_requests
+        )
+        for response in responses:
+            if response.speech_event_type == END_OF_SINGLE_UTTERANCE:
+                recorder.done()
+                if interim:
+                    try:
+                        on_interim(interim, 1.0, True)
+                    except Exception as e:
+                        logger.error(f"미리 요청 오류: {e}")
+
+            results = [r for r in response.results if r.alternatives]
+            for result in results:
+                if result.is_final:
+                    return result.alternatives[0].transcript
+            if results:
+                # 앞쪽 result일수록 안정됨. 이어 붙인 전체가 현재 가설, 안정도는 가장 낮은 값
+                interim = "".join(r.alternatives[0].transcript for r in results)
+                try:
+                    on_interim(interim, min(r.stability for r in results), False)
+                except Exception as e:
+                    logger.error(f"미리 요청 오류: {e}")
+
+    return None
+
+
+# 키워드 매칭 (constants.KEYWORD_CATEGORIES 전체를 한 번에 검사)
+try:
+    from utils.keyword_matcher import match_categories
+except ImportError:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    if current_dir not in sys.path:
+        sys.path.insert(0, current_dir)
+    from utils.keyword_matcher import match_categories
+
+
 # 오디오 유틸리티 import
 try:
     from utils.audio_utils import (
@@ -578,13 +699,14 @@ except ImportError:
             return False
 
 
-def _contains_servo_keywords(text):
-    """서보 모터 실행 키워드 감지"""
+def _contains_servo_keywords(text, found=None):
+    """서보 모터 실행 키워드 감지 (found: 이미 구한 match_categories(text) 결과)"""
     if not text:
         return False
 
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in SERVO_KEYWORDS)
+    if found is None:
+        found = match_categories(text)
+    return "servo" in found
 
 
 def _detect_face_emotion_from_response(text):
@@ -600,12 +722,10 @@ def _detect_face_emotion_from_response(text):
     if not text:
         return EMOTION_DEFAULT
 
-    text_lower = text.lower()
-
-    # 우선순위대로 감정 체크
+    # 감정 키워드 전체를 한 번에 검사한 뒤 우선순위대로 선택
+    found = match_categories(text)
     for emotion in EMOTION_CHECK_ORDER:
-        keywords = EMOTION_KEYWORDS.get(emotion, [])
-        if any(keyword in text_lower for keyword in keywords):
+        if f"emotion:{emotion}" in found:
             logger.debug(f"감정 감지: {emotion} (키워드 매칭)")
             return emotion
 
@@ -631,12 +751,12 @@ def _set_face_emotion(emotion, serial=None, server_url=None):
         return False
 
     url = f"{server_url or SERVER_URL}/devices/{device_serial}"
-    # API 명세: lcd_face 필드만 보내면 됨
-    payload = {"lcd_face": emotion}
+    # API 명세: face 필드만 보내면 됨 (모르는 필드는 서버가 400으로 거절)
+    payload = {"face": emotion}
 
     try:
-        # Content-Type: application/x-www-form-urlencoded (기본값)
-        response = requests.patch(url, data=payload, timeout=5)
+        # Content-Type: application/json
+        response = http_pool.session().patch(url, json=payload, timeout=5)
         response.raise_for_status()
 
         logger.info(f"얼굴 표정 설정 성공: {emotion}")
@@ -646,8 +766,8 @@ def _set_face_emotion(emotion, serial=None, server_url=None):
         return False
 
 
-def _contains_led_keywords(text):
-    """LED 제어 키워드 감지
+def _contains_led_keywords(text, found=None):
+    """LED 제어 키워드 감지 (found: 이미 구한 match_categories(text) 결과)
 
     Returns:
         str or None: "on", "off", 또는 None
@@ -655,14 +775,15 @@ def _contains_led_keywords(text):
     if not text:
         return None
 
-    text_lower = text.lower()
+    if found is None:
+        found = match_categories(text)
 
     # LED 켜기 키워드 확인
-    if any(keyword in text_lower for keyword in LED_ON_KEYWORDS):
+    if "led_on" in found:
         return "on"
 
     # LED 끄기 키워드 확인
-    if any(keyword in text_lower for keyword in LED_OFF_KEYWORDS):
+    if "led_off" in found:
         return "off"
 
     return None
@@ -686,12 +807,12 @@ def _set_led_state(led_on, serial=None, server_url=None):
         return False
 
     url = f"{server_url or SERVER_URL}/devices/{device_serial}"
-    # API 명세: is_led_on 필드만 보내면 됨 (문자열로 "true" 또는 "false")
-    payload = {"is_led_on": "true" if led_on else "false"}
+    # API 명세: is_led_on 필드만 보내면 됨 (JSON boolean)
+    payload = {"is_led_on": bool(led_on)}
 
     try:
-        # Content-Type: application/x-www-form-urlencoded (기본값)
-        response = requests.patch(url, data=payload, timeout=5)
+        # Content-Type: application/json
+        response = http_pool.session().patch(url, json=payload, timeout=5)
         response.raise_for_status()
 
         state_str = "켜기" if led_on else "끄기"
@@ -779,6 +900,25 @@ def main():
             print("🧠 두뇌(LLM) 연결 중...", end=" ", flush=True)
             brain = ChipiBrain()
             print("✅ 완료")
+            if DEVICE_SERIAL:
+                http_pool.register(SERVER_URL)
+
+            # STT 중간 결과로 LLM 요청 미리 시작 (SPECULATIVE_LLM)
+            speculator = None
+            if SPECULATIVE_LLM:
+                speculator = Speculator(
+                    brain, ai_name="chipi", device_serial=device_serial
+                )
+                if not HAS_INTERIM_STT:
+                    logger.warning(
+                        "STT 중간 결과를 받을 수 없어 미리 요청을 하지 않습니다."
+                    )
+
+            def on_interim(text, stability, end_of_utterance):
+                # 말하기 시작: LLM / TTS / 서버에 미리 연결 (최근에 쓴 호스트는 건너뜀)
+                http_pool.prewarm()
+                if speculator:
+                    speculator.on_interim(text, stability, end_of_utterance)
 
             print("🎤 음성(SuperTone TTS) 연결 중...", end=" ", flush=True)
             tts = SupertonTTS()
@@ -803,9 +943,6 @@ def main():
                 tts=tts, trigger_words=trigger_words, use_trigger_word=USE_TRIGGER_WORD
             )
 
-            # 슬픈 톤을 사용할 키워드 목록 (constants에서 가져옴)
-            sad_keywords = SAD_TONE_KEYWORDS
-
             # Main loop
             while True:
                 try:
@@ -819,13 +956,31 @@ def main():
                             sleep_mode = True
                             last_interaction_time = None
 
+                    # 지난 턴에 쓰지 않은 미리 요청 (종료 / sleep / 오디오 매핑 등)은 버림
+                    if speculator:
+                        speculator.cancel()
+
+                    # 지난 턴의 HTTPS 연결 재사용 / 핸드셰이크 시간
+                    http_report = http_pool.turn_report()
+                    if http_report:
+                        print(http_report, flush=True)
+                    http_pool.begin_turn()
+
                     print("\n👂 듣는 중...", end=" ", flush=True)
                     indicate_listening(True)
 
                     # Google Cloud Speech-to-Text로 음성 인식 (VAD 내장)
-                    user_text = client.recognize(
-                        language_code=GOOGLE_SPEECH_LANGUAGE, hint_phrases=hints
-                    )
+                    # Sleep mode에서는 중간 결과를 받지 않음: 트리거 단어를 지운 텍스트로
+                    # 응답하므로 미리 요청하지 않고, 주변 대화마다 미리 연결하지도 않음
+                    if not sleep_mode:
+                        user_text = _recognize_with_interim(
+                            client, GOOGLE_SPEECH_LANGUAGE, hints, on_interim
+                        )
+                    else:
+                        user_text = client.recognize(
+                            language_code=GOOGLE_SPEECH_LANGUAGE, hint_phrases=hints
+                        )
+                    heard_at = time.monotonic()
 
                     indicate_listening(False)
 
@@ -845,6 +1000,7 @@ def main():
                     if sleep_mode and USE_TRIGGER_WORD:
                         if _contains_trigger_word(user_text, trigger_words):
                             logger.info("트리거 단어 감지! Wake mode로 전환합니다.")
+                            http_pool.prewarm()
                             sleep_mode = False
                             last_interaction_time = time.time()
                             # 트리거 단어 제거 (예: "치피 안녕하세요" → "안녕하세요")
@@ -866,6 +1022,7 @@ def main():
                             continue
                     elif sleep_mode and not USE_TRIGGER_WORD:
                         # 트리거 단어가 비활성화되어 있으면 바로 Wake mode로 전환
+                        http_pool.prewarm()
                         sleep_mode = False
                         last_interaction_time = time.time()
 
@@ -873,21 +1030,24 @@ def main():
                     if not sleep_mode:
                         last_interaction_time = time.time()
 
+                    # 명령 / 서보 / LED / 슬픈 톤 키워드를 한 번에 검사
+                    found = match_categories(user_text)
+
                     # 종료 명령 확인
-                    if any(cmd in user_text.lower() for cmd in EXIT_COMMANDS):
+                    if "exit" in found:
                         logger.info("종료 명령을 받았습니다.")
                         tts.speak("안녕히 가세요!", language="ko", style="neutral")
                         break
 
                     # Sleep 명령 확인 (Sleep mode로 전환)
-                    if any(cmd in user_text.lower() for cmd in SLEEP_COMMANDS):
+                    if "sleep" in found:
                         logger.info("Sleep mode로 전환합니다.")
                         sleep_mode = True
                         last_interaction_time = None
                         continue
 
                     # 서보 모터 실행 키워드 감지
-                    if _contains_servo_keywords(user_text):
+                    if _contains_servo_keywords(user_text, found):
                         logger.info("서보 모터 실행 키워드 감지!")
                         print("🔄 서보 모터 실행 중...", flush=True)
                         # 비동기로 실행 (서보 실행과 동시에 AI 응답도 처리 가능)
@@ -895,7 +1055,7 @@ def main():
                         print("✅ 서보 모터 실행 시작 (백그라운드)", flush=True)
 
                     # LED 제어 키워드 감지
-                    led_action = _contains_led_keywords(user_text)
+                    led_action = _contains_led_keywords(user_text, found)
                     if led_action:
                         logger.info(f"LED {led_action.upper()} 키워드 감지!")
                         print(f"💡 LED {led_action.upper()} 중...", flush=True)
@@ -1009,14 +1169,33 @@ def main():
                         continue  # LLM 호출 없이 다음 루프로 (LED 제어는 이미 위에서 실행됨)
 
                     # 슬픈 톤 키워드 감지
-                    is_sad_topic = any(keyword in user_text for keyword in sad_keywords)
+                    is_sad_topic = "sad_tone" in found
                     print(f"🔍 슬픈 토픽 감지: {is_sad_topic}", flush=True)
 
                     # AI 응답 생성 (LLM 호출)
                     print("🧠 생각하는 중...", end=" ", flush=True)
                     brain.add_msg(user_text)
+                    # 같은 텍스트로 미리 시작한 요청이 있으면 그 응답을 씀 (다르면 취소 후 새로 요청)
+                    speculation = (
+                        speculator.take(user_text, heard_at) if speculator else None
+                    )
+
+                    if LLM_STREAMING:
+                        # 문장이 완성되는 대로 말함 (중복 응답 검사는 하지 않음)
+                        ai_response = _speak_streaming_response(
+                            brain, tts, device_serial, is_sad_topic, speculation
+                        )
+                        logger.info(f"AI: {ai_response}")
+                        if not sleep_mode:
+                            last_response = ai_response
+                            last_interaction_time = time.time()
+                        brain.summarize_in_background()
+                        continue
+
                     ai_response = brain.wait_run(
-                        ai_name="chipi", device_serial=device_serial
+                        ai_name="chipi",
+                        device_serial=device_serial,
+                        speculation=speculation,
                     )
                     print("✅ 완료", flush=True)
                     logger.info(f"AI: {ai_response}")
@@ -1075,6 +1254,9 @@ def main():
                         last_response = ai_response
                         last_interaction_time = time.time()
 
+                    # 다 말한 뒤 오래된 대화를 요약에 접음 (백그라운드)
+                    brain.summarize_in_background()
+
                 except KeyboardInterrupt:
                     logger.info("\n사용자에 의해 종료됨")
                     break
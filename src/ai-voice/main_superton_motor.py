@@ -48,6 +48,9 @@ except ImportError:
     print("requests가 설치되지 않았습니다: pip3 install requests")
     sys.exit(1)
 
+# 클라우드 API 공용 HTTPS 연결 풀 (keep-alive, 미리 연결, 핸드셰이크 측정)
+from utils import http_pool
+
 # AIY Projects 모듈 (시스템에 이미 설치된 것 사용)
 try:
     from aiy.voice.audio import AudioFormat, Recorder, play_wav
@@ -159,6 +162,7 @@ class AzureSpeechRESTSTT:
         self.language = language
         self.api_key = AZURE_SPEECH_API_KEY
         self.stt_url = f"{AZURE_SPEECH_ENDPOINT}/speech/recognition/conversation/cognitiveservices/v1"
+        http_pool.register(self.stt_url)
         logger.info(f"Azure Speech REST API STT 초기화 완료 (언어: {language})")
 
     def recognize_from_file(self, audio_file_path):
@@ -188,7 +192,7 @@ class AzureSpeechRESTSTT:
 
             # 요청
             logger.info("음성 인식 중...")
-            response = requests.post(
+            response = http_pool.session().post(
                 self.stt_url,
                 headers=headers,
                 params=params,
@@ -273,6 +277,7 @@ class SupertonTTS:
         if not self.api_key:
             raise ValueError("❌ SUPERTON_API_KEY가 설정되지 않았습니다.")
 
+        http_pool.register("https://supertoneapi.com")
         logger.info("SuperTone TTS 초기화 완료 (음성 ID: %s)", self.voice_id)
 
     def generate(
@@ -319,7 +324,9 @@ class SupertonTTS:
 
         try:
             logger.debug(f"SuperTone 음성 생성 중: {text[:20]}...")
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = http_pool.session().post(
+                url, json=payload, headers=headers, timeout=30
+            )
 
             if response.status_code == 200:
                 logger.debug("SuperTone 음성 생성 완료")
@@ -736,6 +743,11 @@ def main():
             else:
                 board.led.state = Led.OFF
 
+    def on_speech_start():
+        """음성 감지: 말하는 동안 STT / LLM / TTS 서버에 미리 연결 (최근에 쓴 호스트는 건너뜀)"""
+        indicate_listening(True)
+        http_pool.prewarm()
+
     try:
         print("🧠 두뇌(LLM) 연결 중...", end=" ", flush=True)
         brain = ChipiBrain()
@@ -813,11 +825,17 @@ def main():
                 mode_str = "WAKE" if not sleep_mode else "SLEEP"
                 logger.debug(f"[{mode_str} MODE] 음성 입력 대기 중...")
 
+                # 지난 턴의 HTTPS 연결 재사용 / 핸드셰이크 시간
+                http_report = http_pool.turn_report()
+                if http_report:
+                    print(http_report, flush=True)
+                http_pool.begin_turn()
+
                 print("\n👂 듣는 중...", end=" ", flush=True)
                 indicate_listening(True)
 
                 audio_data = vad.record(
-                    on_start=lambda: indicate_listening(True),
+                    on_start=on_speech_start,
                     on_stop=lambda: indicate_listening(False),
                     filename=temp_wav.name,
                 )
@@ -968,6 +986,9 @@ def main():
                     last_response = ai_response
                     last_interaction_time = time.time()
 
+                # 다 말한 뒤 오래된 대화를 요약에 접음 (백그라운드)
+                brain.summarize_in_background()
+
             finally:
                 # 임시 파일 삭제
                 try:
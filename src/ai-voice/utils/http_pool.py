@@ -0,0 +1,306 @@
+"""
+클라우드 API용 HTTPS 연결 풀 (keep-alive, 미리 연결, 핸드셰이크 측정)
+
+SuperTone TTS, Azure Speech, Azure OpenAI, 치피 서버(얼굴 표정 / LED / 센서) 요청이
+requests.post / requests.patch로 매번 새 연결을 열었다. Pi Zero에서는 TCP + TLS
+핸드셰이크에 수백 ms가 들기 때문에, 모든 클라이언트가 여기 있는 연결 풀을 같이 쓴다.
+
+- session(): 공유 requests.Session. 호스트별 keep-alive 연결을 POOL_SIZE개까지 들고 있음
+  (openai 0.28.x도 openai.requestssession으로 이 세션을 씀)
+- httpx_client(): openai 1.x용 httpx.Client. h2 패키지가 있으면 HTTP/2, keep-alive 유지 시간은
+  KEEPALIVE초 (httpx 기본값 5초면 턴 사이에 연결이 끊김). requests(urllib3)는 HTTP/1.1만 지원
+- register(url) / prewarm(): 등록한 호스트에 말이 시작될 때(음성 감지 / wake word)
+  백그라운드에서 HEAD 요청을 보내 TCP + TLS 연결을 미리 열어 둔다.
+  최근 PREWARM_FRESH초 안에 쓴 호스트는 연결이 살아 있을 테니 건너뜀
+- 새 연결마다 TCP + TLS 시간을 재서 begin_turn() / turn_report()로 턴마다
+  요청 수, 새 연결 수, 재사용으로 아낀 핸드셰이크 시간(재사용 수 x 그 호스트 평균 핸드셰이크)을 출력
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPSConnectionPool
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (httpx의 HTTP/2 지원)
+
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+POOL_SIZE = 4  # 호스트별 keep-alive 연결 수
+KEEPALIVE = 120.0  # httpx: 쉬는 연결을 유지하는 시간 (초)
+PREWARM_FRESH = 10.0  # 이 시간 안에 쓴 호스트는 미리 연결하지 않음 (초)
+PREWARM_TIMEOUT = 3.0
+MAX_RETRIES = 2  # 연결 오류 재시도 (서버가 닫은 keep-alive 연결에 보냈을 때, POST 포함)
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ("true", "1", "yes")
+
+
+# prewarm 스레드 표시 (미리 연결은 요청 / 새 연결 수에 넣지 않고 따로 셈)
+_local = threading.local()
+
+
+def _prewarming():
+    return getattr(_local, "prewarm", False)
+
+
+class HandshakeStats:
+    """호스트별 요청 수, 새 연결 수, 핸드셰이크 시간"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # host -> [요청, 새 연결, 새 연결 핸드셰이크(초), 미리 연결, 미리 연결 핸드셰이크(초)]
+        self.hosts = {}
+        self.last_used = {}  # host -> 마지막 요청 / 미리 연결 시각 (monotonic)
+        self.fresh_seconds = float(
+            os.environ.get("HTTP_PREWARM_FRESH", str(PREWARM_FRESH))
+        )
+
+    def _entry(self, host):
+        return self.hosts.setdefault(host, [0, 0, 0.0, 0, 0.0])
+
+    def request(self, host):
+        with self.lock:
+            self.last_used[host] = time.monotonic()
+            if not _prewarming():
+                self._entry(host)[0] += 1
+
+    def handshake(self, host, seconds):
+        with self.lock:
+            entry = self._entry(host)
+            if _prewarming():
+                entry[3] += 1
+                entry[4] += seconds
+            else:
+                entry[1] += 1
+                entry[2] += seconds
+
+    def fresh(self, host, now):
+        """최근 fresh_seconds초 안에 쓴 호스트인지. 아니면 지금 쓴 것으로 표시 (중복 미리 연결 방지)"""
+        with self.lock:
+            if now - self.last_used.get(host, float("-inf")) < self.fresh_seconds:
+                return True
+            self.last_used[host] = now
+            return False
+
+    def snapshot(self):
+        with self.lock:
+            return {host: list(entry) for host, entry in self.hosts.items()}
+
+    def since(self, snapshot):
+        """
+        snapshot 이후 합계
+
+        Returns:
+            (요청, 새 연결, 새 연결 핸드셰이크 초, 미리 연결, 아낀 핸드셰이크 초)
+        """
+        totals = [0, 0, 0.0, 0, 0.0]
+        for host, entry in self.snapshot().items():
+            before = snapshot.get(host, [0, 0, 0.0, 0, 0.0])
+            delta = [after - prev for after, prev in zip(entry, before)]
+            handshakes = entry[1] + entry[3]
+            average = (entry[2] + entry[4]) / handshakes if handshakes else 0.0
+            totals[0] += delta[0]
+            totals[1] += delta[1]
+            totals[2] += delta[2]
+            totals[3] += delta[3]
+            totals[4] += max(0, delta[0] - delta[1]) * average
+        return tuple(totals)
+
+
+STATS = HandshakeStats()
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """connect()(TCP + TLS) 시간을 STATS에 기록"""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        STATS.handshake(self.host, time.perf_counter() - start)
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _StaleConnectionRetry(Retry):
+    """
+    응답을 받기 전에 연결이 끊겼으면 POST도 다시 보내는 Retry
+
+    서버가 먼저 닫은 keep-alive 연결에 요청을 보내면 응답 없이 RemoteDisconnected /
+    ConnectionResetError(ProtocolError)가 난다. 기본 Retry는 POST의 read 오류를 다시 보내지
+    않아서 TTS / STT / LLM 요청(모두 POST)이 그대로 실패했다. 응답을 기다리다 난
+    read timeout은 서버가 처리 중일 수 있으므로 POST는 여전히 다시 보내지 않는다.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        if (
+            isinstance(error, ReadTimeoutError)
+            and method
+            and method.upper() not in Retry.DEFAULT_ALLOWED_METHODS
+        ):
+            raise error
+        return super().increment(method, url, response, error, *args, **kwargs)
+
+
+class _PoolAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(
+            self.poolmanager.pool_classes_by_scheme, https=_TimedHTTPSConnectionPool
+        )
+
+
+class _SharedSession(requests.Session):
+    """여러 클라이언트가 같이 쓰는 세션
+
+    openai 0.28.x는 스레드마다 세션을 만든 지 180초가 지나면 close()하고 새로 만든다.
+    공유 세션에서는 그 close()가 다른 클라이언트의 keep-alive 연결까지 끊으므로 무시한다.
+    """
+
+    def close(self):
+        pass
+
+
+def _count_response(response, *args, **kwargs):
+    STATS.request(urlsplit(response.url).hostname)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """공유 requests.Session (requests.post 대신 session().post)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.environ.get("HTTP_POOL_SIZE", str(POOL_SIZE)))
+            shared = _SharedSession()
+            shared.mount(
+                "https://",
+                _PoolAdapter(
+                    pool_maxsize=pool_size,
+                    max_retries=_StaleConnectionRetry(
+                        total=MAX_RETRIES, allowed_methods=None
+                    ),
+                ),
+            )
+            shared.hooks["response"].append(_count_response)
+            _session = shared
+        return _session
+
+
+def httpx_client():
+    """openai 1.x용 httpx.Client (AzureOpenAI(http_client=...)). httpx가 없으면 None"""
+    if httpx is None:
+        return None
+
+    def count_request(request):
+        host = request.url.host
+        STATS.request(host)
+        started = []
+
+        def trace(event_name, info):
+            # httpcore trace: 새 연결일 때만 connect_tcp / start_tls 이벤트가 옴
+            if event_name == "connection.connect_tcp.started":
+                started.append(time.perf_counter())
+            elif event_name == "connection.start_tls.complete" and started:
+                STATS.handshake(host, time.perf_counter() - started[0])
+
+        request.extensions["trace"] = trace
+
+    pool_size = int(os.environ.get("HTTP_POOL_SIZE", str(POOL_SIZE)))
+    return httpx.Client(
+        http2=HAS_HTTP2,
+        limits=httpx.Limits(
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=float(os.environ.get("HTTP_KEEPALIVE", str(KEEPALIVE))),
+        ),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+        event_hooks={"request": [count_request]},
+    )
+
+
+# 미리 연결할 origin -> 그 origin에 요청하는 클라이언트 (requests.Session / httpx.Client)
+_targets = {}
+
+
+def register(url, client=None):
+    """url의 호스트를 미리 연결 대상으로 등록 (client가 없으면 공유 session)"""
+    if not url:
+        return
+    parts = urlsplit(url)
+    if parts.scheme != "https" or not parts.hostname:
+        return
+    _targets[f"https://{parts.netloc}/"] = client
+
+
+def prewarm():
+    """
+    등록한 호스트에 백그라운드로 연결을 열어 둠 (음성 감지 / wake word 때 호출)
+
+    HTTP_PREWARM=false면 아무것도 하지 않는다.
+
+    Returns:
+        미리 연결을 시작한 호스트 수
+    """
+    if not _env_flag("HTTP_PREWARM", "true"):
+        return 0
+    now = time.monotonic()
+    started = 0
+    for origin, client in list(_targets.items()):
+        if STATS.fresh(urlsplit(origin).hostname, now):
+            continue
+        threading.Thread(
+            target=_prewarm_one, args=(origin, client or session()), daemon=True
+        ).start()
+        started += 1
+    return started
+
+
+def _prewarm_one(origin, client):
+    _local.prewarm = True
+    try:
+        # 응답 코드는 상관없음 (연결만 열면 됨)
+        client.head(origin, timeout=PREWARM_TIMEOUT)
+    except Exception:
+        pass
+
+
+_turn_snapshot = {}
+
+
+def begin_turn():
+    """턴 시작 (turn_report의 기준)"""
+    global _turn_snapshot
+    _turn_snapshot = STATS.snapshot()
+
+
+def turn_report():
+    """begin_turn 이후 HTTPS 요청 / 연결 한 줄 요약. 요청이 없었으면 None"""
+    requests_count, new, new_seconds, prewarmed, saved = STATS.since(_turn_snapshot)
+    if not requests_count and not prewarmed:
+        return None
+    return (
+        f"🔌 HTTPS 요청 {requests_count}건: 새 연결 {new}건 "
+        f"(핸드셰이크 {new_seconds * 1000:.0f} ms), "
+        f"재사용 {max(0, requests_count - new)}건 (약 {saved * 1000:.0f} ms 절약), "
+        f"미리 연결 {prewarmed}건"
+    )
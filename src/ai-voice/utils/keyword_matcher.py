@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+키워드 카테고리 매칭 (Aho-Corasick)
+
+의도 / 감정 감지는 카테고리마다 any(keyword in text for keyword in LIST)를 돌려서
+발화 하나에 수백 번 부분 문자열 검색을 했다 (감정 키워드만 400개 이상).
+constants.KEYWORD_CATEGORIES 전체를 import할 때 automaton 하나로 만들어 두고,
+텍스트를 한 번 훑으면서 걸린 카테고리를 전부 돌려준다.
+
+    from utils.keyword_matcher import match_categories
+    found = match_categories("오늘 너무 피곤해")  # {"emotion:TIRED", "tired"}
+
+- 텍스트와 키워드 모두 소문자로 비교한다 ("LED 켜"도 "led 켜"로 매칭)
+- 결과는 걸린 카테고리 이름의 set. 우선순위(감정 순서, LED 켜기 > 끄기 등)는
+  호출한 쪽이 정한다.
+"""
+
+import os
+import sys
+
+try:
+    from constants import KEYWORD_CATEGORIES
+except ImportError:
+    # 상위 디렉토리 (src/ai-voice) 기준으로 시도
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+    from constants import KEYWORD_CATEGORIES
+
+
+class KeywordMatcher:
+    def __init__(self, categories):
+        """
+        Args:
+            categories: {카테고리 이름: [키워드, ...]}
+        """
+        self.names = list(categories)
+        # 상태별 전이 / 실패 링크 / 출력(카테고리 bitmask). 상태 0이 root
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]
+
+        for index, name in enumerate(self.names):
+            for keyword in categories[name]:
+                keyword = keyword.lower()
+                if keyword:
+                    self._add(keyword, 1 << index)
+        self._build_fail_links()
+
+    def _add(self, keyword, bit):
+        state = 0
+        for ch in keyword:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(0)
+                self.goto[state][ch] = next_state
+            state = next_state
+        self.output[state] |= bit
+
+    def _build_fail_links(self):
+        # BFS: 얕은 상태의 실패 링크가 먼저 정해져야 함
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                # 접미사로 끝나는 키워드의 카테고리도 같이 출력
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def match_mask(self, text):
+        """걸린 카테고리 bitmask (index는 self.names 순서)"""
+        if not text:
+            return 0
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        mask = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            mask |= output[state]
+        return mask
+
+    def match(self, text):
+        """걸린 카테고리 이름의 set"""
+        mask = self.match_mask(text)
+        found = set()
+        index = 0
+        while mask:
+            if mask & 1:
+                found.add(self.names[index])
+            mask >>= 1
+            index += 1
+        return found
+
+
+# import할 때 한 번만 만든다 (라즈베리 파이 제로에서 수십 ms)
+KEYWORD_MATCHER = KeywordMatcher(KEYWORD_CATEGORIES)
+
+
+def match_categories(text):
+    """constants.KEYWORD_CATEGORIES 중 text에 걸린 카테고리 이름의 set"""
+    return KEYWORD_MATCHER.match(text)
@@ -0,0 +1,15 @@
+"""
+src/server (HTTP)와 src/server_tcp (TCP)가 함께 쓰는 모듈
+
+각 서버의 main.py가 src/ 디렉토리를 sys.path에 추가한 뒤 import한다:
+    from common.eventlog import setup_logging, log_event
+    from common.statestore import open_state_store
+
+- eventlog: 큐 기반 구조화 로그
+- statestore / statebroker: LED/Face 상태 저장소와 프로세스 간 공유용 broker
+- shmstate: 같은 호스트의 worker / 서버가 mmap으로 공유하는 상태 저장소 (shm://)
+- deadband: 센서 reading deadband / 중복 필터
+- latest: serial별 최신 센서 reading 캐시 (메모리 또는 shm://)
+- plantstatus: reading을 받을 때 판단하는 식물 상태 (hysteresis)
+- deviceindex: 디바이스 목록 / fleet 조회용 메모리 인덱스
+"""
@@ -0,0 +1,72 @@
+"""
+센서 reading deadband / 중복 필터 (HTTP, TCP 서버 공용)
+
+실내 화분의 온습도는 30초 간격으로 거의 변하지 않는다. 마지막으로 저장한 값과의
+차이가 deadband 이내면 저장하지 않고 개수만 센다. 그래도 heartbeat초가 지나면
+변화가 없어도 1건은 저장해서 "센서가 살아 있음"과 시계열의 최소 해상도를 보장한다.
+
+- 같은 timestamp, 같은 값의 reading은 재전송으로 보고 duplicates로 센다
+- 마지막 저장 시각보다 오래된 reading(배치 backfill)은 필터하지 않고 그대로 통과
+- temperature/humidity deadband가 모두 0이면 필터를 끈다 (전부 저장)
+"""
+
+
+class DeadbandFilter:
+    def __init__(self, temperature: float = 0.1, humidity: float = 0.5, heartbeat: float = 600.0):
+        self.temperature = temperature
+        self.humidity = humidity
+        self.heartbeat = heartbeat
+        # serial -> 마지막으로 통과시킨 (timestamp, temperature, humidity)
+        self.last = {}
+        self.stored = 0
+        self.suppressed = 0
+        self.duplicates = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.temperature > 0 or self.humidity > 0
+
+    def offer(self, serial: str, timestamp: float, temperature: float, humidity: float) -> bool:
+        """저장해야 하면 True. False면 개수만 센 것"""
+        last = self.last.get(serial)
+        if last is not None:
+            last_ts, last_t, last_h = last
+            if timestamp == last_ts and temperature == last_t and humidity == last_h:
+                self.duplicates += 1
+                return False
+            if timestamp < last_ts:
+                self.stored += 1
+                return True
+            if (
+                self.enabled
+                and timestamp - last_ts < self.heartbeat
+                and abs(temperature - last_t) <= self.temperature
+                and abs(humidity - last_h) <= self.humidity
+            ):
+                self.suppressed += 1
+                return False
+
+        self.last[serial] = (timestamp, temperature, humidity)
+        self.stored += 1
+        return True
+
+    def filter(self, readings: list) -> list:
+        """reading dict 목록 중 저장할 것만 반환"""
+        return [
+            r for r in readings
+            if self.offer(r["serial"], r["timestamp"], r["temperature"], r["humidity"])
+        ]
+
+    def forget(self, serial: str):
+        """디바이스 연결이 끊기면 기준값을 버려 재접속 후 첫 reading은 항상 저장"""
+        self.last.pop(serial, None)
+
+    def stats(self) -> dict:
+        total = self.stored + self.suppressed + self.duplicates
+        return {
+            "received": total,
+            "stored": self.stored,
+            "suppressed": self.suppressed,
+            "duplicates": self.duplicates,
+            "store_ratio": round(self.stored / total, 4) if total else None,
+        }
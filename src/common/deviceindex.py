@@ -0,0 +1,203 @@
+"""
+디바이스 목록 / fleet 조회용 메모리 인덱스 (HTTP, TCP 서버 공용)
+
+"지금 접속 중인 디바이스", "센서가 끊긴 디바이스", "LED가 켜진 디바이스"를
+디바이스 10만 대에서도 전체를 훑지 않고 찾기 위한 보조 인덱스.
+메시지를 받을 때마다 갱신한다.
+
+- last_seen / last_sensor: OrderedDict를 시각 순서로 유지 (갱신 시 move_to_end).
+  "최근 N초 안에 본 디바이스"는 뒤에서부터, "N초 넘게 못 본 디바이스"는 앞에서부터
+  cutoff까지만 읽으면 된다.
+- is_led_on / face: 값 -> serial 집합
+- serials: 전체 serial 정렬 목록. cursor(마지막으로 돌려준 serial) 다음부터 bisect로 시작
+
+조회는 조건 중 후보가 가장 적은 것을 골라, 후보가 SORT_THRESHOLD 이하면 정렬해서
+돌려주고, 그보다 많으면 정렬 목록을 cursor부터 훑으면서 조건을 검사한다 (limit개 찾으면 멈춤).
+시각은 서버가 메시지를 받은 시각(time.time())이다.
+"""
+
+import bisect
+from collections import OrderedDict
+
+SORT_THRESHOLD = 5000
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+ONLINE_WINDOW = 60.0  # seconds, 마지막 메시지가 이 안이면 online
+SENSOR_STALE_AFTER = 900.0  # seconds, 마지막 센서 reading이 이보다 오래됐으면 stale
+
+
+class DeviceIndex:
+    def __init__(self):
+        self.serials = []
+        self.last_seen = OrderedDict()
+        self.last_sensor = OrderedDict()
+        # 센서 reading을 한 번도 보내지 않은 디바이스
+        self.no_sensor = set()
+        self.led = {}
+        self.face = {}
+        self.by_led = {True: set(), False: set()}
+        self.by_face = {}
+
+    def __len__(self) -> int:
+        return len(self.serials)
+
+    def _add(self, serial: str):
+        if serial in self.led:
+            return
+        bisect.insort(self.serials, serial)
+        self.no_sensor.add(serial)
+        self.led[serial] = False
+        self.face[serial] = "NEUTRAL"
+        self.by_led[False].add(serial)
+        self.by_face.setdefault("NEUTRAL", set()).add(serial)
+
+    # --- 갱신 ---
+
+    def seen(self, serial: str, now: float):
+        """디바이스가 보낸 메시지(polling, ping/pong 등)를 받음"""
+        self._add(serial)
+        self.last_seen[serial] = now
+        self.last_seen.move_to_end(serial)
+
+    def sensor(self, serial: str, now: float):
+        """센서 reading을 받음 (seen 포함)"""
+        self.seen(serial, now)
+        self.no_sensor.discard(serial)
+        self.last_sensor[serial] = now
+        self.last_sensor.move_to_end(serial)
+
+    def set_state(self, serial: str, is_led_on: bool, face: str):
+        """상태 저장소 변경 콜백에서 호출"""
+        self._add(serial)
+        if self.led[serial] != is_led_on:
+            self.by_led[self.led[serial]].discard(serial)
+            self.by_led[is_led_on].add(serial)
+            self.led[serial] = is_led_on
+        if self.face[serial] != face:
+            faces = self.by_face[self.face[serial]]
+            faces.discard(serial)
+            if not faces:
+                del self.by_face[self.face[serial]]
+            self.by_face.setdefault(face, set()).add(serial)
+            self.face[serial] = face
+
+    # --- 조회 ---
+
+    @staticmethod
+    def _recent(times: OrderedDict, cutoff: float, newer: bool):
+        """cutoff 이후(newer) 또는 이전 시각의 serial 집합. SORT_THRESHOLD를 넘으면 None"""
+        found = set()
+        items = reversed(times.items()) if newer else iter(times.items())
+        for serial, ts in items:
+            if (ts >= cutoff) != newer:
+                break
+            found.add(serial)
+            if len(found) > SORT_THRESHOLD:
+                return None
+        return found
+
+    def query(
+        self,
+        seen_after: float = None,
+        seen_before: float = None,
+        sensor_before: float = None,
+        sensor_after: float = None,
+        is_led_on: bool = None,
+        face: str = None,
+        cursor: str = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> tuple:
+        """
+        조건을 모두 만족하는 serial을 serial 순서로 limit개까지
+
+        seen_after: 마지막 메시지가 이 시각 이후 (online)
+        seen_before: 마지막 메시지가 이 시각 이전 (offline)
+        sensor_before: 마지막 센서 reading이 이 시각 이전이거나 없음 (stale)
+        sensor_after: 마지막 센서 reading이 이 시각 이후
+
+        Returns:
+            (serial 목록, 다음 cursor 또는 None)
+        """
+        predicates = []
+        candidates = []
+
+        if seen_after is not None:
+            predicates.append(lambda s: self.last_seen.get(s, float("-inf")) >= seen_after)
+            candidates.append(self._recent(self.last_seen, seen_after, newer=True))
+        if seen_before is not None:
+            predicates.append(lambda s: self.last_seen.get(s, float("-inf")) < seen_before)
+            # 한 번도 본 적 없는 디바이스(상태만 설정됨)도 offline
+            old = self._recent(self.last_seen, seen_before, newer=False)
+            unseen = len(self.serials) - len(self.last_seen)
+            candidates.append(None if old is None or unseen else old)
+        if sensor_before is not None:
+            predicates.append(lambda s: self.last_sensor.get(s, float("-inf")) < sensor_before)
+            old = self._recent(self.last_sensor, sensor_before, newer=False)
+            candidates.append(None if old is None else old | self.no_sensor)
+        if sensor_after is not None:
+            predicates.append(lambda s: self.last_sensor.get(s, float("-inf")) >= sensor_after)
+            candidates.append(self._recent(self.last_sensor, sensor_after, newer=True))
+        if is_led_on is not None:
+            predicates.append(lambda s: self.led[s] == is_led_on)
+            candidates.append(self.by_led[is_led_on])
+        if face is not None:
+            predicates.append(lambda s: self.face[s] == face)
+            candidates.append(self.by_face.get(face, set()))
+
+        limit = max(1, min(limit, MAX_LIMIT))
+        known = [c for c in candidates if c is not None]
+        smallest = min(known, key=len) if known else None
+
+        if smallest is not None and len(smallest) <= SORT_THRESHOLD:
+            pool = sorted(s for s in smallest if cursor is None or s > cursor)
+        else:
+            start = bisect.bisect_right(self.serials, cursor) if cursor is not None else 0
+            pool = (self.serials[i] for i in range(start, len(self.serials)))
+
+        found = []
+        for serial in pool:
+            if all(p(serial) for p in predicates):
+                if len(found) == limit:
+                    return found, found[-1]
+                found.append(serial)
+        return found, None
+
+    def find(
+        self,
+        now: float,
+        online: bool = None,
+        stale_sensor: bool = None,
+        is_led_on: bool = None,
+        face: str = None,
+        cursor: str = None,
+        limit: int = DEFAULT_LIMIT,
+        online_window: float = ONLINE_WINDOW,
+        stale_after: float = SENSOR_STALE_AFTER,
+    ) -> tuple:
+        """API 필터(online, stale_sensor 등)를 시각 조건으로 바꿔서 query"""
+        online_cutoff = now - online_window
+        sensor_cutoff = now - stale_after
+        return self.query(
+            seen_after=online_cutoff if online is True else None,
+            seen_before=online_cutoff if online is False else None,
+            sensor_before=sensor_cutoff if stale_sensor is True else None,
+            sensor_after=sensor_cutoff if stale_sensor is False else None,
+            is_led_on=is_led_on,
+            face=face,
+            cursor=cursor,
+            limit=limit,
+        )
+
+    def describe(self, serial: str, now: float, online_window: float = ONLINE_WINDOW) -> dict:
+        seen = self.last_seen.get(serial)
+        sensor = self.last_sensor.get(serial)
+        return {
+            "serial": serial,
+            "online": seen is not None and now - seen <= online_window,
+            "last_seen": seen,
+            "last_seen_age": round(now - seen, 3) if seen is not None else None,
+            "last_sensor_at": sensor,
+            "is_led_on": self.led[serial],
+            "face": self.face[serial],
+        }
@@ -0,0 +1,189 @@
+"""
+Non-blocking structured logging for src/server and src/server_tcp.
+
+핸들러 쪽(이벤트 루프 스레드)은 record를 큐에 넣기만 하고, 포맷팅과 파일/콘솔
+쓰기는 QueueListener 백그라운드 스레드가 맡는다. stdout이 막혀도 이벤트 루프는
+멈추지 않는다.
+
+- 파일 출력: JSON lines, 크기 기준 rotate (RotatingFileHandler)
+- 샘플링: event별로 N건 중 1건만 큐에 넣음 (예: sensor_data=100)
+- 큐가 가득 차면 record를 버리고 개수만 센다 (dropped)
+
+사용:
+    log = setup_logging("server", "logs/server.jsonl", sample_rates={"sensor_data": 100})
+    log_event(log, "sensor_data", serial="...", temperature=25.5)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime
+
+QUEUE_SIZE = 10000
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+
+def parse_sample_rates(spec: str) -> dict:
+    """"sensor_data=100,ack=10" -> {"sensor_data": 100, "ack": 10}"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        event, n = item.split("=", 1)
+        try:
+            rates[event.strip()] = max(1, int(n))
+        except ValueError:
+            continue
+    return rates
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """record 하나를 JSON 한 줄로. event / fields / sampled를 최상위 키로 펼침"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        sampled = getattr(record, "sampled", None)
+        if sampled:
+            entry["sampled"] = sampled
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """event별로 N건 중 첫 1건만 통과. 통과한 record에는 sampled=N을 붙임"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self.counters = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event, 1)
+        if rate <= 1:
+            return True
+        count = self.counters.get(event, 0)
+        self.counters[event] = count + 1
+        if count % rate:
+            return False
+        record.sampled = rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 블로킹하지 않고 버린다"""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 포맷팅은 listener 스레드에서 하도록 record를 그대로 넘김
+        # (args 병합만 여기서 해서 다른 스레드에서 원본 객체를 건드리지 않게 함)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+def setup_logging(
+    name: str,
+    path: str = None,
+    level: int = logging.INFO,
+    sample_rates: dict = None,
+    console: bool = True,
+) -> logging.Logger:
+    """
+    name 로거(와 하위 로거)를 큐 기반 비동기 로깅으로 설정
+
+    Args:
+        name: 로거 이름 (예: "server", "server_tcp")
+        path: JSON lines 파일 경로 (None이면 파일 출력 안 함)
+        level: 로그 레벨
+        sample_rates: event별 샘플링 비율 {event: N}
+        console: 사람이 읽는 형식으로 stderr에도 출력할지 여부
+
+    Returns:
+        logging.Logger
+    """
+    handlers = []
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+            )
+        )
+        handlers.append(console_handler)
+
+    q = queue.Queue(QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(q)
+    queue_handler.addFilter(SamplingFilter(sample_rates or {}))
+
+    logger = logging.getLogger(name)
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    # 종료 시 큐에 남은 record를 모두 쓰고 스레드 정리
+    atexit.register(listener.stop)
+    return logger
+
+
+class _EventMessage:
+    """샘플링으로 버려지는 record는 메시지 문자열을 만들지 않도록 지연 생성"""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return self.event + "".join(f" {k}={v}" for k, v in self.fields.items())
+
+
+def log_event(logger: logging.Logger, event: str, msg: str = "", level: int = logging.INFO, **fields):
+    """구조화된 이벤트 기록. msg가 없으면 event와 fields로 사람이 읽을 메시지를 만듦"""
+    if not logger.isEnabledFor(level):
+        return
+    extra = {"event": event, "fields": fields}
+    if msg:
+        logger.log(level, msg, extra=extra)
+    else:
+        logger.log(level, "%s", _EventMessage(event, fields), extra=extra)
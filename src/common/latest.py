@@ -0,0 +1,240 @@
+"""
+serial별 최신 센서 reading 캐시 (HTTP, TCP 서버 공용)
+
+음성 비서가 "온도 알려줘"에 답할 때마다 DB를 조회하지 않도록, 서버가 받은 마지막
+reading을 메모리에 들고 있다가 GET /devices/{serial}/sensor/latest (TCP: get_sensor)로
+바로 돌려준다. deadband로 저장하지 않은 reading도 캐시에는 반영된다.
+
+evaluator(plantstatus.PlantStatusEvaluator)를 주면 reading을 반영할 때 식물 상태도
+같이 판단해서 저장한다 (issues bitmask, 상태가 시작된 시각 status_since).
+update()는 상태가 바뀌었을 때만 (이전 issues, 새 issues)를 돌려준다.
+
+- LatestReadings: 프로세스 내부 dict (기본값)
+- ShmLatestReadings: 같은 호스트의 여러 프로세스(HTTP worker, TCP 서버)가 mmap 파일
+  하나를 공유. 구조는 shmstate.py와 같은 seqlock slot 테이블이다.
+
+timestamp가 캐시에 있는 값보다 오래된 reading(배치 backfill)은 무시한다.
+지금보다 FUTURE_SKEW초 넘게 미래인 reading은 ValueError로 거부한다 (밀리초 epoch 등이
+캐시에 들어가면 이후 reading이 전부 "오래된" 것으로 무시되어 최신값과 상태가 멈춤).
+이미 캐시에 미래 시각이 들어 있으면(공유 메모리에 남은 값) 다음 reading으로 덮어쓴다.
+
+사용:
+    latest = open_latest_readings(os.environ.get("SENSOR_LATEST_URL", ""))
+    latest.update(serial, timestamp, temperature, humidity, illuminance)
+    latest.get(serial)  # {"temperature", "humidity", "illuminance", "timestamp",
+                        #  "issues", "status_since"} 또는 None
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+MAGIC = b"CSLR"
+LAYOUT_VERSION = 2
+DEFAULT_SLOTS = 4096
+READ_RETRIES = 200
+# 처음 READ_SPINS번은 바로 다시 읽고 (쓰기는 보통 1µs 안에 끝남), 그 뒤로는 READ_BACKOFF초씩 쉼.
+# 쓰는 프로세스가 slot을 잡은 채 스케줄에서 밀렸으면 CPU를 양보해야 쓰기가 끝난다 (최대 약 10ms 후 RuntimeError)
+READ_SPINS = 100
+READ_BACKOFF = 0.00005
+
+HEADER_FORMAT = "<4sII"  # magic, layout, slots
+HEADER_SIZE = 64
+
+# seq, used, issues, timestamp, temperature, humidity, serial, illuminance, status_since
+SLOT_FORMAT = "<IBBxxddd64s16sd"
+SLOT_SIZE = 128
+SERIAL_MAX = 64
+ILLUMINANCE_MAX = 16
+NO_ISSUES = 0xFF  # slot의 issues 값: 판단하지 않음 (evaluator 없음)
+FUTURE_SKEW = 300.0  # 디바이스 시계가 빠를 수 있는 정도 (초, server/ingest.py와 같음)
+
+
+def _check_update(timestamp: float, last) -> bool:
+    """
+    reading을 캐시에 반영할지. 미래 시각 reading은 ValueError
+
+    Returns:
+        bool: False면 캐시에 있는 값보다 오래된 reading (무시)
+    """
+    now = time.time()
+    if not timestamp <= now + FUTURE_SKEW:
+        raise ValueError("timestamp is in the future")
+    if last is None or last["timestamp"] > now + FUTURE_SKEW:
+        return True
+    return timestamp >= last["timestamp"]
+
+
+class LatestReadings:
+    """프로세스 내부 최신 reading 캐시"""
+
+    def __init__(self, evaluator=None):
+        self.evaluator = evaluator
+        # serial -> {"temperature", "humidity", "illuminance", "timestamp", "issues", "status_since"}
+        self.readings = {}
+
+    def _status(self, serial: str, last, timestamp: float, temperature: float, humidity: float) -> tuple:
+        """(이전 issues, 새 issues, status_since)"""
+        previous = last["issues"] if last is not None else None
+        if self.evaluator is None:
+            return previous, None, None
+        issues = self.evaluator.evaluate(serial, previous, temperature, humidity)
+        since = last["status_since"] if last is not None and issues == previous else timestamp
+        return previous, issues, since
+
+    def update(self, serial: str, timestamp: float, temperature: float, humidity: float, illuminance="0"):
+        """reading 반영. 식물 상태가 바뀌면 (이전 issues, 새 issues), 아니면 None"""
+        last = self.readings.get(serial)
+        if not _check_update(timestamp, last):
+            return None
+        previous, issues, since = self._status(serial, last, timestamp, temperature, humidity)
+        self.readings[serial] = {
+            "temperature": temperature,
+            "humidity": humidity,
+            "illuminance": str(illuminance),
+            "timestamp": timestamp,
+            "issues": issues,
+            "status_since": since,
+        }
+        return (previous, issues) if issues != previous else None
+
+    def get(self, serial: str):
+        return self.readings.get(serial)
+
+    def __len__(self) -> int:
+        return len(self.readings)
+
+
+def default_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "citonphyde_latest")
+
+
+class ShmLatestReadings(LatestReadings):
+    """LatestReadings와 같은 인터페이스의 mmap 공유 테이블 (slot은 지워지지 않음)"""
+
+    def __init__(self, path: str = None, slots: int = DEFAULT_SLOTS, evaluator=None):
+        super().__init__(evaluator)
+        self.path = path or default_path()
+        self.slots = slots
+        size = HEADER_SIZE + slots * SLOT_SIZE
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, struct.pack(HEADER_FORMAT, MAGIC, LAYOUT_VERSION, slots), 0)
+            header = struct.unpack(HEADER_FORMAT, os.pread(self._fd, struct.calcsize(HEADER_FORMAT), 0))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        if header != (MAGIC, LAYOUT_VERSION, slots):
+            raise ValueError(f"incompatible sensor table: {self.path}")
+
+        self._mm = mmap.mmap(self._fd, size)
+        # serial -> slot 번호
+        self._slot_index = {}
+
+    def _read_slot(self, slot: int) -> tuple:
+        offset = HEADER_SIZE + slot * SLOT_SIZE
+        for attempt in range(READ_RETRIES):
+            if attempt >= READ_SPINS:
+                time.sleep(READ_BACKOFF)
+            (seq,) = struct.unpack_from("<I", self._mm, offset)
+            if seq & 1:
+                continue
+            fields = struct.unpack_from(SLOT_FORMAT, self._mm, offset)
+            (seq_after,) = struct.unpack_from("<I", self._mm, offset)
+            if seq == seq_after == fields[0]:
+                return fields
+        raise RuntimeError("sensor table slot busy")
+
+    def _find(self, serial: str) -> tuple:
+        """(slot, fields) 반환. 없으면 (비어 있는 slot 또는 None, None)"""
+        key = serial.encode()
+        slot = self._slot_index.get(serial)
+        if slot is not None:
+            return slot, self._read_slot(slot)
+
+        start = zlib.crc32(key) % self.slots
+        for i in range(self.slots):
+            slot = (start + i) % self.slots
+            fields = self._read_slot(slot)
+            if not fields[1]:
+                return slot, None
+            if fields[6].rstrip(b"\0") == key:
+                self._slot_index[serial] = slot
+                return slot, fields
+        return None, None
+
+    def update(self, serial: str, timestamp: float, temperature: float, humidity: float, illuminance="0"):
+        key = serial.encode()
+        illuminance = str(illuminance).encode()
+        if len(key) > SERIAL_MAX or b"\0" in key:
+            raise ValueError(f"serial must be at most {SERIAL_MAX} bytes")
+        if len(illuminance) > ILLUMINANCE_MAX:
+            raise ValueError(f"illuminance must be at most {ILLUMINANCE_MAX} bytes")
+
+        # 상태 판단도 락 안에서 해야 여러 프로세스가 같은 직전 상태로 판단하지 않음
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            slot, fields = self._find(serial)
+            if slot is None:
+                raise RuntimeError("sensor table full")
+            last = self._to_reading(fields) if fields is not None else None
+            if not _check_update(timestamp, last):
+                return None
+            previous, issues, since = self._status(serial, last, timestamp, temperature, humidity)
+            offset = HEADER_SIZE + slot * SLOT_SIZE
+            (seq,) = struct.unpack_from("<I", self._mm, offset)
+            struct.pack_into("<I", self._mm, offset, seq + 1)
+            struct.pack_into(
+                SLOT_FORMAT, self._mm, offset,
+                seq + 1, 1, NO_ISSUES if issues is None else issues,
+                timestamp, temperature, humidity, key, illuminance, since or 0.0,
+            )
+            struct.pack_into("<I", self._mm, offset, seq + 2)
+            self._slot_index[serial] = slot
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return (previous, issues) if issues != previous else None
+
+    @staticmethod
+    def _to_reading(fields: tuple) -> dict:
+        _, _, issues, timestamp, temperature, humidity, _, illuminance, since = fields
+        return {
+            "temperature": temperature,
+            "humidity": humidity,
+            "illuminance": illuminance.rstrip(b"\0").decode(),
+            "timestamp": timestamp,
+            "issues": None if issues == NO_ISSUES else issues,
+            "status_since": since if issues != NO_ISSUES else None,
+        }
+
+    def get(self, serial: str):
+        _, fields = self._find(serial)
+        if fields is None:
+            return None
+        return self._to_reading(fields)
+
+    def __len__(self) -> int:
+        return sum(1 for slot in range(self.slots) if self._read_slot(slot)[1])
+
+
+def open_latest_readings(url: str, evaluator=None) -> LatestReadings:
+    """
+    SENSOR_LATEST_URL 값으로 캐시 생성
+
+    - "" 또는 "memory": 프로세스 내부 캐시
+    - "shm://" 또는 "shm:///path/to/file": mmap 공유 메모리 테이블
+    """
+    if not url or url == "memory":
+        return LatestReadings(evaluator)
+    if url.startswith("shm://"):
+        return ShmLatestReadings(url[len("shm://"):] or None, evaluator=evaluator)
+    raise ValueError(f"unsupported SENSOR_LATEST_URL: {url}")
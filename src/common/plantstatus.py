@@ -0,0 +1,141 @@
+"""
+식물 상태 판단 (HTTP, TCP 서버 공용)
+
+DatabaseManager.get_plant_status와 같은 기준(바질: 20~26℃, 습도 40% 이상)을
+대화할 때가 아니라 reading을 받을 때마다 판단한다. 결과는 최신 reading 캐시
+(latest.py)에 같이 저장되므로 음성 비서, LCD, 알림은 계산 없이 읽기만 하면 된다.
+
+경계값 근처에서 상태가 왔다 갔다 하지 않도록 hysteresis를 둔다.
+    - 문제 발생: 기준을 벗어나는 순간 (예: 온도 < 20)
+    - 문제 해소: 기준 안쪽으로 hysteresis만큼 들어와야 (예: 온도 >= 20.5)
+
+문제(issue)는 bitmask로 저장한다 (shm slot에 1바이트로 들어가도록).
+"""
+
+# (code, bit, 음성 비서용 문구) - 문구는 get_plant_status의 issues와 동일
+ISSUES = (
+    ("cold", 1, "너무 추워"),
+    ("hot", 2, "너무 더워"),
+    ("dry", 4, "목이 말라"),
+    ("humid", 8, "너무 습해"),
+)
+
+# 종별 적정 범위. humidity_max가 None이면 습도 상한 없음
+PROFILES = {
+    "basil": {"temp_min": 20.0, "temp_max": 26.0, "humidity_min": 40.0, "humidity_max": None},
+    "mint": {"temp_min": 15.0, "temp_max": 25.0, "humidity_min": 40.0, "humidity_max": None},
+    "lettuce": {"temp_min": 15.0, "temp_max": 22.0, "humidity_min": 50.0, "humidity_max": 80.0},
+}
+DEFAULT_SPECIES = "basil"
+
+TEMP_HYSTERESIS = 0.5  # °C
+HUMIDITY_HYSTERESIS = 2.0  # %RH
+
+# 상태가 바뀌었을 때 LCD에 띄울 표정 (PLANT_STATUS_FACE=1일 때). 문제가 여러 개면 앞쪽 우선
+STATUS_FACES = (("dry", "TIRED"), ("hot", "TIRED"), ("cold", "SAD"), ("humid", "SAD"))
+GOOD_FACE = "HAPPY"
+
+
+def parse_species(spec: str) -> tuple:
+    """
+    PLANT_SPECIES 값 파싱
+
+    "basil" -> ("basil", {})
+    "basil,ESP32-S3-001=lettuce" -> ("basil", {"ESP32-S3-001": "lettuce"})
+    """
+    default = DEFAULT_SPECIES
+    by_serial = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" in item:
+            serial, species = item.split("=", 1)
+            species = species.strip()
+            if species not in PROFILES:
+                raise ValueError(f"unknown species: {species}")
+            by_serial[serial.strip()] = species
+        elif item in PROFILES:
+            default = item
+        else:
+            raise ValueError(f"unknown species: {item}")
+    return default, by_serial
+
+
+class PlantStatusEvaluator:
+    """serial별 종 기준으로 (직전 issues, reading) -> 새 issues bitmask 계산"""
+
+    def __init__(
+        self,
+        default_species: str = DEFAULT_SPECIES,
+        species_by_serial: dict = None,
+        temp_hysteresis: float = TEMP_HYSTERESIS,
+        humidity_hysteresis: float = HUMIDITY_HYSTERESIS,
+    ):
+        self.default_species = default_species
+        self.species_by_serial = species_by_serial or {}
+        self.temp_hysteresis = temp_hysteresis
+        self.humidity_hysteresis = humidity_hysteresis
+
+    def species(self, serial: str) -> str:
+        return self.species_by_serial.get(serial, self.default_species)
+
+    def evaluate(self, serial: str, previous, temperature: float, humidity: float) -> int:
+        """previous: 직전 issues (처음이면 None -> hysteresis 없이 판단)"""
+        profile = PROFILES[self.species(serial)]
+        previous = previous or 0
+        th = self.temp_hysteresis
+        hh = self.humidity_hysteresis
+        checks = (
+            # (bit, 문제 발생 조건, 문제 유지 조건)
+            (1, temperature < profile["temp_min"], temperature < profile["temp_min"] + th),
+            (2, temperature > profile["temp_max"], temperature > profile["temp_max"] - th),
+            (4, humidity < profile["humidity_min"], humidity < profile["humidity_min"] + hh),
+        )
+        if profile["humidity_max"] is not None:
+            checks += (
+                (8, humidity > profile["humidity_max"], humidity > profile["humidity_max"] - hh),
+            )
+
+        issues = 0
+        for bit, enter, stay in checks:
+            if enter or (previous & bit and stay):
+                issues |= bit
+        return issues
+
+    def describe(self, serial: str, issues, since: float = None) -> dict:
+        """
+        issues bitmask -> 음성 비서/API용 상태 dict
+
+        get_plant_status와 같은 키(status, condition_status, message, issues)를 포함하므로
+        build_context에서 그대로 쓸 수 있다.
+        """
+        if issues is None:
+            status, message = "unknown", ""
+        elif issues == 0:
+            status, message = "good", "지금 딱 좋은 환경이야"
+        else:
+            status, message = "bad", "치피를 좀 더 신경 써줘!"
+        issues = issues or 0
+        return {
+            "species": self.species(serial),
+            "status": status,
+            "condition_status": status,
+            "message": message,
+            "issues": [label for _, bit, label in ISSUES if issues & bit],
+            "codes": issue_codes(issues),
+            "since": since,
+        }
+
+
+def issue_codes(issues) -> list:
+    return [code for code, bit, _ in ISSUES if (issues or 0) & bit]
+
+
+def status_face(issues: int) -> str:
+    """issues bitmask -> LCD 표정"""
+    codes = issue_codes(issues)
+    for code, face in STATUS_FACES:
+        if code in codes:
+            return face
+    return GOOD_FACE
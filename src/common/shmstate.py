@@ -0,0 +1,257 @@
+"""
+mmap 공유 메모리 디바이스 상태 테이블 (uvicorn --workers N 용)
+
+같은 호스트의 여러 프로세스가 파일 하나(/dev/shm 아래)를 mmap해서 직접 읽고 쓴다.
+읽기는 락도 IPC도 없이 seqlock으로 일관된 값을 얻고, 쓰기만 flock으로 직렬화한다.
+
+파일 구조:
+    header (64B)   magic, layout 버전, slot 수, ring 크기, epoch, change_seq
+    ring           최근 변경된 slot 번호 (change_seq % RING_SIZE 위치에 기록)
+    slots          SLOT_SIZE 고정 크기. crc32(serial) % slots에서 시작하는 linear probing
+
+slot seqlock:
+    writer: seq += 1 (홀수) -> 필드 기록 -> seq += 1 (짝수)
+    reader: seq 읽기 -> 필드 읽기 -> seq 다시 읽기, 둘이 같고 짝수일 때만 채택
+
+다른 프로세스의 변경은 watcher 태스크가 WATCH_INTERVAL마다 change_seq를 보고
+ring에서 바뀐 slot만 골라 구독 콜백(long-poll/SSE 깨우기 등)으로 알린다.
+slot은 지워지지 않으므로 상태는 파일이 남아 있는 동안(재부팅 전까지) 유지된다.
+"""
+
+import asyncio
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+from common.statestore import STATE_FIELDS, StateStore
+
+MAGIC = b"CSTS"
+LAYOUT_VERSION = 1
+DEFAULT_SLOTS = 4096
+RING_SIZE = 1024
+WATCH_INTERVAL = 0.01  # seconds
+READ_RETRIES = 200
+# 처음 READ_SPINS번은 바로 다시 읽고 (쓰기는 보통 1µs 안에 끝남), 그 뒤로는 READ_BACKOFF초씩 쉼.
+# 쓰는 프로세스가 slot을 잡은 채 스케줄에서 밀렸으면 CPU를 양보해야 쓰기가 끝난다 (최대 약 10ms 후 RuntimeError)
+READ_SPINS = 100
+READ_BACKOFF = 0.00005
+
+HEADER_FORMAT = "<4sIIIQQ"  # magic, layout, slots, ring_size, epoch, change_seq
+HEADER_SIZE = 64
+CHANGE_SEQ_OFFSET = struct.calcsize("<4sIIIQ")
+
+# seq, version, used, is_led_on, updated_at, serial, face
+SLOT_FORMAT = "<IIBBxxd64s32s"
+SLOT_SIZE = 128
+SERIAL_MAX = 64
+FACE_MAX = 32
+
+
+def default_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "citonphyde_state")
+
+
+class ShmStateStore(StateStore):
+    """StateStore와 같은 인터페이스의 mmap 공유 테이블"""
+
+    def __init__(self, path: str = None, slots: int = DEFAULT_SLOTS):
+        super().__init__()
+        self.path = path or default_path()
+        self.slots = slots
+        self._ring_offset = HEADER_SIZE
+        self._slot_offset = HEADER_SIZE + RING_SIZE * 4
+        size = self._slot_offset + slots * SLOT_SIZE
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                header = struct.pack(
+                    HEADER_FORMAT, MAGIC, LAYOUT_VERSION, slots, RING_SIZE, int(time.time()), 0
+                )
+                os.pwrite(self._fd, header, 0)
+            header = struct.unpack(HEADER_FORMAT, os.pread(self._fd, struct.calcsize(HEADER_FORMAT), 0))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        magic, layout, file_slots, ring_size, epoch, _ = header
+        if (magic, layout, file_slots, ring_size) != (MAGIC, LAYOUT_VERSION, slots, RING_SIZE):
+            raise ValueError(f"incompatible state table: {self.path}")
+
+        self._mm = mmap.mmap(self._fd, size)
+        self.epoch = format(epoch, "x")
+        # serial -> slot 번호 (slot은 한 번 정해지면 바뀌지 않음)
+        self._slot_index = {}
+        # watcher가 마지막으로 본 change_seq와 serial별 상태
+        self._last_seq = 0
+        self._known = {}
+        self._task = None
+
+    # --- slot 읽기/쓰기 ---
+
+    def _read_slot(self, slot: int) -> tuple:
+        """seqlock으로 slot 하나를 일관되게 읽음"""
+        offset = self._slot_offset + slot * SLOT_SIZE
+        for attempt in range(READ_RETRIES):
+            if attempt >= READ_SPINS:
+                time.sleep(READ_BACKOFF)
+            (seq,) = struct.unpack_from("<I", self._mm, offset)
+            if seq & 1:
+                continue
+            fields = struct.unpack_from(SLOT_FORMAT, self._mm, offset)
+            (seq_after,) = struct.unpack_from("<I", self._mm, offset)
+            if seq == seq_after == fields[0]:
+                return fields
+        raise RuntimeError("state table slot busy")
+
+    def _write_slot(self, slot: int, version: int, serial: bytes, state: dict, updated_at: float):
+        offset = self._slot_offset + slot * SLOT_SIZE
+        (seq,) = struct.unpack_from("<I", self._mm, offset)
+        struct.pack_into("<I", self._mm, offset, seq + 1)
+        struct.pack_into(
+            SLOT_FORMAT, self._mm, offset,
+            seq + 1, version, 1, state["is_led_on"], updated_at,
+            serial, state["face"].encode(),
+        )
+        struct.pack_into("<I", self._mm, offset, seq + 2)
+
+    @staticmethod
+    def _to_state(fields: tuple) -> dict:
+        _, version, _, is_led_on, updated_at, _, face = fields
+        return {
+            "is_led_on": bool(is_led_on),
+            "face": face.rstrip(b"\0").decode(),
+            "version": version,
+            "updated_at": datetime.fromtimestamp(updated_at).isoformat(),
+        }
+
+    def _find(self, serial: str) -> tuple:
+        """(slot, fields) 반환. 없으면 (비어 있는 slot 또는 None, None)"""
+        key = serial.encode()
+        slot = self._slot_index.get(serial)
+        if slot is not None:
+            return slot, self._read_slot(slot)
+
+        start = zlib.crc32(key) % self.slots
+        for i in range(self.slots):
+            slot = (start + i) % self.slots
+            fields = self._read_slot(slot)
+            if not fields[2]:
+                return slot, None
+            if fields[5].rstrip(b"\0") == key:
+                self._slot_index[serial] = slot
+                return slot, fields
+        return None, None
+
+    # --- StateStore 인터페이스 ---
+
+    def get(self, serial: str) -> dict:
+        _, fields = self._find(serial)
+        if fields is None:
+            return super().get(serial)
+        return self._to_state(fields)
+
+    def items(self) -> list:
+        found = []
+        for slot in range(self.slots):
+            fields = self._read_slot(slot)
+            if fields[2]:
+                serial = fields[5].rstrip(b"\0").decode()
+                self._slot_index[serial] = slot
+                found.append((serial, self._to_state(fields)))
+        return found
+
+    def version(self, serial: str) -> int:
+        _, fields = self._find(serial)
+        return fields[1] if fields else 0
+
+    async def update(self, serial: str, changes: dict) -> dict:
+        key = serial.encode()
+        if len(key) > SERIAL_MAX or b"\0" in key:
+            raise ValueError(f"serial must be at most {SERIAL_MAX} bytes")
+        if "face" in changes and len(str(changes["face"]).encode()) > FACE_MAX:
+            raise ValueError(f"face must be at most {FACE_MAX} bytes")
+
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # 락을 잡은 뒤 다시 찾아야 다른 프로세스가 방금 넣은 slot과 겹치지 않음
+            slot, _ = self._find(serial)
+            if slot is None:
+                raise RuntimeError("state table full")
+            state, changed = self._merge(serial, changes)
+            if state is None:
+                return self.get(serial)
+            updated_at = time.time()
+            self._write_slot(slot, state["version"], key, state, updated_at)
+            self._slot_index[serial] = slot
+
+            (seq,) = struct.unpack_from("<Q", self._mm, CHANGE_SEQ_OFFSET)
+            struct.pack_into("<I", self._mm, self._ring_offset + ((seq + 1) % RING_SIZE) * 4, slot)
+            struct.pack_into("<Q", self._mm, CHANGE_SEQ_OFFSET, seq + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        state["updated_at"] = datetime.fromtimestamp(updated_at).isoformat()
+        self._known[serial] = state
+        self._notify(serial, state, changed)
+        return state
+
+    # --- 다른 프로세스의 변경 감지 ---
+
+    def _changed_slots(self, last: int, current: int):
+        if current - last >= RING_SIZE:
+            # ring이 한 바퀴 이상 돌았으면 전체 slot을 훑음
+            return range(self.slots)
+        return {
+            struct.unpack_from("<I", self._mm, self._ring_offset + (n % RING_SIZE) * 4)[0]
+            for n in range(last + 1, current + 1)
+        }
+
+    def _poll_changes(self):
+        (current,) = struct.unpack_from("<Q", self._mm, CHANGE_SEQ_OFFSET)
+        if current == self._last_seq:
+            return
+        slots = self._changed_slots(self._last_seq, current)
+        self._last_seq = current
+
+        for slot in slots:
+            fields = self._read_slot(slot)
+            if not fields[2]:
+                continue
+            serial = fields[5].rstrip(b"\0").decode()
+            self._slot_index[serial] = slot
+            known = self._known.get(serial)
+            if known is not None and fields[1] <= known["version"]:
+                continue
+            state = self._to_state(fields)
+            if known is None:
+                changed = {f: state[f] for f in STATE_FIELDS}
+            else:
+                changed = {f: state[f] for f in STATE_FIELDS if state[f] != known[f]}
+            self._known[serial] = state
+            self._notify(serial, state, changed)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            self._poll_changes()
+
+    async def start(self):
+        (self._last_seq,) = struct.unpack_from("<Q", self._mm, CHANGE_SEQ_OFFSET)
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
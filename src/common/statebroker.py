@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+statebroker - 디바이스 상태 broker (Redis 등 외부 broker 대용)
+
+HTTP 서버(src/server)와 TCP 서버(src/server_tcp)를 각각 띄울 때 둘이 같은 LED/Face
+상태를 보도록 상태 원본을 한 곳에 둔다. 프로토콜: newline-delimited JSON.
+
+클라이언트 -> broker:
+    {"type": "set", "id": 1, "serial": "...", "changes": {"is_led_on": true}}
+broker -> 클라이언트:
+    {"type": "snapshot", "epoch": "...", "states": {serial: state}}   접속 직후 1회
+    {"type": "state", "serial": "...", "state": {...}, "changed": {...}, "id": 1}
+        변경이 반영되면 모든 클라이언트에 broadcast. id는 요청한 클라이언트에만 붙임
+
+사용법: python statebroker.py [port]
+서버 쪽: STATE_STORE_URL=tcp://127.0.0.1:9100 python main.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.eventlog import setup_logging
+from common.statestore import BROKER_PORT, StateStore
+
+HOST = "127.0.0.1"
+
+log = setup_logging("statebroker")
+
+store = StateStore()
+clients: set = set()
+
+
+def send(writer: asyncio.StreamWriter, data: dict):
+    writer.write((json.dumps(data, separators=(",", ":")) + "\n").encode())
+
+
+async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    addr = writer.get_extra_info("peername")
+    log.info("Client connected: %s", addr)
+    clients.add(writer)
+    send(writer, {"type": "snapshot", "epoch": store.epoch, "states": store.states})
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if msg.get("type") != "set" or not msg.get("serial"):
+                continue
+
+            serial = msg["serial"]
+            before = store.version(serial)
+            state = await store.update(serial, msg.get("changes") or {})
+            changed = {} if state["version"] == before else {
+                f: state[f] for f in msg.get("changes", {}) if f in state
+            }
+            reply = {"type": "state", "serial": serial, "state": state, "changed": changed}
+            if changed:
+                for other in list(clients):
+                    if other is not writer:
+                        send(other, reply)
+            send(writer, {**reply, "id": msg.get("id")})
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        clients.discard(writer)
+        writer.close()
+        log.info("Client disconnected: %s", addr)
+
+
+async def main(port: int):
+    server = await asyncio.start_server(handle_client, HOST, port)
+    log.info("State broker listening on %s:%d", HOST, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else BROKER_PORT
+    try:
+        asyncio.run(main(port))
+    except KeyboardInterrupt:
+        pass
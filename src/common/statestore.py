@@ -0,0 +1,226 @@
+"""
+디바이스 상태 저장소 (LED / Face) - HTTP 서버와 TCP 서버가 같이 사용
+
+- StateStore: 프로세스 내부 dict. 서버 하나만 띄울 때 (기본값)
+- BrokerStateStore: statebroker.py에 붙어서 여러 프로세스가 같은 상태를 공유.
+  로컬 캐시를 들고 있으므로 get()은 네트워크를 타지 않고, update()만 broker를 거친다.
+- ShmStateStore (shmstate.py): 같은 호스트의 여러 프로세스(uvicorn worker)가 mmap 파일
+  하나를 직접 읽고 쓴다. 읽기에 IPC가 전혀 없음.
+
+어느 쪽이든 상태가 바뀌면 subscribe()로 등록한 콜백이 (serial, state, changed)로
+호출된다. 다른 프로세스에서 바뀐 상태도 마찬가지라서, HTTP PATCH가 TCP 디바이스의
+state_update push로 바로 이어진다.
+
+사용:
+    store = open_state_store(os.environ.get("STATE_STORE_URL", ""))
+    store.subscribe(on_changed)
+    await store.start()
+    await store.update("ESP32-S3-001", {"is_led_on": True})
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+
+STATE_FIELDS = ("is_led_on", "face")
+DEFAULT_STATE = {"is_led_on": False, "face": "NEUTRAL"}
+
+BROKER_PORT = 9100
+RECONNECT_DELAY = 1.0  # seconds
+UPDATE_TIMEOUT = 5.0  # seconds
+
+
+class StateStore:
+    """프로세스 내부 상태 저장소. serial별 상태와 version(변경마다 +1)을 관리"""
+
+    def __init__(self):
+        # serial -> {"is_led_on", "face", "version", "updated_at"}
+        self.states = {}
+        # 저장소 인스턴스 식별자. 재시작 후 version이 0부터 다시 시작해도 구분할 수 있도록 함
+        self.epoch = format(int(time.time()), "x")
+        self._listeners = []
+
+    def get(self, serial: str) -> dict:
+        """현재 상태 (설정된 적 없으면 version 0의 기본값)"""
+        state = self.states.get(serial)
+        if state is None:
+            return {**DEFAULT_STATE, "version": 0, "updated_at": None}
+        return state
+
+    def version(self, serial: str) -> int:
+        state = self.states.get(serial)
+        return state["version"] if state else 0
+
+    def items(self) -> list:
+        """설정된 적 있는 모든 (serial, 상태)"""
+        return list(self.states.items())
+
+    def subscribe(self, callback):
+        """상태 변경 콜백 등록. callback(serial, state, changed)는 이벤트 루프에서 동기로 호출됨"""
+        self._listeners.append(callback)
+
+    def _notify(self, serial: str, state: dict, changed: dict):
+        for callback in self._listeners:
+            callback(serial, state, changed)
+
+    def _apply(self, serial: str, state: dict, changed: dict):
+        self.states[serial] = state
+        self._notify(serial, state, changed)
+
+    def _merge(self, serial: str, changes: dict) -> tuple:
+        """changes 중 실제로 바뀐 필드만 반영한 새 상태. 바뀐 게 없으면 (None, {})"""
+        current = self.get(serial)
+        changed = {
+            field: changes[field]
+            for field in STATE_FIELDS
+            if field in changes and (current["version"] == 0 or current[field] != changes[field])
+        }
+        if not changed:
+            return None, changed
+        state = {
+            **current,
+            **changed,
+            "version": current["version"] + 1,
+            "updated_at": datetime.now().isoformat(),
+        }
+        return state, changed
+
+    async def update(self, serial: str, changes: dict) -> dict:
+        """상태 변경. 같은 값으로의 변경은 version을 올리지 않음. 반영된 상태를 반환"""
+        state, changed = self._merge(serial, changes)
+        if state is None:
+            return self.get(serial)
+        self._apply(serial, state, changed)
+        return state
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class BrokerStateStore(StateStore):
+    """
+    statebroker.py를 원본으로 쓰는 저장소
+
+    접속하면 broker가 전체 스냅샷을 보내고, 이후 어느 클라이언트의 변경이든
+    {"type": "state"} 메시지로 모든 클라이언트에 broadcast된다.
+    연결이 끊기면 RECONNECT_DELAY마다 재접속하고 스냅샷으로 다시 맞춘다.
+    """
+
+    def __init__(self, host: str, port: int = BROKER_PORT):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self._writer = None
+        self._task = None
+        self._connected = None
+        self._next_id = 0
+        self._pending = {}
+
+    async def start(self):
+        """broker에 접속하고 첫 스냅샷을 받을 때까지 대기"""
+        self._connected = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        await self._connected.wait()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            self._writer = writer
+            try:
+                await self._read_loop(reader)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("state broker disconnected"))
+                self._pending.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            msg_type = msg.get("type")
+
+            if msg_type == "snapshot":
+                states = msg["states"]
+                if msg["epoch"] != self.epoch:
+                    # broker가 재시작되어 version이 다시 0부터 시작하므로 로컬 캐시를 통째로 교체
+                    self.epoch = msg["epoch"]
+                    dropped, self.states = self.states, {}
+                    for serial in dropped:
+                        if serial not in states:
+                            self._notify(serial, self.get(serial), {})
+                # 끊겨 있던 동안의 변경분도 콜백으로 알림
+                for serial, state in states.items():
+                    if self.states.get(serial) != state:
+                        self._apply(serial, state, {f: state[f] for f in STATE_FIELDS})
+                self._connected.set()
+            elif msg_type == "state":
+                serial, state = msg["serial"], msg["state"]
+                if state["version"] > self.version(serial):
+                    self._apply(serial, state, msg["changed"])
+                future = self._pending.pop(msg.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(state)
+
+    async def update(self, serial: str, changes: dict) -> dict:
+        """broker에 변경을 보내고 반영된 상태를 받을 때까지 대기. 연결이 없으면 ConnectionError"""
+        if self._writer is None:
+            raise ConnectionError("state broker not connected")
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        msg = {"type": "set", "id": request_id, "serial": serial, "changes": changes}
+        self._writer.write((json.dumps(msg, separators=(",", ":")) + "\n").encode())
+        try:
+            await self._writer.drain()
+            return await asyncio.wait_for(future, UPDATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ConnectionError("state broker timeout")
+        finally:
+            self._pending.pop(request_id, None)
+
+
+def open_state_store(url: str) -> StateStore:
+    """
+    STATE_STORE_URL 값으로 저장소 생성
+
+    - "" 또는 "memory": 프로세스 내부 저장소
+    - "tcp://host:port": statebroker.py 사용
+    - "shm://" 또는 "shm:///path/to/file": mmap 공유 메모리 테이블 (shmstate.py)
+    """
+    if not url or url == "memory":
+        return StateStore()
+    if url.startswith("shm://"):
+        from common.shmstate import ShmStateStore
+
+        return ShmStateStore(url[len("shm://"):] or None)
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].partition(":")
+        return BrokerStateStore(host or "127.0.0.1", int(port or BROKER_PORT))
+    raise ValueError(f"unsupported STATE_STORE_URL: {url}")
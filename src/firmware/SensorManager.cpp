@@ -6,6 +6,20 @@ static SensorManager* sensorManagerInstance = nullptr;
 
 static constexpr const char* DEFAULT_ILLUMINANCE_VALUE = "0";
 
+// 바이너리 reading 포맷 (src/server/ingest.py와 같은 구조, little-endian)
+// 버전(1B) + serial 길이(1B) + 온도 x100 (int16) + 습도 x100 (uint16)
+// + 조도 (uint32) + timestamp (uint32, 0이면 서버 수신 시각) + serial
+static constexpr const char* BINARY_CONTENT_TYPE = "application/vnd.citonphyde.reading";
+static constexpr uint8_t BINARY_VERSION = 1;
+static constexpr size_t BINARY_HEADER_SIZE = 1 + 1 + 2 + 2 + 4 + 4;
+static constexpr size_t BINARY_SERIAL_MAX = 64;
+
+static void putLE(uint8_t* out, uint32_t value, size_t bytes) {
+  for (size_t i = 0; i < bytes; i++) {
+    out[i] = static_cast<uint8_t>(value >> (8 * i));
+  }
+}
+
 SensorManager::SensorManager(const char* baseUrl, const char* endpoint, DeviceID* deviceId)
   : sht31(Adafruit_SHT31()),
     sensorInitialized(false),
@@ -19,6 +33,7 @@ SensorManager::SensorManager(const char* baseUrl, const char* endpoint, DeviceID
     shouldUploadSensorData(false),
     sensorUploadTimer(nullptr),
     uploadIntervalUs(10ULL * 1000ULL * 1000ULL),
+    binaryUpload(false),
     deviceID(deviceId) {
   sensorManagerInstance = this;
 }
@@ -119,10 +134,32 @@ void SensorManager::processUpload() {
   HTTPClient http;
   String url = String(serverBaseURL) + sensorEndpoint;
   http.begin(url);
-  http.addHeader("Content-Type", "application/x-www-form-urlencoded");
-  
+
   // Device ID 가져오기
   String deviceIdentifier = deviceID->getID();
+
+  if (binaryUpload && deviceIdentifier.length() <= BINARY_SERIAL_MAX) {
+    // 바이너리 reading 1건 (서버는 body 없이 204로 응답)
+    uint8_t body[BINARY_HEADER_SIZE + BINARY_SERIAL_MAX];
+    size_t serialLength = deviceIdentifier.length();
+    int16_t temperature = static_cast<int16_t>(lroundf(lastTemperature * 100.0f));
+    uint16_t humidity = static_cast<uint16_t>(lroundf(lastHumidity * 100.0f));
+    body[0] = BINARY_VERSION;
+    body[1] = static_cast<uint8_t>(serialLength);
+    putLE(body + 2, static_cast<uint16_t>(temperature), 2);
+    putLE(body + 4, humidity, 2);
+    putLE(body + 6, 0, 4);  // 조도 (센서 없음)
+    putLE(body + 10, 0, 4);  // timestamp (RTC 없음 -> 서버 수신 시각)
+    memcpy(body + BINARY_HEADER_SIZE, deviceIdentifier.c_str(), serialLength);
+
+    http.addHeader("Content-Type", BINARY_CONTENT_TYPE);
+    int httpCode = http.POST(body, BINARY_HEADER_SIZE + serialLength);
+    (void)httpCode;
+    http.end();
+    return;
+  }
+
+  http.addHeader("Content-Type", "application/x-www-form-urlencoded");
   
   // form 데이터 생성
   String payload = "serial=";
@@ -28,6 +28,7 @@ private:
   bool shouldUploadSensorData;  // 타이머 인터럽트에서 설정하는 플래그
   esp_timer_handle_t sensorUploadTimer;
   uint64_t uploadIntervalUs;
+  bool binaryUpload;  // true면 바이너리 reading 포맷으로 업로드 (form 문자열 생성 없음)
   
   // DeviceID 참조
   DeviceID* deviceID;
@@ -61,6 +62,9 @@ public:
   // 주기 설정
   void setSensorReadIntervalMs(uint32_t intervalMs);
   void setUploadIntervalMs(uint32_t intervalMs);
+
+  // 업로드 포맷 (false: form-urlencoded, true: application/vnd.citonphyde.reading)
+  void setBinaryUpload(bool enabled) { binaryUpload = enabled; }
 };
 
 #endif
@@ -17,6 +17,10 @@ const uint32_t SENSOR_UPLOAD_INTERVAL_MS = 30000;  // 30초마다 센서 데이
 const uint32_t LED_CHECK_INTERVAL_MS = 1000;        // 1초마다 LED 상태 확인
 const uint32_t FACE_EMOTION_CHECK_INTERVAL_MS = 2000;  // 2초마다 Face Emotion 상태 확인
 
+// 센서 업로드를 바이너리 포맷(application/vnd.citonphyde.reading)으로 보냄
+// 서버가 바이너리 body를 지원하는 버전으로 배포된 뒤에 켤 것
+const bool SENSOR_UPLOAD_BINARY = false;
+
 WiFiManager wifiManager;
 TFT_eSPI tft = TFT_eSPI();
 DeviceID deviceID;
@@ -77,6 +81,7 @@ void setup() {
   if (sensorManager.init()) {
     sensorManager.setSensorReadIntervalMs(SENSOR_READ_INTERVAL_MS);
     sensorManager.setUploadIntervalMs(SENSOR_UPLOAD_INTERVAL_MS);
+    sensorManager.setBinaryUpload(SENSOR_UPLOAD_BINARY);
   }
   relayLedController.begin(RELAY_SIGNAL_PIN, RELAY_COM_PIN);
   relayLedController.setCheckInterval(LED_CHECK_INTERVAL_MS);
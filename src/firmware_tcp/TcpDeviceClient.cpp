@@ -8,7 +8,8 @@ TcpDeviceClient::TcpDeviceClient(const char* serverHost, uint16_t serverPort, co
     lastReconnectAttempt(0),
     reconnectInterval(INITIAL_RECONNECT_MS),
     lastActivity(0),
-    stateCallback(nullptr) {
+    stateCallback(nullptr),
+    configCallback(nullptr) {
 }
 
 void TcpDeviceClient::begin() {
@@ -126,6 +127,8 @@ void TcpDeviceClient::processLine(const String& line) {
     handleHelloAck(doc);
   } else if (strcmp(type, "state_update") == 0) {
     handleStateUpdate(doc);
+  } else if (strcmp(type, "config_update") == 0) {
+    handleConfigUpdate(doc);
   } else if (strcmp(type, "ping") == 0) {
     // Respond with pong
     JsonDocument pong;
@@ -149,6 +152,9 @@ void TcpDeviceClient::handleHelloAck(JsonDocument& doc) {
     String face = doc["face"] | "NEUTRAL";
     stateCallback(hasLed, isLedOn, hasFace, face);
   }
+
+  // hello_ack에 서버 추천 업로드 주기가 포함될 수 있음
+  handleConfigUpdate(doc);
 }
 
 void TcpDeviceClient::handleStateUpdate(JsonDocument& doc) {
@@ -162,3 +168,19 @@ void TcpDeviceClient::handleStateUpdate(JsonDocument& doc) {
     stateCallback(hasLed, isLedOn, hasFace, face);
   }
 }
+
+void TcpDeviceClient::handleConfigUpdate(JsonDocument& doc) {
+  if (!doc.containsKey("upload_interval_ms")) {
+    return;
+  }
+
+  uint32_t intervalMs = doc["upload_interval_ms"] | 0;
+  if (intervalMs == 0) {
+    return;
+  }
+
+  Serial.printf("[TCP] upload interval -> %lu ms\n", (unsigned long)intervalMs);
+  if (configCallback) {
+    configCallback(intervalMs);
+  }
+}
@@ -8,6 +8,9 @@
 // Callback type for state_update messages
 typedef void (*StateUpdateCallback)(bool hasLed, bool isLedOn, bool hasFace, const String& face);
 
+// Callback type for server-recommended upload interval (hello_ack / config_update)
+typedef void (*ConfigUpdateCallback)(uint32_t uploadIntervalMs);
+
 class TcpDeviceClient {
 public:
   TcpDeviceClient(const char* serverHost, uint16_t serverPort, const char* serial);
@@ -24,6 +27,9 @@ public:
   // Register callback for state_update / hello_ack
   void onStateUpdate(StateUpdateCallback cb) { stateCallback = cb; }
 
+  // Register callback for upload interval pushed by server
+  void onConfigUpdate(ConfigUpdateCallback cb) { configCallback = cb; }
+
   // Connection state
   bool isConnected() { return client.connected(); }
 
@@ -50,8 +56,9 @@ private:
   // Line buffer limit
   static const size_t MAX_LINE_LENGTH = 1024;
 
-  // State callback
+  // Callbacks
   StateUpdateCallback stateCallback;
+  ConfigUpdateCallback configCallback;
 
   // Internal methods
   void tryReconnect();
@@ -60,6 +67,7 @@ private:
   void processLine(const String& line);
   void handleHelloAck(JsonDocument& doc);
   void handleStateUpdate(JsonDocument& doc);
+  void handleConfigUpdate(JsonDocument& doc);
 };
 
 #endif
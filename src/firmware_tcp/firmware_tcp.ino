@@ -15,7 +15,7 @@
 
 // --- 주기 설정 ---
 const uint32_t SENSOR_READ_INTERVAL_MS = 10000;      // 10초마다 센서 읽기
-const uint32_t SENSOR_UPLOAD_INTERVAL_MS = 30000;     // 30초마다 센서 업로드
+const uint32_t SENSOR_UPLOAD_INTERVAL_MS = 30000;     // 30초마다 센서 업로드 (서버가 config_update로 변경 가능)
 
 // --- TCP 서버 설정 ---
 const char* TCP_SERVER_HOST = "192.168.0.27";  // 로컬 테스트 서버 IP (PC Wi-Fi)
@@ -62,6 +62,13 @@ void onStateUpdate(bool hasLed, bool isLedOn, bool hasFace, const String& face)
   }
 }
 
+// --- config_update 콜백 (서버 추천 업로드 주기) ---
+void onConfigUpdate(uint32_t uploadIntervalMs) {
+  if (sensorManager.isInitialized()) {
+    sensorManager.setUploadIntervalMs(uploadIntervalMs);
+  }
+}
+
 // --- Setup ---
 void setup() {
   Serial.begin(115200);
@@ -88,6 +95,7 @@ void setup() {
 
   // TCP 콜백 등록
   tcpClient.onStateUpdate(onStateUpdate);
+  tcpClient.onConfigUpdate(onConfigUpdate);
 
   // GPIO 0 (BOOT 버튼) 설정
   pinMode(0, INPUT_PULLUP);
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+센서 데이터 body 포맷 비교 스크립트 (form / JSON / 바이너리)
+사용법: python bench_body_formats.py [count] [server_url] [server_pid]
+예시: python bench_body_formats.py 100000
+      python main.py & python bench_body_formats.py 100000 http://localhost:8000 $!
+
+1) 서버의 body 해석 + 검증 비용 (reading 1건당 µs). POST /sensor_data가 하는 것과 같은 함수를 직접 호출
+   - form: parse_qsl + validate_reading (펌웨어 기본값)
+   - JSON: json.loads + validate_reading
+   - 바이너리: parse_binary_readings (struct.unpack + 정수 범위 검사)
+2) body 크기 (bytes), batch 1000건일 때 reading당 크기
+3) server_url을 주면 POST /sensor_data를 keep-alive 연결 하나로 count/10번씩 보내 req/s 측정.
+   server_pid도 주면 서버 CPU 1코어당 req/s (bench_hot_get.py와 같은 방식)
+"""
+
+import http.client
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import BINARY_CONTENT_TYPE, encode_readings, parse_binary_readings, parse_readings, validate_reading
+from test_client import sensor_payload
+
+SERIAL = "xJN2wsF850yqWQfBUkGP"
+
+
+def make_readings(count):
+    rng = random.Random(1)
+    return [
+        {"serial": SERIAL, "temperature": round(rng.uniform(20, 26), 2), "humidity": round(rng.uniform(40, 70), 2)}
+        for _ in range(count)
+    ]
+
+
+def make_bodies(readings):
+    """포맷별 (Content-Type, 단건 body 목록, batch body)"""
+    form = [urlencode(sensor_payload(r["serial"], r["temperature"], r["humidity"])).encode() for r in readings]
+    as_json = [
+        json.dumps({"serial": r["serial"], "temperature": r["temperature"], "humidity": r["humidity"], "illuminance": 0}).encode()
+        for r in readings
+    ]
+    binary = [encode_readings([r]) for r in readings]
+    batch = readings[:1000]
+    return {
+        "form": ("application/x-www-form-urlencoded", form, None),
+        "JSON": ("application/json", as_json, json.dumps(batch).encode()),
+        "바이너리": (BINARY_CONTENT_TYPE, binary, encode_readings(batch)),
+    }
+
+
+def parse_one(name, body, now):
+    if name == "form":
+        return validate_reading(dict(parse_qsl(body.decode(), keep_blank_values=True)), now)
+    if name == "JSON":
+        return validate_reading(json.loads(body), now)
+    return parse_binary_readings(body, now)[0][0]
+
+
+def server_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime, stime (clock tick)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def post_rate(server_url, content_type, bodies, pid):
+    url = urlparse(server_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    cpu_before = server_cpu_seconds(pid) if pid else None
+    start = time.perf_counter()
+    for body in bodies:
+        conn.request("POST", "/sensor_data", body=body, headers={"Content-Type": content_type})
+        response = conn.getresponse()
+        response.read()
+        assert response.status in (200, 204), response.status
+    elapsed = time.perf_counter() - start
+    per_core = len(bodies) / (server_cpu_seconds(pid) - cpu_before) if pid else None
+    return len(bodies) / elapsed, per_core
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    server_url = sys.argv[2] if len(sys.argv) > 2 else None
+    pid = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    readings = make_readings(count)
+    formats = make_bodies(readings)
+
+    print("=" * 50)
+    print(f"reading {count:,}건")
+    print("-" * 50)
+    print(f"{'포맷':<10} {'해석+검증 µs':>12} {'단건 bytes':>10} {'batch B/건':>10}")
+    for name, (content_type, bodies, batch) in formats.items():
+        now = time.time()
+        start = time.perf_counter()
+        for body in bodies:
+            parse_one(name, body, now)
+        per_reading = (time.perf_counter() - start) / count * 1e6
+        batch_size = f"{len(batch) / 1000:10.1f}" if batch else f"{'-':>10}"
+        print(f"{name:<10} {per_reading:12.2f} {len(bodies[0]):10d} {batch_size}")
+
+    # batch endpoint 해석 비용 (1000건 body 하나)
+    for name in ("JSON", "바이너리"):
+        content_type, _, batch = formats[name]
+        start = time.perf_counter()
+        for _ in range(20):
+            parse_readings(batch, content_type)
+        print(f"batch 1000건 {name}: {(time.perf_counter() - start) / 20 * 1000:.2f} ms")
+
+    if server_url:
+        print("-" * 50)
+        for name, (content_type, bodies, _) in formats.items():
+            rate, per_core = post_rate(server_url, content_type, bodies[: max(count // 10, 1)], pid)
+            line = f"POST /sensor_data {name:<6} {rate:8,.0f} req/s"
+            if per_core is not None:
+                line += f"   서버 CPU 1코어당 {per_core:8,.0f} req/s"
+            print(line)
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+센서 데이터 저장 크기 비교 스크립트 (deadband / Gorilla 압축)
+사용법: python bench_compression.py [days] [interval] [devices]
+예시: python bench_compression.py 7 30 1
+
+실내 바질 화분을 흉내 낸 합성 데이터(하루 주기 온습도 변화 + 센서 노이즈,
+SHT31 출력처럼 소수 둘째 자리로 반올림)를 interval초 간격으로 days일치 만든 뒤
+아래 네 가지로 SQLite에 저장하고 reading당 bytes를 비교한다.
+
+1) 전부 저장 (기존)
+2) deadband 필터 후 저장 (SENSOR_DEADBAND_TEMP/HUM, SENSOR_HEARTBEAT 기본값)
+3) 전부 저장 후 Gorilla block으로 compact
+4) deadband + compact
+
+bytes는 VACUUM 후 크기다. 전체(DB 파일, rollup 포함)와 원본 reading 저장분
+(readings_* 파티션 + blocks 테이블과 인덱스, dbstat 기준)을 따로 출력한다.
+deadband는 손실 압축이므로, 버려진 reading을 직전 저장값으로 채웠을 때의 최대 오차도 출력한다.
+"""
+
+import math
+import os
+import random
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.deadband import DeadbandFilter
+from gorilla import encode_block
+from storage import SensorStore
+
+DEADBAND_TEMP = 0.1
+DEADBAND_HUM = 0.5
+HEARTBEAT = 600.0
+
+
+def basil_readings(days: int, interval: int, devices: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    start = time.time() - days * 86400
+    readings = []
+    for d in range(devices):
+        serial = f"basil-{d:03d}"
+        drift_t = drift_h = 0.0
+        for i in range(int(days * 86400 / interval)):
+            ts = start + i * interval
+            phase = 2 * math.pi * ((ts % 86400) / 86400)
+            # 느린 변화 (환기, 물 주기 등)
+            drift_t = max(-1.0, min(1.0, drift_t + rng.gauss(0, 0.005)))
+            drift_h = max(-5.0, min(5.0, drift_h + rng.gauss(0, 0.02)))
+            temperature = 23.0 + 1.5 * math.sin(phase - 2.0) + drift_t + rng.gauss(0, 0.02)
+            humidity = 55.0 - 4.0 * math.sin(phase - 2.0) + drift_h + rng.gauss(0, 0.1)
+            readings.append({
+                "serial": serial,
+                "timestamp": ts,
+                "temperature": round(temperature, 2),
+                "humidity": round(humidity, 2),
+                "illuminance": "0",
+            })
+    return readings
+
+
+def db_size(path: str) -> tuple:
+    """(DB 파일 크기, 원본 reading 저장분 크기)"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    (raw,) = conn.execute(
+        "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'readings_%' OR name LIKE 'blocks%'"
+    ).fetchone()
+    conn.close()
+    return os.path.getsize(path), raw
+
+
+def store(readings: list, compact: bool) -> tuple:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    sensor_store = SensorStore(path)
+    for i in range(0, len(readings), 5000):
+        sensor_store.insert(readings[i : i + 5000])
+    if compact:
+        sensor_store.compact(time.time() + 1)
+    sensor_store.close()
+    return db_size(path)
+
+
+def deadband_error(readings: list, kept: list) -> tuple:
+    """버려진 reading을 같은 serial의 직전 저장값으로 채웠을 때 최대 오차 (온도, 습도)"""
+    kept_ids = {id(r) for r in kept}
+    last = {}
+    max_t = max_h = 0.0
+    for r in readings:
+        if id(r) in kept_ids:
+            last[r["serial"]] = r
+            continue
+        ref = last[r["serial"]]
+        max_t = max(max_t, abs(r["temperature"] - ref["temperature"]))
+        max_h = max(max_h, abs(r["humidity"] - ref["humidity"]))
+    return max_t, max_h
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    devices = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    readings = basil_readings(days, interval, devices)
+    total = len(readings)
+    kept = DeadbandFilter(DEADBAND_TEMP, DEADBAND_HUM, HEARTBEAT).filter(readings)
+    max_t, max_h = deadband_error(readings, kept)
+
+    # 저장 계층과 무관한 인코딩 자체의 크기 (timestamp + 온도 + 습도, float64 3개 = 24 bytes)
+    encoded = 0
+    for d in range(devices):
+        series = [r for r in readings if r["serial"] == f"basil-{d:03d}"]
+        encoded += len(encode_block(
+            [r["timestamp"] for r in series],
+            [[r["temperature"] for r in series], [r["humidity"] for r in series]],
+        ))
+    plain = total * struct.calcsize("<ddd")
+
+    results = [
+        ("전부 저장 (기존)", store(readings, False)),
+        ("deadband", store(kept, False)),
+        ("Gorilla compact", store(readings, True)),
+        ("deadband + Gorilla", store(kept, True)),
+    ]
+
+    print("=" * 60)
+    print(f"{days}일 x {devices}대, {interval}초 간격: reading {total:,}건")
+    print(
+        f"deadband (±{DEADBAND_TEMP}°C, ±{DEADBAND_HUM}%RH, heartbeat {HEARTBEAT:.0f}s): "
+        f"{len(kept):,}건 저장 ({len(kept) / total:.1%}), "
+        f"최대 오차 {max_t:.2f}°C / {max_h:.2f}%RH"
+    )
+    print(f"인코딩만: float64 {plain / total:.1f} B -> Gorilla {encoded / total:.2f} B / reading")
+    print("-" * 60)
+    print(f"{'':<20} {'원본 B/reading':>16} {'전체 B/reading':>16}")
+    base_raw = results[0][1][1]
+    for name, (size, raw) in results:
+        print(
+            f"{name:<20} {raw / total:9.2f} ({raw / base_raw:5.1%}) {size / total:12.2f}"
+        )
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
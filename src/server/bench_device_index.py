@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+디바이스 목록 조회(GET /devices, TCP list_devices) 비용 측정 스크립트
+사용법: python bench_device_index.py [devices] [repeat]
+예시: python bench_device_index.py 100000 20
+
+devices대의 fleet을 흉내 낸 상태(대부분 접속 중, 일부 offline / 센서 끊김 /
+LED 켜짐 / 표정 SAD)를 common/deviceindex.py 인덱스에 넣고, 대시보드가 보내는
+필터 조회 한 페이지(limit 100)를 두 방식으로 비교한다.
+
+1) 전체 scan: serial -> 상태 dict를 전부 훑어서 조건 검사 후 정렬 (인덱스 없이 구현하면)
+2) DeviceIndex.find: 시각 순서 OrderedDict / 값별 집합에서 후보만 보고 정렬
+
+메시지 한 건마다 인덱스를 갱신하는 비용(seen, sensor)도 출력한다.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.deviceindex import ONLINE_WINDOW, SENSOR_STALE_AFTER, DeviceIndex
+
+LIMIT = 100
+
+# (이름, find 인자, 전체 scan 조건)
+QUERIES = (
+    ("online=false", {"online": False}, lambda d, now: now - d["seen"] > ONLINE_WINDOW),
+    ("stale_sensor=true", {"stale_sensor": True}, lambda d, now: now - d["sensor"] > SENSOR_STALE_AFTER),
+    ("is_led_on=true", {"is_led_on": True}, lambda d, now: d["led"]),
+    ("face=SAD", {"face": "SAD"}, lambda d, now: d["face"] == "SAD"),
+    (
+        "online=true&is_led_on=true",
+        {"online": True, "is_led_on": True},
+        lambda d, now: now - d["seen"] <= ONLINE_WINDOW and d["led"],
+    ),
+    ("online=true (첫 페이지)", {"online": True}, lambda d, now: now - d["seen"] <= ONLINE_WINDOW),
+)
+
+
+def build_fleet(count: int, now: float, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    fleet = {}
+    for i in range(count):
+        offline = rng.random() < 0.02
+        seen = now - (rng.uniform(120, 86400) if offline else rng.uniform(0, 30))
+        stale = offline or rng.random() < 0.01
+        fleet[f"dev-{i:06d}"] = {
+            "seen": seen,
+            "sensor": seen - (rng.uniform(1000, 86400) if stale else 0),
+            "led": rng.random() < 0.05,
+            "face": "SAD" if rng.random() < 0.01 else "NEUTRAL",
+        }
+    return fleet
+
+
+def build_index(fleet: dict) -> DeviceIndex:
+    index = DeviceIndex()
+    # 메시지를 받은 순서대로 갱신 (시각 순)
+    for serial, d in sorted(fleet.items(), key=lambda item: item[1]["sensor"]):
+        index.sensor(serial, d["sensor"])
+    for serial, d in sorted(fleet.items(), key=lambda item: item[1]["seen"]):
+        index.seen(serial, d["seen"])
+        index.set_state(serial, d["led"], d["face"])
+    return index
+
+
+def full_scan(fleet: dict, predicate, now: float) -> list:
+    return sorted(serial for serial, d in fleet.items() if predicate(d, now))[:LIMIT]
+
+
+def timed(fn, repeat: int) -> float:
+    """repeat번 중 가장 빠른 1회 (ms)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    now = time.time()
+    fleet = build_fleet(devices, now)
+    start = time.perf_counter()
+    index = build_index(fleet)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print("=" * 50)
+    print(f"디바이스 {devices:,}대, limit {LIMIT}, {repeat}회 중 최솟값")
+    print(f"인덱스 구성: {build_ms:.0f} ms")
+    print("-" * 50)
+    print(f"{'조회':<28} {'scan ms':>9} {'index ms':>9}")
+    for name, kwargs, predicate in QUERIES:
+        expected = full_scan(fleet, predicate, now)
+        found, _ = index.find(now, limit=LIMIT, **kwargs)
+        if found != expected:
+            raise SystemExit(f"결과 불일치: {name}")
+        scan_ms = timed(lambda: full_scan(fleet, predicate, now), repeat)
+        index_ms = timed(lambda: index.find(now, limit=LIMIT, **kwargs), repeat)
+        print(f"{name:<28} {scan_ms:9.2f} {index_ms:9.3f}")
+
+    print("-" * 50)
+    serials = list(fleet)
+    rng = random.Random(2)
+    sample = [rng.choice(serials) for _ in range(100000)]
+    for name, update in (("seen", index.seen), ("sensor", index.sensor)):
+        start = time.perf_counter()
+        for i, serial in enumerate(sample):
+            update(serial, now + i * 1e-6)
+        elapsed = time.perf_counter() - start
+        print(f"갱신 {name}: {elapsed / len(sample) * 1e6:.2f} µs/메시지")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+디바이스 polling 엔드포인트(GET /led, /lcd, /state) 처리량 측정 스크립트
+사용법: python bench_hot_get.py [clients] [duration] [server_url] [server_pid]
+예시: python main.py &
+      python bench_hot_get.py 4 5 http://localhost:8000 $!
+
+clients개 프로세스가 각자 keep-alive 연결로 엔드포인트 하나를 duration초 동안
+반복 호출하고 합계 req/s를 출력한다. 디바이스 serial 100개를 PATCH해 둔 뒤 돌아가며 조회한다.
+
+server_pid를 주면 측정 동안 서버 프로세스가 쓴 CPU 시간(/proc/<pid>/stat)으로
+"CPU 코어 1개당 req/s"(요청 수 / 서버 CPU 초)도 출력한다. 클라이언트와 서버가 같은
+코어를 나눠 쓰는 환경에서도 서버 쪽 비용만 비교할 수 있다.
+"""
+
+import http.client
+import multiprocessing
+import os
+import sys
+import time
+from urllib.parse import urlparse
+
+SERIALS = [f"bench-hot-{i:04d}" for i in range(100)]
+ENDPOINTS = ("led", "lcd", "state")
+
+
+def connect(server_url):
+    url = urlparse(server_url)
+    return http.client.HTTPConnection(url.hostname, url.port or 80)
+
+
+def server_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime, stime (clock tick)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def worker(server_url, endpoint, duration, counts, index):
+    conn = connect(server_url)
+    done = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        conn.request("GET", f"/devices/{SERIALS[done % len(SERIALS)]}/{endpoint}")
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+        done += 1
+    counts[index] = done
+
+
+def bench(server_url, endpoint, clients, duration, pid):
+    counts = multiprocessing.Array("i", clients)
+    procs = [
+        multiprocessing.Process(target=worker, args=(server_url, endpoint, duration, counts, i))
+        for i in range(clients)
+    ]
+    cpu_before = server_cpu_seconds(pid) if pid else None
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    total = sum(counts)
+    per_core = total / (server_cpu_seconds(pid) - cpu_before) if pid else None
+    return total / duration, per_core
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    server_url = sys.argv[3] if len(sys.argv) > 3 else "http://localhost:8000"
+    pid = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    conn = connect(server_url)
+    for i, serial in enumerate(SERIALS):
+        conn.request(
+            "PATCH", f"/devices/{serial}",
+            body=f"is_led_on={'true' if i % 2 else 'false'}&led_face=HAPPY",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        conn.getresponse().read()
+
+    print("=" * 50)
+    print(f"클라이언트 {clients}개, 엔드포인트당 {duration:.0f}초")
+    for endpoint in ENDPOINTS:
+        rate, per_core = bench(server_url, endpoint, clients, duration, pid)
+        line = f"GET /{endpoint:<6} {rate:8,.0f} req/s"
+        if per_core is not None:
+            line += f"   서버 CPU 1코어당 {per_core:8,.0f} req/s"
+        print(line)
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
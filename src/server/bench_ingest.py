@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+센서 데이터 ingest 처리량 비교 스크립트
+사용법: python bench_ingest.py [mode] [readings] [batch_size] [server_url]
+예시: python bench_ingest.py single 5000
+      python bench_ingest.py batch 100000 500
+      python bench_ingest.py ndjson 100000 500
+
+single: POST /sensor_data (form-urlencoded, reading 1개씩 - 기존 펌웨어 방식)
+batch:  POST /sensor_data/batch (JSON 배열)
+ndjson: POST /sensor_data/batch (NDJSON)
+
+CONCURRENCY개 스레드가 keep-alive 세션으로 동시에 전송하고 readings/sec를 출력한다.
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+
+import requests
+
+CONCURRENCY = 8
+DEVICES = 1000
+
+
+def make_reading(i):
+    return {
+        "serial": f"bench-{i % DEVICES:04d}",
+        "temperature": round(random.uniform(20.0, 30.0), 2),
+        "humidity": round(random.uniform(40.0, 80.0), 2),
+        "illuminance": "0",
+        "timestamp": time.time() - random.uniform(0, 300),
+    }
+
+
+def send_single(session, server_url, readings):
+    for r in readings:
+        data = {k: r[k] for k in ("serial", "temperature", "humidity", "illuminance")}
+        session.post(f"{server_url}/sensor_data", data=data).raise_for_status()
+
+
+def send_batch(session, server_url, readings, batch_size, ndjson):
+    for start in range(0, len(readings), batch_size):
+        chunk = readings[start : start + batch_size]
+        if ndjson:
+            body = "\n".join(json.dumps(r) for r in chunk)
+            headers = {"Content-Type": "application/x-ndjson"}
+        else:
+            body = json.dumps(chunk)
+            headers = {"Content-Type": "application/json"}
+        response = session.post(f"{server_url}/sensor_data/batch", data=body, headers=headers)
+        response.raise_for_status()
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "single"
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    server_url = sys.argv[4] if len(sys.argv) > 4 else "http://localhost:8000"
+
+    if mode not in ("single", "batch", "ndjson"):
+        print(f"알 수 없는 모드: {mode} (single, batch, ndjson)")
+        sys.exit(1)
+
+    readings = [make_reading(i) for i in range(total)]
+    shards = [readings[i::CONCURRENCY] for i in range(CONCURRENCY)]
+
+    def worker(shard):
+        session = requests.Session()
+        if mode == "single":
+            send_single(session, server_url, shard)
+        else:
+            send_batch(session, server_url, shard, batch_size, mode == "ndjson")
+
+    threads = [threading.Thread(target=worker, args=(shard,)) for shard in shards]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    print("=" * 50)
+    print(f"모드: {mode}" + ("" if mode == "single" else f" (batch {batch_size})"))
+    print(f"readings: {total}  동시 연결: {CONCURRENCY}  소요: {elapsed:.2f}초")
+    print(f"처리량: {total / elapsed:,.0f} readings/sec")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+로깅 방식별 이벤트 루프 지연 비교 스크립트
+사용법: python bench_logging.py [mode] [rate] [duration] [console_delay_ms]
+예시: python bench_logging.py print 5000 5
+      python bench_logging.py queue 5000 5
+      python bench_logging.py queue 5000 5 0.5
+
+print: 기존 receive_sensor_data처럼 요청마다 print 8줄 (동기 출력)
+queue: common.eventlog (큐 + 백그라운드 스레드, sensor_data=100 샘플링)
+off:   로그 없음 (기준선)
+
+서버 프로세스 안에서 sensor_data 요청 처리를 rate req/s로 흉내 내면서,
+1ms마다 깨어나는 probe 태스크가 예정보다 얼마나 늦게 깨어났는지(loop lag)를 잰다.
+console_delay_ms를 주면 콘솔 write 한 번마다 그만큼 블로킹해서
+느린 터미널 / 막힌 파이프를 흉내 낸다. 출력은 /dev/null로 버림.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.eventlog import log_event, setup_logging
+
+PROBE_INTERVAL = 0.001  # seconds
+TICK = 0.01  # 요청을 10ms 단위로 묶어서 발생
+
+
+class SlowConsole:
+    """write마다 delay초 블로킹하는 stdout/stderr 대체"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.devnull = open(os.devnull, "w")
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.devnull.write(text)
+
+    def flush(self):
+        self.devnull.flush()
+
+
+def handle_print(serial, temperature, humidity):
+    timestamp = datetime.now().isoformat()
+    print("=" * 50)
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 센서 데이터 수신")
+    print(f"  Serial/Device ID: {serial}")
+    print(f"  온도: {temperature:.2f} °C")
+    print(f"  습도: {humidity:.2f} %")
+    print(f"  조도: 0")
+    print(f"  Timestamp: {timestamp}")
+    print("=" * 50)
+
+
+def make_handle_queue(log):
+    def handle(serial, temperature, humidity):
+        log_event(
+            log,
+            "sensor_data",
+            serial=serial,
+            temperature=temperature,
+            humidity=humidity,
+            illuminance="0",
+        )
+
+    return handle
+
+
+def handle_off(serial, temperature, humidity):
+    pass
+
+
+async def probe(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def load(handle, rate, duration):
+    """TICK마다 rate * TICK개의 요청 처리를 흉내 냄. 실제 처리한 요청 수 반환"""
+    loop = asyncio.get_running_loop()
+    per_tick = rate * TICK
+    start = loop.time()
+    done = 0
+    while True:
+        elapsed = loop.time() - start
+        if elapsed >= duration:
+            return done
+        target = int(elapsed * rate) + int(per_tick)
+        while done < target:
+            handle(f"bench-{done % 1000:04d}", 25.0, 60.0)
+            done += 1
+            # 요청 하나가 끝날 때마다 다른 태스크에 양보 (실제 핸들러의 await 지점)
+            if done % 10 == 0:
+                await asyncio.sleep(0)
+        await asyncio.sleep(TICK)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def run(handle, rate, duration):
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    done = await load(handle, rate, duration)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return done, elapsed, lags
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "queue"
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    console_delay = float(sys.argv[4]) / 1000 if len(sys.argv) > 4 else 0.0
+
+    if mode not in ("print", "queue", "off"):
+        print(f"알 수 없는 모드: {mode} (print, queue, off)")
+        sys.exit(1)
+
+    real_stdout = sys.stdout
+    console = SlowConsole(console_delay)
+
+    if mode == "queue":
+        # StreamHandler는 생성 시점의 sys.stderr를 잡으므로 먼저 교체
+        sys.stderr = console
+        log_path = os.path.join(tempfile.mkdtemp(), "bench.jsonl")
+        log = setup_logging("bench", log_path, sample_rates={"sensor_data": 100})
+        handle = make_handle_queue(log)
+    elif mode == "print":
+        handle = handle_print
+    else:
+        handle = handle_off
+
+    sys.stdout = console
+    done, elapsed, lags = asyncio.run(run(handle, rate, duration))
+    sys.stdout = real_stdout
+
+    print("=" * 50)
+    print(f"모드: {mode}  목표: {rate} req/s  콘솔 지연: {console_delay * 1000:.2f} ms/write")
+    print(f"처리: {done}건 / {elapsed:.2f}초 = {done / elapsed:,.0f} req/s")
+    print(
+        "loop lag (ms): "
+        f"p50 {percentile(lags, 50) * 1000:.2f}  "
+        f"p99 {percentile(lags, 99) * 1000:.2f}  "
+        f"max {max(lags) * 1000:.2f}  "
+        f"mean {statistics.mean(lags) * 1000:.2f}"
+    )
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+시계열 저장소 조회 속도 측정 스크립트
+사용법: python bench_storage.py [devices] [days]
+예시: python bench_storage.py 10 30
+
+임시 SQLite 파일에 디바이스별 30초 간격 데이터를 days일치 넣고,
+한 디바이스에 대해 구간/step별 조회 시간을 출력한다.
+"""
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from storage import SensorStore
+
+UPLOAD_INTERVAL = 30
+
+
+def generate(serial, start, days):
+    """하루 주기로 흔들리는 온습도 + 노이즈"""
+    for i in range(int(days * 86400 / UPLOAD_INTERVAL)):
+        ts = start + i * UPLOAD_INTERVAL
+        phase = 2 * math.pi * (ts % 86400) / 86400
+        yield {
+            "serial": serial,
+            "timestamp": ts,
+            "temperature": round(23 + 2 * math.sin(phase) + random.gauss(0, 0.1), 2),
+            "humidity": round(55 - 8 * math.sin(phase) + random.gauss(0, 0.5), 2),
+            "illuminance": "0",
+        }
+
+
+def timed_query(store, serial, start, end, step, repeat=20):
+    store.query(serial, start, end, step)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        tier, points = store.query(serial, start, end, step)
+    return tier, len(points), (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    days = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SensorStore(os.path.join(tmp, "bench.db"))
+        end = float(int(time.time()) // 3600 * 3600)
+        start = end - days * 86400
+
+        t0 = time.perf_counter()
+        total = 0
+        for d in range(devices):
+            batch = []
+            for reading in generate(f"bench-{d:03d}", start, days):
+                batch.append(reading)
+                if len(batch) == 1000:
+                    store.insert(batch)
+                    total += len(batch)
+                    batch = []
+            store.insert(batch)
+            total += len(batch)
+        insert_s = time.perf_counter() - t0
+
+        print("=" * 60)
+        print(f"디바이스 {devices}대 x {days:g}일 (30초 간격) = {total:,} readings")
+        print(f"insert: {insert_s:.1f}초 ({total / insert_s:,.0f} readings/sec, rollup 포함)")
+        print("-" * 60)
+
+        serial = "bench-000"
+        cases = [
+            ("한 달, step 1일", start, end, 86400),
+            ("한 달, step 1시간", start, end, 3600),
+            ("한 달, step 1분", start, end, 60),
+            ("하루, step 5분", end - 86400, end, 300),
+            ("1시간, step 30초 (raw)", end - 3600, end, 30),
+            ("하루, step 90초 (raw)", end - 86400, end, 90),
+        ]
+        for label, q_start, q_end, step in cases:
+            tier, n, ms = timed_query(store, serial, q_start, q_end, step)
+            print(f"{label:<24} tier={tier:<4} points={n:<6} {ms:8.2f} ms")
+        print("=" * 60)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+멀티 worker 상태 조회 처리량 / 일관성 측정 스크립트
+사용법: python bench_workers.py [clients] [duration] [server_url]
+예시: python bench_workers.py 8 10
+
+서버는 미리 띄워 둔다:
+    HTTP_WORKERS=4 python main.py
+    # 또는 STATE_STORE_URL=shm:// uvicorn main:app --workers 4 --no-access-log
+
+1) 처리량: clients개 프로세스가 각자 keep-alive 연결로 GET /devices/{serial}/state를
+   duration초 동안 반복하고 합계 req/s를 출력
+2) 일관성: PATCH 직후 새 연결 CHECK_CONNECTIONS개(서로 다른 worker로 분산됨)로
+   /state를 읽어 이전 version이 보이는 응답 수를 센다 (0이어야 함)
+3) long-poll: 연결 CHECK_CONNECTIONS개로 /poll을 걸어 둔 뒤 PATCH하고,
+   다른 worker에 걸린 대기 요청이 깨어나기까지의 지연을 잰다
+"""
+
+import http.client
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+SERIAL = "bench-workers-0001"
+CHECK_CONNECTIONS = 32
+CHECK_ROUNDS = 20
+
+
+def connect(server_url):
+    url = urlparse(server_url)
+    return http.client.HTTPConnection(url.hostname, url.port or 80)
+
+
+def request(conn, method, path, body=None, headers=None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def patch_face(conn, face):
+    status, body = request(
+        conn, "PATCH", f"/devices/{SERIAL}",
+        body=f"led_face={face}",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert status == 200, body
+
+
+def read_worker(server_url, duration, counts, index):
+    conn = connect(server_url)
+    done = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        request(conn, "GET", f"/devices/{SERIAL}/state")
+        done += 1
+    counts[index] = done
+
+
+def bench_throughput(server_url, clients, duration):
+    counts = multiprocessing.Array("i", clients)
+    procs = [
+        multiprocessing.Process(target=read_worker, args=(server_url, duration, counts, i))
+        for i in range(clients)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return sum(counts) / duration
+
+
+def check_consistency(server_url):
+    """PATCH 직후 다른 worker에서 이전 version이 보이는 응답 수"""
+    control = connect(server_url)
+    stale = 0
+    for i in range(CHECK_ROUNDS):
+        patch_face(control, f"C{i:04d}")
+        _, body = request(control, "GET", f"/devices/{SERIAL}/state")
+        expected = json.loads(body)["version"]
+        for _ in range(CHECK_CONNECTIONS):
+            conn = connect(server_url)
+            _, body = request(conn, "GET", f"/devices/{SERIAL}/state")
+            if json.loads(body)["version"] < expected:
+                stale += 1
+            conn.close()
+    return stale, CHECK_ROUNDS * CHECK_CONNECTIONS
+
+
+def bench_long_poll(server_url):
+    """PATCH -> 모든 long-poll 응답까지의 지연 목록 (초)"""
+    control = connect(server_url)
+    _, body = request(control, "GET", f"/devices/{SERIAL}/state")
+    since = json.loads(body)["version"]
+
+    woke = []
+    lock = threading.Lock()
+    ready = threading.Barrier(CHECK_CONNECTIONS + 1)
+
+    def poller():
+        conn = connect(server_url)
+        ready.wait()
+        request(conn, "GET", f"/devices/{SERIAL}/poll?since={since}&timeout=10")
+        with lock:
+            woke.append(time.perf_counter())
+
+    threads = [threading.Thread(target=poller) for _ in range(CHECK_CONNECTIONS)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    time.sleep(0.5)  # 모든 poll 요청이 서버에 도착할 때까지 대기
+    sent_at = time.perf_counter()
+    patch_face(control, "LONGPOLL")
+    for t in threads:
+        t.join()
+    return sorted(w - sent_at for w in woke)
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    server_url = sys.argv[3] if len(sys.argv) > 3 else "http://localhost:8000"
+
+    patch_face(connect(server_url), "INIT")
+    rate = bench_throughput(server_url, clients, duration)
+    stale, checked = check_consistency(server_url)
+    latencies = bench_long_poll(server_url)
+
+    print("=" * 50)
+    print(f"GET /state 처리량: {rate:,.0f} req/s (클라이언트 {clients}개, {duration:.0f}초)")
+    print(f"PATCH 직후 이전 version 응답: {stale} / {checked}")
+    print(
+        f"long-poll 깨어남 ({len(latencies)}개, ms): "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.1f}  "
+        f"max {latencies[-1] * 1000:.1f}"
+    )
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
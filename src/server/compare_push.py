@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Polling vs long-poll vs SSE 비교 스크립트
+사용법: python compare_push.py [mode] [devices] [duration] [server_url]
+예시: python compare_push.py poll 20 60
+      python compare_push.py longpoll 20 60
+      python compare_push.py sse 20 60
+
+디바이스 N개를 스레드로 흉내 내고, 제어 스레드가 CHANGE_INTERVAL초마다
+임의의 디바이스에 PATCH(led_face)를 보낸다. 각 모드별로
+  - 디바이스가 보낸 요청 수 (초당)
+  - PATCH -> 디바이스가 변경을 확인하기까지의 지연 (p50 / p95 / max)
+를 출력한다.
+
+poll 모드는 기존 펌웨어 주기(LED 1초, LCD 2초)를 그대로 따른다.
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+
+import requests
+
+LED_POLL_INTERVAL = 1.0
+LCD_POLL_INTERVAL = 2.0
+CHANGE_INTERVAL = 2.0
+
+# 제어 스레드가 보낸 face 토큰 -> PATCH 완료 시각
+sent_at = {}
+latencies = []
+request_count = 0
+lock = threading.Lock()
+
+
+def record_face(face):
+    """디바이스가 새 face를 확인한 시각을 기록"""
+    now = time.perf_counter()
+    with lock:
+        if face in sent_at:
+            latencies.append(now - sent_at.pop(face))
+
+
+def count_request():
+    global request_count
+    with lock:
+        request_count += 1
+
+
+def poll_device(session, server_url, serial, stop):
+    """기존 펌웨어와 동일: LED 1초, LCD 2초 주기 polling"""
+    # 디바이스마다 부팅 시각이 다르므로 polling 위상을 흩뿌림
+    next_led = time.perf_counter() + random.uniform(0, LED_POLL_INTERVAL)
+    next_lcd = time.perf_counter() + random.uniform(0, LCD_POLL_INTERVAL)
+    last_face = None
+    while not stop.is_set():
+        now = time.perf_counter()
+        if now >= next_led:
+            session.get(f"{server_url}/devices/{serial}/led", timeout=5)
+            count_request()
+            next_led += LED_POLL_INTERVAL
+        if now >= next_lcd:
+            face = session.get(f"{server_url}/devices/{serial}/lcd", timeout=5).json()["face"]
+            count_request()
+            if face != last_face:
+                last_face = face
+                record_face(face)
+            next_lcd += LCD_POLL_INTERVAL
+        time.sleep(max(0.0, min(next_led, next_lcd) - time.perf_counter()))
+
+
+def longpoll_device(session, server_url, serial, stop):
+    since = 0
+    while not stop.is_set():
+        response = session.get(
+            f"{server_url}/devices/{serial}/poll",
+            params={"since": since, "timeout": 5},
+            timeout=10,
+        )
+        count_request()
+        if response.status_code == 200:
+            state = response.json()
+            since = state["version"]
+            record_face(state["face"])
+
+
+def sse_device(session, server_url, serial, stop):
+    response = session.get(f"{server_url}/devices/{serial}/events", stream=True, timeout=30)
+    count_request()
+    for line in response.iter_lines(decode_unicode=True):
+        if stop.is_set():
+            break
+        if line and line.startswith("data: "):
+            record_face(json.loads(line[6:])["face"])
+    response.close()
+
+
+def controller(server_url, serials, stop):
+    n = 0
+    while not stop.wait(CHANGE_INTERVAL):
+        n += 1
+        token = f"T{n}"
+        with lock:
+            sent_at[token] = time.perf_counter()
+        requests.patch(
+            f"{server_url}/devices/{random.choice(serials)}",
+            data={"led_face": token},
+            timeout=5,
+        )
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "poll"
+    devices = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 60
+    server_url = sys.argv[4] if len(sys.argv) > 4 else "http://localhost:8000"
+
+    workers = {"poll": poll_device, "longpoll": longpoll_device, "sse": sse_device}
+    if mode not in workers:
+        print(f"알 수 없는 모드: {mode} (poll, longpoll, sse)")
+        sys.exit(1)
+
+    # 실행마다 다른 serial을 써서 이전 실행의 상태가 섞이지 않게 함
+    run_id = int(time.time())
+    serials = [f"bench-{run_id}-{i:03d}" for i in range(devices)]
+    stop = threading.Event()
+
+    threads = [
+        threading.Thread(
+            target=workers[mode],
+            args=(requests.Session(), server_url, serial, stop),
+            daemon=True,
+        )
+        for serial in serials
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    control = threading.Thread(target=controller, args=(server_url, serials, stop), daemon=True)
+    control.start()
+    time.sleep(duration)
+    stop.set()
+    elapsed = time.perf_counter() - start
+
+    with lock:
+        total = request_count
+        lat = [x * 1000 for x in latencies]
+
+    print("=" * 50)
+    print(f"모드: {mode}  디바이스: {devices}  측정 시간: {elapsed:.0f}초")
+    print(f"디바이스 요청 수: {total} ({total / elapsed:.1f} req/s)")
+    print(f"상태 변경 수: {len(lat)}")
+    print(
+        f"변경 -> 디바이스 지연: p50={percentile(lat, 0.5):.0f}ms "
+        f"p95={percentile(lat, 0.95):.0f}ms max={max(lat, default=float('nan')):.0f}ms"
+    )
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Gorilla 스타일 시계열 압축 (Facebook Gorilla TSDB 논문 방식)
+
+- timestamp: 밀리초 정수의 delta-of-delta. 일정 간격(30초)이면 reading당 1bit
+- 값(float64): 직전 값과 XOR해서 의미 있는 비트만 기록. 값이 같으면 1bit,
+  비슷하면 직전 leading/trailing zero 구간을 재사용해서 수 bit~수십 bit
+
+block 하나 = timestamp 1열 + float 여러 열(온도, 습도, 조도)을 하나의 bitstream에 담음.
+"""
+
+import math
+import struct
+
+# delta-of-delta 구간: (prefix 비트, prefix 길이, 값 비트 수)
+DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12))
+DOD_FALLBACK = (0b1111, 4, 64)
+
+
+class BitWriter:
+    def __init__(self):
+        self.out = bytearray()
+        self._acc = 0
+        self._nbits = 0
+
+    def write(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._nbits += nbits
+        while self._nbits >= 8:
+            self._nbits -= 8
+            self.out.append((self._acc >> self._nbits) & 0xFF)
+        self._acc &= (1 << self._nbits) - 1
+
+    def getvalue(self) -> bytes:
+        if self._nbits:
+            return bytes(self.out) + bytes([(self._acc << (8 - self._nbits)) & 0xFF])
+        return bytes(self.out)
+
+
+class BitReader:
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.pos = offset
+        self._acc = 0
+        self._nbits = 0
+
+    def read(self, nbits: int) -> int:
+        while self._nbits < nbits:
+            self._acc = (self._acc << 8) | self.data[self.pos]
+            self.pos += 1
+            self._nbits += 8
+        self._nbits -= nbits
+        value = self._acc >> self._nbits
+        self._acc &= (1 << self._nbits) - 1
+        return value
+
+
+def _float_bits(value: float) -> int:
+    return struct.unpack("<Q", struct.pack("<d", value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return struct.unpack("<d", struct.pack("<Q", bits))[0]
+
+
+def _signed(value: int, nbits: int) -> int:
+    return value - (1 << nbits) if value >= 1 << (nbits - 1) else value
+
+
+def _write_timestamps(writer: BitWriter, millis: list):
+    prev_delta = 0
+    for i in range(1, len(millis)):
+        delta = millis[i] - millis[i - 1]
+        dod = delta - prev_delta
+        prev_delta = delta
+        if dod == 0:
+            writer.write(0, 1)
+            continue
+        for prefix, prefix_len, nbits in DOD_BUCKETS:
+            if -(1 << (nbits - 1)) <= dod < (1 << (nbits - 1)):
+                break
+        else:
+            prefix, prefix_len, nbits = DOD_FALLBACK
+        writer.write(prefix, prefix_len)
+        writer.write(dod, nbits)
+
+
+def _read_timestamps(reader: BitReader, first: int, count: int) -> list:
+    millis = [first]
+    delta = 0
+    for _ in range(1, count):
+        # prefix: 0 / 10 / 110 / 1110 / 1111 -> 1이 나온 개수로 구간 결정
+        ones = 0
+        while ones < 4 and reader.read(1):
+            ones += 1
+        if ones == 0:
+            dod = 0
+        else:
+            nbits = DOD_BUCKETS[ones - 1][2] if ones < 4 else DOD_FALLBACK[2]
+            dod = _signed(reader.read(nbits), nbits)
+        delta += dod
+        millis.append(millis[-1] + delta)
+    return millis
+
+
+def _write_values(writer: BitWriter, values: list):
+    prev = _float_bits(values[0])
+    prev_leading, prev_trailing = 65, 0  # 첫 XOR은 항상 새 구간
+    for value in values[1:]:
+        bits = _float_bits(value)
+        xor = bits ^ prev
+        prev = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        writer.write(1, 1)
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if leading >= prev_leading and trailing >= prev_trailing:
+            writer.write(0, 1)
+            writer.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+        else:
+            length = 64 - leading - trailing
+            writer.write(1, 1)
+            writer.write(leading, 5)
+            writer.write(length - 1, 6)
+            writer.write(xor >> trailing, length)
+            prev_leading, prev_trailing = leading, trailing
+
+
+def _read_values(reader: BitReader, first: int, count: int) -> list:
+    prev = first
+    values = [_bits_float(prev)]
+    leading = trailing = 0
+    for _ in range(1, count):
+        if reader.read(1):
+            if reader.read(1):
+                leading = reader.read(5)
+                length = reader.read(6) + 1
+                trailing = 64 - leading - length
+            prev ^= reader.read(64 - leading - trailing) << trailing
+        values.append(_bits_float(prev))
+    return values
+
+
+def encode_block(timestamps: list, columns: list) -> bytes:
+    """
+    timestamps(epoch 초)와 같은 길이의 float 열 목록을 하나의 block으로 압축
+
+    Returns:
+        bytes: header(개수, 열 수, 첫 timestamp, 각 열의 첫 값) + bitstream
+    """
+    count = len(timestamps)
+    if count == 0:
+        raise ValueError("empty block")
+    millis = [int(round(ts * 1000)) for ts in timestamps]
+    header = struct.pack("<IBq", count, len(columns), millis[0])
+    header += b"".join(struct.pack("<d", col[0]) for col in columns)
+
+    writer = BitWriter()
+    _write_timestamps(writer, millis)
+    for col in columns:
+        _write_values(writer, col)
+    return header + writer.getvalue()
+
+
+def decode_block(data: bytes) -> tuple:
+    """encode_block의 역. (timestamps, columns) 반환"""
+    count, ncols, first_ms = struct.unpack_from("<IBq", data, 0)
+    offset = struct.calcsize("<IBq")
+    firsts = []
+    for _ in range(ncols):
+        firsts.append(struct.unpack_from("<Q", data, offset)[0])
+        offset += 8
+
+    reader = BitReader(data, offset)
+    timestamps = [ms / 1000 for ms in _read_timestamps(reader, first_ms, count)]
+    columns = [_read_values(reader, first, count) for first in firsts]
+    return timestamps, columns
+
+
+def to_float(value) -> float:
+    """조도처럼 문자열로 들어오는 값을 열에 넣기 위해 float로 (실패 시 NaN)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
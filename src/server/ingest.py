@@ -0,0 +1,318 @@
+"""
+센서 데이터 ingest 유틸리티
+
+- parse_readings: JSON 배열 / NDJSON / 바이너리 body를 한 번에 파싱 + 검증
+- parse_binary_readings / encode_readings: 고정 struct 바이너리 reading 포맷
+- WriteBehindBuffer: 요청 처리와 저장을 분리하는 write-behind 버퍼
+"""
+
+import asyncio
+import json
+import logging
+import math
+import struct
+import time
+from datetime import datetime
+
+MAX_BATCH_SIZE = 5000
+
+# reading timestamp 허용 범위 (서버 수신 시각 기준)
+# 밀리초 epoch, 먼 미래 / 과거 값은 저장(월 파티션 이름)과 최신값 캐시를 깨므로 reading별로 거부
+MAX_FUTURE_SKEW = 300.0  # 디바이스 시계가 빠를 수 있는 정도 (초)
+MAX_BACKFILL_AGE = 7 * 86400.0  # 오프라인 동안 모아 두었다가 보내는 reading (초)
+
+# 종료할 때 일시 오류가 계속되면 이만큼 다시 시도하고 남은 reading은 버림
+STOP_FLUSH_ATTEMPTS = 5
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# 바이너리 reading 포맷 (펌웨어 / 게이트웨이용, little-endian)
+#   body = 포맷 버전(1B) + record 반복
+#   record = serial 길이(1B), 온도 x100 (int16), 습도 x100 (uint16), 조도 (uint32),
+#            timestamp (uint32 epoch 초, 0이면 서버 수신 시각), serial (ASCII)
+# 값은 SHT31 출력과 같은 소수 둘째 자리 고정소수점이라 float/문자열 파싱이 없다
+BINARY_CONTENT_TYPE = "application/vnd.citonphyde.reading"
+BINARY_VERSION = 1
+BINARY_RECORD = struct.Struct("<BhHII")
+# SHT31 측정 범위 (x100)
+BINARY_TEMP_RANGE = (-4000, 12500)
+BINARY_HUMIDITY_MAX = 10000
+
+log = logging.getLogger("server.ingest")
+
+
+class BatchError(ValueError):
+    """batch body 자체를 해석할 수 없을 때 (개별 reading 오류와 구분)"""
+
+
+def parse_timestamp(value, default: float) -> float:
+    """epoch 초(int/float) 또는 ISO 8601 문자열을 epoch 초로 변환"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value).timestamp()
+    raise ValueError("timestamp must be epoch seconds or ISO 8601 string")
+
+
+def check_timestamp(timestamp: float, received_at: float) -> float:
+    """reading timestamp가 received_at 기준 허용 범위 안인지 검사. 벗어나면 ValueError"""
+    if not math.isfinite(timestamp):
+        raise ValueError("timestamp must be finite")
+    if timestamp > received_at + MAX_FUTURE_SKEW:
+        raise ValueError("timestamp is in the future (epoch seconds expected)")
+    if timestamp < received_at - MAX_BACKFILL_AGE:
+        raise ValueError("timestamp is too old")
+    return timestamp
+
+
+def validate_reading(item, received_at: float) -> dict:
+    """reading 하나를 검증해서 정규화된 dict로 반환. 실패 시 ValueError"""
+    if not isinstance(item, dict):
+        raise ValueError("reading must be an object")
+
+    serial = item.get("serial")
+    if not isinstance(serial, str) or not serial:
+        raise ValueError("serial is required")
+
+    values = {}
+    for field in ("temperature", "humidity"):
+        value = item.get(field)
+        if isinstance(value, str):
+            value = float(value)
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+            raise ValueError(f"{field} must be a number")
+        values[field] = float(value)
+
+    return {
+        "serial": serial,
+        "temperature": values["temperature"],
+        "humidity": values["humidity"],
+        "illuminance": str(item.get("illuminance", "0")),
+        "timestamp": check_timestamp(parse_timestamp(item.get("timestamp"), received_at), received_at),
+    }
+
+
+def media_type(content_type: str) -> str:
+    """Content-Type 헤더에서 파라미터(charset 등)를 뺀 소문자 media type"""
+    return content_type.split(";")[0].strip().lower()
+
+
+def encode_readings(readings: list) -> bytes:
+    """reading dict 목록을 바이너리 포맷으로 (클라이언트 / 벤치마크용)"""
+    out = [bytes([BINARY_VERSION])]
+    for r in readings:
+        serial = r["serial"].encode("ascii")
+        out.append(BINARY_RECORD.pack(
+            len(serial),
+            round(r["temperature"] * 100),
+            round(r["humidity"] * 100),
+            int(r.get("illuminance", 0)),
+            int(r.get("timestamp") or 0),
+        ))
+        out.append(serial)
+    return b"".join(out)
+
+
+def parse_binary_readings(body: bytes, received_at: float) -> tuple:
+    """
+    바이너리 body 파싱 + 검증
+
+    record 구조가 깨졌으면(잘림, 버전 불일치) BatchError, 값이 범위를 벗어난 record는 rejected.
+
+    Returns:
+        tuple: (valid readings list, rejected list of {"index", "error"})
+    """
+    if not body or body[0] != BINARY_VERSION:
+        raise BatchError(f"unsupported binary format (expected version {BINARY_VERSION})")
+
+    readings = []
+    rejected = []
+    offset = 1
+    size = len(body)
+    header_size = BINARY_RECORD.size
+    temp_min, temp_max = BINARY_TEMP_RANGE
+    while offset < size:
+        index = len(readings) + len(rejected)
+        if index >= MAX_BATCH_SIZE:
+            raise BatchError(f"too many readings (max {MAX_BATCH_SIZE})")
+        if offset + header_size > size:
+            raise BatchError(f"truncated record at index {index}")
+        serial_len, temp, hum, illuminance, timestamp = BINARY_RECORD.unpack_from(body, offset)
+        offset += header_size
+        serial = body[offset : offset + serial_len]
+        offset += serial_len
+        if len(serial) != serial_len:
+            raise BatchError(f"truncated record at index {index}")
+
+        if not serial_len or not serial.isascii():
+            rejected.append({"index": index, "error": "serial must be non-empty ASCII"})
+        elif not temp_min <= temp <= temp_max:
+            rejected.append({"index": index, "error": "temperature out of range"})
+        elif hum > BINARY_HUMIDITY_MAX:
+            rejected.append({"index": index, "error": "humidity out of range"})
+        else:
+            try:
+                timestamp = check_timestamp(float(timestamp), received_at) if timestamp else received_at
+            except ValueError as e:
+                rejected.append({"index": index, "error": str(e)})
+                continue
+            readings.append({
+                "serial": serial.decode("ascii"),
+                "temperature": temp / 100,
+                "humidity": hum / 100,
+                "illuminance": str(illuminance),
+                "timestamp": timestamp,
+            })
+    return readings, rejected
+
+
+def parse_readings(body: bytes, content_type: str) -> tuple:
+    """
+    batch body를 파싱하고 reading별로 검증
+
+    Returns:
+        tuple: (valid readings list, rejected list of {"index", "error"})
+    """
+    content_type = media_type(content_type)
+    if content_type == BINARY_CONTENT_TYPE:
+        return parse_binary_readings(body, time.time())
+    try:
+        if content_type in NDJSON_CONTENT_TYPES:
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise BatchError(f"invalid body: {e}")
+
+    if not isinstance(items, list):
+        raise BatchError("body must be a JSON array or NDJSON")
+    if len(items) > MAX_BATCH_SIZE:
+        raise BatchError(f"too many readings (max {MAX_BATCH_SIZE})")
+
+    received_at = time.time()
+    readings = []
+    rejected = []
+    for index, item in enumerate(items):
+        try:
+            readings.append(validate_reading(item, received_at))
+        except (ValueError, TypeError) as e:
+            rejected.append({"index": index, "error": str(e)})
+    return readings, rejected
+
+
+class WriteBehindBuffer:
+    """
+    reading을 메모리에 모아 두었다가 백그라운드 태스크에서 한꺼번에 sink로 넘긴다.
+
+    - flush_interval마다, 또는 max_batch개가 쌓이면 즉시 flush
+    - sink(readings)는 별도 스레드에서 실행되므로 블로킹 I/O여도 이벤트 루프를 막지 않음
+    - capacity를 넘으면 add()가 False를 반환 (호출 측에서 503으로 backpressure)
+    - sink가 data_errors(reading 자체가 잘못됨)를 내면 batch를 반씩 나눠 다시 시도해서
+      실패한 reading만 버림
+    - 그 밖의 오류(database is locked 등 일시 오류)는 batch를 pending 앞에 되돌려 놓고
+      다음 flush에서 다시 시도. 되돌린 reading도 capacity에 포함되므로 길어지면 503
+    """
+
+    def __init__(
+        self,
+        sink,
+        flush_interval: float = 1.0,
+        max_batch: int = 1000,
+        capacity: int = 100000,
+        data_errors: tuple = (KeyError, TypeError, ValueError),
+    ):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.capacity = capacity
+        self.data_errors = data_errors
+        self.pending = []
+        self.flushed = 0
+        self.lost = 0  # 잘못된 reading이라 버린 수 (+ 종료 때까지 저장하지 못한 수)
+        self.retried = 0  # 일시 오류로 다음 flush에 다시 시도한 횟수
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def add(self, readings: list) -> bool:
+        if len(self.pending) + len(readings) > self.capacity:
+            return False
+        self.pending.extend(readings)
+        if len(self.pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not await self.flush():
+                # 일시 오류: max_batch 이상 쌓여 있어도 flush_interval은 쉬고 다시 시도
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> bool:
+        """pending을 sink로 넘김. 일시 오류로 남은 reading이 있으면 False"""
+        while self.pending:
+            batch = self.pending[: self.max_batch]
+            del self.pending[: self.max_batch]
+            rest = await self._write(batch)
+            if rest:
+                self.pending[:0] = rest
+                self.retried += 1
+                return False
+        return True
+
+    async def _write(self, batch: list) -> list:
+        """
+        batch를 sink로 넘김. data_errors면 반으로 나눠 다시 시도해서
+        잘못된 reading 하나 때문에 나머지까지 잃지 않게 한다 (실패한 reading만 유실)
+
+        Returns:
+            일시 오류로 저장하지 못한 reading (없으면 빈 리스트)
+        """
+        try:
+            await asyncio.to_thread(self.sink, batch)
+        except self.data_errors as e:
+            if len(batch) == 1:
+                log.error("sink 오류, 1건 유실: %s (%r)", e, batch[0], exc_info=True)
+                self.lost += 1
+                return []
+            log.warning("sink 오류, %d건을 나눠서 다시 시도: %s", len(batch), e)
+            middle = len(batch) // 2
+            rest = await self._write(batch[:middle])
+            if rest:
+                return rest + batch[middle:]
+            return await self._write(batch[middle:])
+        except Exception as e:
+            log.warning("sink 일시 오류, %d건을 다음 flush에 다시 시도: %s", len(batch), e)
+            return batch
+        self.flushed += len(batch)
+        return []
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """태스크를 멈추고 남은 reading을 모두 flush"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _ in range(STOP_FLUSH_ATTEMPTS):
+            if await self.flush():
+                return
+            await asyncio.sleep(self.flush_interval)
+        log.error("종료 중 sink 오류가 계속됨, %d건 유실", len(self.pending))
+        self.lost += len(self.pending)
+        self.pending.clear()
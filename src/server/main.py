@@ -1,17 +1,359 @@
+import asyncio
+import fcntl
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional
+from urllib.parse import parse_qsl
 
 import uvicorn
-from fastapi import FastAPI, Form, Path
+from fastapi import FastAPI, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-app = FastAPI(title="Citonphyde Sensor Server", version="1.0.0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.deadband import DeadbandFilter
+from common.deviceindex import MAX_LIMIT, DeviceIndex
+from common.eventlog import log_event, parse_sample_rates, setup_logging
+from common.latest import open_latest_readings
+from common.plantstatus import PlantStatusEvaluator, issue_codes, parse_species, status_face
+from common.statestore import open_state_store
+from ingest import (
+    BINARY_CONTENT_TYPE,
+    BatchError,
+    WriteBehindBuffer,
+    media_type,
+    parse_binary_readings,
+    parse_readings,
+    parse_timestamp,
+    validate_reading,
+)
+from storage import DATA_ERRORS, SensorStore
+
+# 구조화 로그 (JSON lines). 로그 쓰기는 백그라운드 스레드에서 처리되어 이벤트 루프를 막지 않음
+# LOG_SAMPLE_RATES: event별 샘플링 비율 (예: "sensor_data=100" -> 100건 중 1건만 기록)
+LOG_PATH = os.environ.get("LOG_PATH", "logs/server.jsonl")
+LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", "sensor_data=100"))
+
+# 멀티 worker면 worker마다 다른 파일에 씀 (RotatingFileHandler는 프로세스 간에 안전하지 않음)
+# HTTP_WORKER_ID는 _run_workers가 worker를 spawn할 때 넘김: logs/server.jsonl -> logs/server.0.jsonl, ...
+HTTP_WORKER_ID = os.environ.get("HTTP_WORKER_ID")
+if HTTP_WORKER_ID is not None and LOG_PATH:
+    _log_root, _log_ext = os.path.splitext(LOG_PATH)
+    LOG_PATH = f"{_log_root}.{HTTP_WORKER_ID}{_log_ext}"
+
+log = setup_logging("server", LOG_PATH, sample_rates=LOG_SAMPLE_RATES)
+
+# 센서 데이터 저장 파일 (SQLite)
+SENSOR_DB_PATH = os.environ.get("SENSOR_DB_PATH", "sensor_data.db")
+
+# 조회 step을 지정하지 않으면 포인트 수가 이 값 이하가 되는 가장 작은 step 사용
+SENSOR_QUERY_MAX_POINTS = 1000
+SENSOR_QUERY_AUTO_STEPS = (60, 300, 900, 3600, 21600, 86400)
+
+# 마지막 저장값과의 차이가 deadband 이내면 저장하지 않고 개수만 셈 (0이면 끔)
+# heartbeat초가 지나면 변화가 없어도 1건은 저장
+SENSOR_DEADBAND_TEMP = float(os.environ.get("SENSOR_DEADBAND_TEMP", "0.1"))  # °C
+SENSOR_DEADBAND_HUM = float(os.environ.get("SENSOR_DEADBAND_HUM", "0.5"))  # %RH
+SENSOR_HEARTBEAT = float(os.environ.get("SENSOR_HEARTBEAT", "600"))  # seconds
+
+# 이 기간이 지난 원본 reading은 Gorilla 압축 block으로 옮김 (0이면 압축 안 함)
+SENSOR_COMPACT_AFTER_DAYS = float(os.environ.get("SENSOR_COMPACT_AFTER_DAYS", "7"))
+SENSOR_COMPACT_INTERVAL = 3600  # seconds
+
+sensor_store = SensorStore(SENSOR_DB_PATH)
+sensor_deadband = DeadbandFilter(SENSOR_DEADBAND_TEMP, SENSOR_DEADBAND_HUM, SENSOR_HEARTBEAT)
+
+
+def _store_readings(readings: list):
+    """write-behind 버퍼가 flush할 때 호출되는 sink (백그라운드 스레드)"""
+    sensor_store.insert(readings)
+    serials = {r["serial"] for r in readings}
+    log_event(
+        log,
+        "sensor_flush",
+        f"센서 데이터 {len(readings)}건 저장 (디바이스 {len(serials)}대)",
+        count=len(readings),
+        devices=len(serials),
+    )
+
+
+sensor_buffer = WriteBehindBuffer(_store_readings, data_errors=DATA_ERRORS)
+
+
+# compaction을 맡은 프로세스가 잡고 있는 lock 파일 (worker가 여러 개여도 한 프로세스만 압축)
+_compact_lock_fd = None
+
+
+def _hold_compact_lock() -> bool:
+    """
+    SENSOR_DB_PATH.compact.lock을 flock으로 잡았으면 True (이미 잡고 있어도 True)
+
+    잡은 worker가 죽으면 lock이 풀리므로 다음 주기에 다른 worker가 이어서 맡는다.
+    """
+    global _compact_lock_fd
+    if _compact_lock_fd is not None:
+        return True
+    fd = os.open(f"{SENSOR_DB_PATH}.compact.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _compact_lock_fd = fd
+    return True
+
+
+async def _compact_loop():
+    """SENSOR_COMPACT_INTERVAL마다 오래된 원본 reading을 압축 (lock을 잡은 프로세스 하나만)"""
+    while True:
+        before = time.time() - SENSOR_COMPACT_AFTER_DAYS * 86400
+        if not _hold_compact_lock():
+            await asyncio.sleep(SENSOR_COMPACT_INTERVAL)
+            continue
+        try:
+            count = await asyncio.to_thread(sensor_store.compact, before)
+            if count:
+                log_event(log, "sensor_compact", f"센서 데이터 {count}건 압축", count=count)
+        except Exception:
+            log.exception("sensor compact 실패")
+        await asyncio.sleep(SENSOR_COMPACT_INTERVAL)
+
+# LED / Face 상태 저장소. STATE_STORE_URL=tcp://127.0.0.1:9100 이면 statebroker를 통해
+# TCP 서버(src/server_tcp)와 상태를 공유하고, shm:// 이면 같은 호스트의 프로세스끼리
+# mmap 테이블을 공유한다. 비어 있으면 이 프로세스 안에만 저장
+STATE_STORE_URL = os.environ.get("STATE_STORE_URL", "")
+
+# uvicorn worker 수. 2 이상이고 STATE_STORE_URL이 비어 있으면 shm://을 사용
+HTTP_WORKERS = int(os.environ.get("HTTP_WORKERS", "1"))
+
+state_store = open_state_store(STATE_STORE_URL)
+
+# serial별 최신 reading 캐시 (GET /devices/{serial}/sensor/latest). worker가 여러 개면
+# 어느 worker가 받은 reading이든 보이도록 shm://을 사용. TCP 서버에 같은 shm://을 주면 공유됨
+SENSOR_LATEST_URL = os.environ.get("SENSOR_LATEST_URL", "shm://" if HTTP_WORKERS > 1 else "")
+
+# 식물 상태는 reading을 받을 때마다 판단해서 최신 reading 캐시에 같이 저장
+# PLANT_SPECIES: 기본 종과 디바이스별 종 (예: "basil,ESP32-S3-001=lettuce")
+# PLANT_STATUS_FACE=1 이면 상태가 바뀔 때 LCD 표정도 바꿈 (사용자가 설정한 표정을 덮어씀)
+PLANT_SPECIES = os.environ.get("PLANT_SPECIES", "basil")
+PLANT_STATUS_FACE = os.environ.get("PLANT_STATUS_FACE", "0").lower() in ("1", "true", "yes")
+
+plant_status = PlantStatusEvaluator(*parse_species(PLANT_SPECIES))
+sensor_latest = open_latest_readings(SENSOR_LATEST_URL, evaluator=plant_status)
+
+# GET /devices 목록 조회용 인덱스 (마지막 수신 시각, 마지막 센서 시각, LED/표정).
+# 수신 시각은 이 프로세스가 받은 요청 기준이라 worker가 여러 개면 worker마다 다를 수 있음
+DEVICE_ONLINE_WINDOW = float(os.environ.get("DEVICE_ONLINE_WINDOW", "60"))  # seconds
+SENSOR_STALE_AFTER = float(os.environ.get("SENSOR_STALE_AFTER", "900"))  # seconds
+
+device_index = DeviceIndex()
+
+
+async def _apply_status_face(serial: str, face: str):
+    try:
+        await state_store.update(serial, {"face": face})
+    except (ConnectionError, ValueError, RuntimeError) as e:
+        # RuntimeError: shm 상태 테이블이 가득 찼거나 slot이 계속 쓰는 중
+        log.warning("plant status face [%s] 실패: %s", serial, e)
+
+
+def _remember_latest(readings: list):
+    """최신 reading 캐시 갱신. 캐시에 못 넣는 reading(긴 serial 등)이 있어도 수신은 계속함"""
+    for r in readings:
+        serial = r["serial"]
+        try:
+            change = sensor_latest.update(serial, r["timestamp"], r["temperature"], r["humidity"], r["illuminance"])
+        except (ValueError, RuntimeError):
+            continue
+        if change is None:
+            continue
+
+        previous, issues = change
+        status = plant_status.describe(serial, issues)
+        log_event(
+            log,
+            "plant_status",
+            f"[{serial}] 식물 상태 {status['status']} {status['codes']}",
+            serial=serial,
+            species=status["species"],
+            status=status["status"],
+            issues=status["codes"],
+            previous=issue_codes(previous) if previous is not None else None,
+        )
+        if PLANT_STATUS_FACE:
+            asyncio.create_task(_apply_status_face(serial, status_face(issues)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await state_store.start()
+    for serial, state in state_store.items():
+        device_index.set_state(serial, state["is_led_on"], state["face"])
+    sensor_buffer.start()
+    compact_task = asyncio.create_task(_compact_loop()) if SENSOR_COMPACT_AFTER_DAYS > 0 else None
+    yield
+    if compact_task is not None:
+        compact_task.cancel()
+    await sensor_buffer.stop()
+    await state_store.stop()
+
+
+app = FastAPI(title="Citonphyde Sensor Server", version="1.0.0", lifespan=lifespan)
+
+# Long-poll / SSE 설정 (초)
+LONG_POLL_TIMEOUT = 25.0
+LONG_POLL_MAX_TIMEOUT = 120.0
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+# 상태 변경을 기다리는 long-poll / SSE 요청 (serial -> set of Future)
+device_waiters = {}
+
+# GET /devices/{serial}/{led,lcd,state} 응답 캐시 ((serial, kind) -> (version, etag, body bytes))
+# PATCH 시 무효화하고, 다른 worker의 변경은 조회 때 version 비교로 걸러냄
+device_response_cache = {}
+
+# 상태가 설정되지 않은 디바이스는 모두 같은 /state 응답을 공유
+DEFAULT_STATE_ETAG = '"0"'
+DEFAULT_STATE_BODY = json.dumps(
+    {"version": 0, "is_led_on": False, "face": "NEUTRAL"}, separators=(",", ":")
+).encode()
+
+# /led, /lcd 기본값 응답은 updated_at이 조회 시각이라 캐시하지 않고 뒷부분만 붙임
+DEFAULT_BODY_PREFIX = {
+    "led": b'{"is_led_on":false,"updated_at":"',
+    "lcd": b'{"face":"NEUTRAL","updated_at":"',
+}
+
+# 미들웨어(DevicePollFastPath)가 FastAPI 라우팅/검증 없이 바로 응답하는 polling 엔드포인트
+# HTTP_FAST_PATH=0 이면 끄고 일반 라우트로 처리 (비교 측정용)
+HTTP_FAST_PATH = os.environ.get("HTTP_FAST_PATH", "1").lower() not in ("0", "false", "no")
+FAST_PATH_KINDS = ("led", "lcd", "state")
+
+
+def _device_snapshot(serial: str) -> dict:
+    """LED + LCD 상태를 버전과 함께 하나의 dict로 반환"""
+    state = state_store.get(serial)
+    return {
+        "serial": serial,
+        "version": state["version"],
+        "is_led_on": state["is_led_on"],
+        "face": state["face"],
+    }
+
 
-# LED 상태 저장 (serial별로 관리)
-led_states = {}
+def _cached_response(serial: str, kind: str) -> tuple:
+    """/led, /lcd, /state 응답용 (ETag, 직렬화된 body)를 반환. 다음 PATCH 전까지 재사용"""
+    version = state_store.version(serial)
+    cached = device_response_cache.get((serial, kind))
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+    if version == 0:
+        if kind == "state":
+            return DEFAULT_STATE_ETAG, DEFAULT_STATE_BODY
+        return None, DEFAULT_BODY_PREFIX[kind] + datetime.now().isoformat().encode() + b'"}'
+
+    state = state_store.get(serial)
+    if kind == "led":
+        payload = {"is_led_on": state["is_led_on"], "updated_at": state["updated_at"]}
+    elif kind == "lcd":
+        payload = {"face": state["face"], "updated_at": state["updated_at"]}
+    else:
+        payload = {"version": state["version"], "is_led_on": state["is_led_on"], "face": state["face"]}
+    # 저장소 재시작 후 버전이 0부터 다시 시작해도 ETag가 겹치지 않도록 epoch를 붙임
+    etag = f'"{state_store.epoch}-{state["version"]}"'
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    device_response_cache[(serial, kind)] = (state["version"], etag, body)
+    return etag, body
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 헤더 (여러 개/weak 태그 포함)와 ETag 비교"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class DevicePollFastPath:
+    """
+    디바이스가 1~2초마다 polling하는 GET /devices/{serial}/{led,lcd,state}를
+    FastAPI 라우팅, 파라미터 검증, JSON 직렬화 없이 캐시된 bytes로 바로 응답하는 ASGI 미들웨어
 
-# Face Emotion 상태 저장 (serial별로 관리)
-face_emotion_states = {}
+    응답 내용은 아래 라우트 함수와 같다 (_cached_response 공유). 그 외 요청은 그대로 넘긴다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET":
+            parts = scope["path"].split("/")
+            if len(parts) == 4 and parts[1] == "devices" and parts[2] and parts[3] in FAST_PATH_KINDS:
+                await self._respond(scope, send, parts[2], parts[3])
+                return
+        await self.app(scope, receive, send)
+
+    async def _respond(self, scope, send, serial: str, kind: str):
+        device_index.seen(serial, time.time())
+        etag, body = _cached_response(serial, kind)
+        headers = [(b"content-type", b"application/json")]
+        status = 200
+        if kind == "state":
+            headers += [(b"etag", etag.encode()), (b"cache-control", b"no-cache")]
+            for name, value in scope["headers"]:
+                if name == b"if-none-match" and _etag_matches(value.decode("latin-1"), etag):
+                    status, body = 304, b""
+                    break
+        if status == 200:
+            headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+if HTTP_FAST_PATH:
+    app.add_middleware(DevicePollFastPath)
+
+
+def _on_state_changed(serial: str, state: dict, changed: dict):
+    """상태 저장소 변경 콜백 (다른 프로세스의 변경 포함). 캐시를 비우고 대기 중인 요청을 깨움"""
+    for kind in FAST_PATH_KINDS:
+        device_response_cache.pop((serial, kind), None)
+    device_index.set_state(serial, state["is_led_on"], state["face"])
+    for waiter in device_waiters.pop(serial, ()):
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+async def _wait_for_change(serial: str, timeout: float) -> bool:
+    """serial 상태가 바뀔 때까지 대기. 타임아웃이면 False"""
+    waiter = asyncio.get_running_loop().create_future()
+    waiters = device_waiters.setdefault(serial, set())
+    waiters.add(waiter)
+    try:
+        await asyncio.wait_for(waiter, timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        waiters.discard(waiter)
+        if not waiters and device_waiters.get(serial) is waiters:
+            del device_waiters[serial]
+
+
+state_store.subscribe(_on_state_changed)
 
 
 @app.get("/")
@@ -21,86 +363,313 @@ async def root():
         "status": "running",
         "endpoints": {
             "POST /sensor_data": "Send sensor data (temperature, humidity, serial, illuminance)",
+            "POST /sensor_data/batch": "Send many readings (JSON array or NDJSON)",
             "GET /health": "Health check",
+            "GET /devices": "List devices (online, stale_sensor, is_led_on, face, cursor)",
             "GET /devices/:serial/led": "Get LED state",
             "GET /devices/:serial/lcd": "Get LCD face emotion state",
-            "PATCH /devices/:serial": "Update device (is_led_on, led_face)",
+            "GET /devices/:serial/sensor_data": "Query sensor history (from, to, step)",
+            "GET /devices/:serial/sensor/latest": "Get latest sensor reading (from memory)",
+            "GET /devices/:serial/state": "Get LED + LCD state (ETag / If-None-Match)",
+            "GET /devices/:serial/poll": "Long-poll LED/LCD state (since=version)",
+            "GET /devices/:serial/events": "Stream LED/LCD state (Server-Sent Events)",
+            "PATCH /devices/:serial": "Update device (is_led_on, face) - form or JSON",
         },
     }
 
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "sensor_ingest": sensor_deadband.stats(),
+    }
+
+
+async def _read_body_fields(request: Request) -> dict:
+    """
+    요청 body를 Content-Type에 따라 dict로 읽음
+
+    - application/json: JSON object (값의 타입은 그대로)
+    - application/x-www-form-urlencoded (Content-Type이 없을 때도): 값은 모두 문자열
+    - multipart/form-data: 값은 문자열
+    """
+    content_type = media_type(request.headers.get("content-type", ""))
+    if content_type == "application/json":
+        try:
+            fields = json.loads(await request.body())
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=f"invalid JSON body: {e}")
+        if not isinstance(fields, dict):
+            raise HTTPException(status_code=400, detail="body must be a JSON object")
+        return fields
+    if content_type == "multipart/form-data":
+        return dict(await request.form())
+    if content_type not in ("", "application/x-www-form-urlencoded"):
+        raise HTTPException(status_code=415, detail=f"unsupported content type: {content_type}")
+    try:
+        return dict(parse_qsl((await request.body()).decode(), keep_blank_values=True))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="form body must be UTF-8")
+
+
+def _accept_reading(reading: dict):
+    """단건 reading을 캐시/인덱스에 반영하고, deadband를 넘으면 저장 버퍼에 넣음"""
+    serial = reading["serial"]
+    _remember_latest([reading])
+    # 인덱스는 시각 순서로 넣어야 하므로 reading timestamp가 아니라 서버 수신 시각 (batch, TCP 서버와 같음)
+    device_index.sensor(serial, time.time())
+    # 직전 저장값과 deadband 이내면 저장/로그 없이 개수만 셈
+    if sensor_deadband.offer(serial, reading["timestamp"], reading["temperature"], reading["humidity"]):
+        # 로그 기록 (샘플링 적용, 큐에 넣기만 하고 바로 반환)
+        log_event(
+            log,
+            "sensor_data",
+            serial=serial,
+            temperature=reading["temperature"],
+            humidity=reading["humidity"],
+            illuminance=reading["illuminance"],
+        )
+        if not sensor_buffer.add([reading]):
+            # 재전송된 같은 값이 deadband에 걸려 버려지지 않도록 기준값을 지움
+            sensor_deadband.forget(serial)
+            raise HTTPException(status_code=503, detail="Sensor buffer full, retry later")
 
 
 @app.post("/sensor_data")
-async def receive_sensor_data(
-    serial: str = Form(...),
-    temperature: float = Form(...),
-    humidity: float = Form(...),
-    illuminance: str = Form("0"),
-):
+async def receive_sensor_data(request: Request):
     """
     SHT31 센서 데이터를 받는 엔드포인트
 
-    Firmware에서 form-urlencoded 형식으로 전송:
+    Content-Type에 따라 body를 해석한다.
+
+    - application/x-www-form-urlencoded (Firmware 기본값)
+      serial=ESP32-S3-001&temperature=25.5&humidity=60.0&illuminance=0
+    - application/json
+      {"serial": "ESP32-S3-001", "temperature": 25.5, "humidity": 60.0, "illuminance": 0}
+    - application/vnd.citonphyde.reading (바이너리 reading 1건, 형식은 ingest.py)
+      응답 body 없이 204를 반환한다 (디바이스가 응답을 파싱하지 않아도 됨)
+
+    필드:
     - serial: 디바이스 ID (필수)
     - temperature: 온도 (필수)
     - humidity: 습도 (필수)
     - illuminance: 조도 (선택, 기본값: "0")
+    - timestamp: 측정 시각 (선택, epoch 초 또는 ISO 8601, 기본값: 수신 시각)
 
-    Request Body (application/x-www-form-urlencoded):
-    serial=ESP32-S3-001&temperature=25.5&humidity=60.0&illuminance=0
+    값이 잘못되면 422, body를 해석할 수 없으면 400.
     """
-    timestamp = datetime.now().isoformat()
-
-    # 로그 출력
-    print("=" * 50)
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 센서 데이터 수신")
-    print(f"  Serial/Device ID: {serial}")
-    print(f"  온도: {temperature:.2f} °C")
-    print(f"  습도: {humidity:.2f} %")
-    print(f"  조도: {illuminance}")
-    print(f"  Timestamp: {timestamp}")
-    print("=" * 50)
+    received_at = time.time()
+    if media_type(request.headers.get("content-type", "")) == BINARY_CONTENT_TYPE:
+        try:
+            readings, rejected = parse_binary_readings(await request.body(), received_at)
+        except BatchError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if rejected:
+            raise HTTPException(status_code=422, detail=rejected[0]["error"])
+        if len(readings) != 1:
+            raise HTTPException(status_code=400, detail="expected one reading (use /sensor_data/batch)")
+        _accept_reading(readings[0])
+        return Response(status_code=204)
+
+    fields = await _read_body_fields(request)
+    try:
+        reading = validate_reading(fields, received_at)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    _accept_reading(reading)
 
     # 응답 반환
     return {
         "status": "success",
         "message": "Sensor data received",
         "received_data": {
-            "serial": serial,
-            "temperature": temperature,
-            "humidity": humidity,
-            "illuminance": illuminance,
-            "timestamp": timestamp,
+            "serial": reading["serial"],
+            "temperature": reading["temperature"],
+            "humidity": reading["humidity"],
+            "illuminance": reading["illuminance"],
+            "timestamp": datetime.now().isoformat(),
         },
     }
 
 
-@app.get("/devices/{serial}/led")
-async def get_led_state(serial: str = Path(..., description="Device serial ID")):
+@app.post("/sensor_data/batch")
+async def receive_sensor_data_batch(request: Request):
     """
-    LED 상태를 조회하는 엔드포인트
+    여러 센서 데이터를 한 번에 받는 엔드포인트 (게이트웨이 / 버퍼링 업로드용)
+
+    Request Body:
+    - application/json: reading 객체의 JSON 배열
+    - application/x-ndjson: 한 줄에 reading 객체 하나
+
+    reading 필드: serial, temperature, humidity (필수), illuminance, timestamp (선택)
+    timestamp는 epoch 초 또는 ISO 8601 문자열이며, 없으면 서버 수신 시각을 사용한다.
+
+    유효한 reading만 저장하고, 잘못된 reading은 index와 사유를 rejected로 돌려준다.
+    유효하지만 직전 저장값과 deadband 이내라 저장하지 않은 reading 수는 suppressed로 알려준다.
+    """
+    body = await request.body()
+    try:
+        readings, rejected = parse_readings(body, request.headers.get("content-type", ""))
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    _remember_latest(readings)
+    now = time.time()
+    for serial in {r["serial"] for r in readings}:
+        device_index.sensor(serial, now)
+    stored = sensor_deadband.filter(readings)
+    if stored and not sensor_buffer.add(stored):
+        for serial in {r["serial"] for r in stored}:
+            sensor_deadband.forget(serial)
+        raise HTTPException(status_code=503, detail="Sensor buffer full, retry later")
+
+    return {
+        "status": "success" if not rejected else "partial",
+        "accepted": len(readings),
+        "suppressed": len(readings) - len(stored),
+        "rejected": rejected,
+    }
+
+
+@app.get("/devices")
+async def list_devices(
+    online: Optional[bool] = Query(None, description="최근 DEVICE_ONLINE_WINDOW초 안에 요청을 보낸 디바이스"),
+    stale_sensor: Optional[bool] = Query(None, description="센서 reading이 stale_after초 넘게 없는 디바이스"),
+    is_led_on: Optional[bool] = Query(None, description="LED 상태"),
+    face: Optional[str] = Query(None, description="LCD 표정 (예: HAPPY)"),
+    stale_after: float = Query(SENSOR_STALE_AFTER, gt=0, description="stale_sensor 기준 (초)"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT, description="최대 개수"),
+):
+    """
+    디바이스 목록 조회 엔드포인트 (fleet 대시보드 / 운영용)
+
+    필터는 모두 AND로 적용되며, 메모리 인덱스(common/deviceindex.py)에서 찾으므로
+    디바이스 수가 많아도 전체를 훑지 않는다. serial 순서로 정렬되며,
+    next_cursor가 null이 아니면 cursor로 넘겨서 다음 페이지를 받는다.
+
+    Query Parameters:
+    - online: true면 접속 중, false면 DEVICE_ONLINE_WINDOW초 넘게 요청이 없는 디바이스
+    - stale_sensor: true면 센서 reading이 stale_after초 넘게 없거나 한 번도 없는 디바이스
+    - is_led_on, face: 현재 LED / 표정 상태
+    - cursor, limit: 페이지 (limit 최대 1000)
+
+    서버가 재시작 이후 받은 요청과 상태 저장소에 있는 디바이스만 나온다.
+    """
+    now = time.time()
+    serials, next_cursor = device_index.find(
+        now,
+        online=online,
+        stale_sensor=stale_sensor,
+        is_led_on=is_led_on,
+        face=face,
+        cursor=cursor,
+        limit=limit,
+        online_window=DEVICE_ONLINE_WINDOW,
+        stale_after=stale_after,
+    )
+    return {
+        "devices": [device_index.describe(serial, now, DEVICE_ONLINE_WINDOW) for serial in serials],
+        "next_cursor": next_cursor,
+        "total": len(device_index),
+    }
+
+
+@app.get("/devices/{serial}/sensor_data")
+async def query_sensor_data(
+    serial: str = Path(..., description="Device serial ID"),
+    from_: Optional[str] = Query(None, alias="from", description="시작 시각 (epoch 초 또는 ISO 8601)"),
+    to: Optional[str] = Query(None, description="끝 시각 (epoch 초 또는 ISO 8601)"),
+    step: Optional[int] = Query(None, ge=1, description="bucket 크기 (초)"),
+):
+    """
+    저장된 센서 데이터를 step 단위 min/avg/max로 조회하는 엔드포인트
+
+    step이 3600의 배수면 1시간 rollup, 60의 배수면 1분 rollup, 그 외에는 원본에서 계산한다.
+    bucket은 epoch 기준 step 경계에 정렬된다.
 
     Path Parameters:
     - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
+
+    Query Parameters:
+    - from: 시작 시각 (기본값: to - 24시간)
+    - to: 끝 시각 (기본값: 현재)
+    - step: bucket 크기 (초, 기본값: 포인트가 1000개 이하가 되는 값)
+    """
+    try:
+        end = parse_timestamp(to, time.time())
+        start = parse_timestamp(from_, end - 86400)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid time: {e}")
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be earlier than to")
+
+    if step is None:
+        span = end - start
+        step = next(
+            (s for s in SENSOR_QUERY_AUTO_STEPS if span / s <= SENSOR_QUERY_MAX_POINTS),
+            SENSOR_QUERY_AUTO_STEPS[-1],
+        )
+    elif (end - start) / step > 100 * SENSOR_QUERY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail="too many points, increase step")
+
+    tier, points = await asyncio.to_thread(sensor_store.query, serial, start, end, step)
+    return {
+        "serial": serial,
+        "from": start,
+        "to": end,
+        "step": step,
+        "tier": tier,
+        "points": points,
+    }
+
+
+@app.get("/devices/{serial}/sensor/latest")
+async def get_latest_sensor_data(serial: str = Path(..., description="Device serial ID")):
     """
-    # LED 상태가 설정되지 않았으면 기본값(off) 반환
-    if serial not in led_states:
-        return {
-            "is_led_on": False,  # 기본값: 꺼짐
-            "updated_at": datetime.now().isoformat(),
-        }
+    디바이스가 마지막으로 보낸 센서 데이터를 메모리 캐시에서 조회하는 엔드포인트
 
-    state = led_states[serial]
+    DB를 거치지 않으므로 음성 비서가 대화 중에 온습도를 물어볼 때 사용한다.
+    deadband로 저장하지 않은 reading도 반영되어 있다.
+    plant_status는 reading을 받을 때 판단해 둔 식물 상태다 (hysteresis 적용).
+
+    Path Parameters:
+    - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
+
+    Response:
+    - age: 마지막 reading 이후 지난 시간 (초). 값이 크면 디바이스가 꺼져 있을 수 있음
+    - 받은 reading이 없으면 (서버 재시작 직후 포함) 404
+    """
+    reading = sensor_latest.get(serial)
+    if reading is None:
+        raise HTTPException(status_code=404, detail="No sensor data for this device")
     return {
-        "is_led_on": state["is_led_on"],
-        "updated_at": state["updated_at"],
+        "serial": serial,
+        "temperature": reading["temperature"],
+        "humidity": reading["humidity"],
+        "illuminance": reading["illuminance"],
+        "timestamp": reading["timestamp"],
+        "age": round(max(time.time() - reading["timestamp"], 0.0), 3),
+        "plant_status": plant_status.describe(serial, reading["issues"], reading["status_since"]),
     }
 
 
+@app.get("/devices/{serial}/led")
+async def get_led_state(serial: str = Path(..., description="Device serial ID")):
+    """
+    LED 상태를 조회하는 엔드포인트
+
+    Path Parameters:
+    - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
+    """
+    # 상태가 설정되지 않았으면 기본값(off) 반환. 보통은 DevicePollFastPath가 먼저 응답함
+    device_index.seen(serial, time.time())
+    _, body = _cached_response(serial, "led")
+    return Response(content=body, media_type="application/json")
+
+
 @app.get("/devices/{serial}/lcd")
 async def get_lcd_state(serial: str = Path(..., description="Device serial ID")):
     """
@@ -109,63 +678,168 @@ async def get_lcd_state(serial: str = Path(..., description="Device serial ID"))
     Path Parameters:
     - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
     """
-    # Face Emotion 상태가 설정되지 않았으면 기본값("NEUTRAL") 반환
-    if serial not in face_emotion_states:
-        return {
-            "face": "NEUTRAL",  # 기본값
-            "updated_at": datetime.now().isoformat(),
-        }
+    # 상태가 설정되지 않았으면 기본값("NEUTRAL") 반환. 보통은 DevicePollFastPath가 먼저 응답함
+    device_index.seen(serial, time.time())
+    _, body = _cached_response(serial, "lcd")
+    return Response(content=body, media_type="application/json")
 
-    state = face_emotion_states[serial]
-    return {
-        "face": state["face"],
-        "updated_at": state["updated_at"],
-    }
 
+@app.get("/devices/{serial}/state")
+async def get_device_state(
+    request: Request, serial: str = Path(..., description="Device serial ID")
+):
+    """
+    LED + LCD 상태를 한 번에 조회하는 엔드포인트
+
+    응답 body는 PATCH 전까지 캐시된 bytes를 그대로 보내고, ETag로 버전을 알려준다.
+    If-None-Match가 현재 ETag와 같으면 body 없이 304를 반환한다.
 
-@app.patch("/devices/{serial}")
-async def update_device(
+    Path Parameters:
+    - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
+    """
+    device_index.seen(serial, time.time())
+    etag, body = _cached_response(serial, "state")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/devices/{serial}/poll")
+async def long_poll_device_state(
     serial: str = Path(..., description="Device serial ID"),
-    is_led_on: Optional[str] = Form(None),
-    led_face: Optional[str] = Form(None),
+    since: int = Query(0, ge=0, description="마지막으로 받은 version"),
+    timeout: float = Query(
+        LONG_POLL_TIMEOUT, gt=0, le=LONG_POLL_MAX_TIMEOUT, description="최대 대기 시간(초)"
+    ),
+):
+    """
+    LED/LCD 상태 long-poll 엔드포인트
+
+    현재 version이 since보다 크면 즉시 응답하고, 아니면 PATCH로 상태가
+    바뀌거나 timeout이 될 때까지 요청을 잡아둔다.
+    타임아웃 시 204 (No Content)를 반환하므로 같은 since로 다시 요청하면 된다.
+
+    Path Parameters:
+    - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
+
+    Query Parameters:
+    - since: 마지막으로 받은 version (처음엔 0)
+    - timeout: 최대 대기 시간 (초, 기본값 25)
+    """
+    device_index.seen(serial, time.time())
+    version = state_store.version(serial)
+    # since > version 이면 서버 재시작 등으로 버전이 초기화된 것이므로 바로 동기화
+    if version == since:
+        if not await _wait_for_change(serial, timeout):
+            return Response(status_code=204)
+    return _device_snapshot(serial)
+
+
+@app.get("/devices/{serial}/events")
+async def stream_device_state(
+    request: Request, serial: str = Path(..., description="Device serial ID")
 ):
+    """
+    LED/LCD 상태 SSE (Server-Sent Events) 엔드포인트
+
+    연결 직후 현재 상태를 한 번 보내고, 이후 PATCH로 상태가 바뀔 때마다
+    `event: state` 이벤트를 push한다. 이벤트 id는 version이며,
+    재접속 시 Last-Event-ID 헤더를 보내면 그 이후 변경분만 받는다.
+
+    Path Parameters:
+    - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    sent_version = int(last_event_id) if last_event_id.isdigit() else -1
+
+    async def event_stream():
+        nonlocal sent_version
+        while True:
+            # SSE 연결이 살아 있는 동안은 online으로 봄
+            device_index.seen(serial, time.time())
+            snapshot = _device_snapshot(serial)
+            if snapshot["version"] != sent_version:
+                sent_version = snapshot["version"]
+                data = json.dumps(snapshot, separators=(",", ":"))
+                yield f"id: {sent_version}\nevent: state\ndata: {data}\n\n"
+
+            changed = await _wait_for_change(serial, SSE_KEEPALIVE_INTERVAL)
+            if await request.is_disconnected():
+                break
+            if not changed:
+                # 프록시가 idle 연결을 끊지 않도록 주석 라인 전송
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# PATCH /devices/{serial}에서 받는 필드. led_face는 face의 예전 이름
+DEVICE_UPDATE_FIELDS = ("is_led_on", "face", "led_face")
+
+
+@app.patch("/devices/{serial}")
+async def update_device(request: Request, serial: str = Path(..., description="Device serial ID")):
     """
     디바이스 상태를 업데이트하는 엔드포인트
 
     Path Parameters:
     - serial: 디바이스 시리얼 ID (예: "xJN2wsF850yqWQfBUkGP")
 
-    Form Data:
-    - is_led_on: LED 상태 ("true" 또는 "false", 선택사항)
-    - led_face: Face Emotion 상태 (예: "HAPPY", "SAD", "NEUTRAL", 선택사항)
+    Body (application/x-www-form-urlencoded 또는 application/json):
+    - is_led_on: LED 상태 (form: "true" / "false", JSON: true / false, 선택사항)
+    - face: Face Emotion 상태 (예: "HAPPY", "SAD", "NEUTRAL", 선택사항). led_face도 같은 의미
+
+    모르는 필드가 있으면 무시하지 않고 400을 반환한다.
     """
+    fields = await _read_body_fields(request)
+    unknown = sorted(set(fields) - set(DEVICE_UPDATE_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"unknown field: {', '.join(unknown)} (allowed: is_led_on, face, led_face)",
+        )
+    if "face" in fields and "led_face" in fields:
+        raise HTTPException(status_code=400, detail="use either face or led_face")
+
+    is_led_on = fields.get("is_led_on")
+    face = fields.get("face", fields.get("led_face"))
+    if isinstance(is_led_on, str):
+        is_led_on = is_led_on.lower() in ("true", "1", "on", "yes")
+    elif is_led_on is not None and not isinstance(is_led_on, bool):
+        raise HTTPException(status_code=422, detail="is_led_on must be a boolean")
+    if face is not None and (not isinstance(face, str) or not face):
+        raise HTTPException(status_code=422, detail="face must be a non-empty string")
+
     updated_fields = []
+    changes = {}
 
     # LED 상태 업데이트
     if is_led_on is not None:
-        led_on_bool = is_led_on.lower() in ("true", "1", "on", "yes")
-        led_states[serial] = {
-            "is_led_on": led_on_bool,
-            "updated_at": datetime.now().isoformat(),
-        }
-        updated_fields.append(f"LED: {'ON' if led_on_bool else 'OFF'}")
+        changes["is_led_on"] = is_led_on
+        updated_fields.append(f"LED: {'ON' if is_led_on else 'OFF'}")
 
     # Face Emotion 상태 업데이트
-    if led_face is not None:
-        face_emotion_states[serial] = {
-            "face": led_face,
-            "updated_at": datetime.now().isoformat(),
-        }
-        updated_fields.append(f"Face: {led_face}")
-
-    # 로그 출력
-    if updated_fields:
-        print("=" * 50)
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 디바이스 상태 업데이트")
-        print(f"  Serial: {serial}")
-        for field in updated_fields:
-            print(f"  {field}")
-        print("=" * 50)
+    if face is not None:
+        changes["face"] = face
+        updated_fields.append(f"Face: {face}")
+
+    # 저장소에 반영 (long-poll/SSE 대기자와 TCP 디바이스로의 push는 변경 콜백에서 처리)
+    if changes:
+        try:
+            await state_store.update(serial, changes)
+        except (ConnectionError, RuntimeError) as e:
+            # RuntimeError: shm 상태 테이블이 가득 찼거나 slot이 계속 쓰는 중
+            raise HTTPException(status_code=503, detail=f"State store unavailable: {e}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        log_event(log, "device_update", serial=serial, changes=updated_fields)
 
     return {
         "status": "success",
@@ -175,8 +849,51 @@ async def update_device(
     }
 
 
+def _serve_worker(sock: socket.socket):
+    """worker 프로세스 진입점 (spawn으로 이 모듈을 새로 import한 뒤 호출됨)"""
+    uvicorn.Server(uvicorn.Config(app, access_log=False)).run(sockets=[sock])
+
+
+def _run_workers(host: str, port: int, workers: int):
+    """리스닝 소켓 하나를 worker 프로세스 여러 개가 나눠서 accept"""
+    # uvicorn --workers가 만드는 소켓은 proto=0이라 asyncio가 accept한 연결에
+    # TCP_NODELAY를 켜지 않아 응답마다 Nagle + delayed ACK로 40ms씩 늦어진다.
+    # 직접 만든 소켓에 켜 두면 accept된 연결에 상속됨
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+
+    context = multiprocessing.get_context("spawn")
+    procs = [context.Process(target=_serve_worker, args=(sock,)) for _ in range(workers)]
+    # spawn한 worker는 시작 시점의 환경 변수를 물려받음 (worker별 로그 파일)
+    for worker_id, proc in enumerate(procs):
+        os.environ["HTTP_WORKER_ID"] = str(worker_id)
+        proc.start()
+    del os.environ["HTTP_WORKER_ID"]
+
+    def terminate(signum, frame):
+        for proc in procs:
+            proc.terminate()
+
+    signal.signal(signal.SIGTERM, terminate)
+    for proc in procs:
+        try:
+            proc.join()
+        except KeyboardInterrupt:
+            # Ctrl+C는 worker에도 전달되므로 각자 종료할 때까지 기다림
+            proc.join()
+
+
 if __name__ == "__main__":
     print("Starting Citonphyde Sensor Server...")
     print("Server will be available at http://localhost:8000")
     print("API docs available at http://localhost:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # 요청마다 동기 출력되는 uvicorn access log는 끔 (요청 로그는 log_event로 기록)
+    if HTTP_WORKERS > 1:
+        # worker는 이 모듈을 다시 import하므로 환경 변수로 공유 메모리 저장소를 넘김
+        os.environ["STATE_STORE_URL"] = STATE_STORE_URL or "shm://"
+        print(f"Workers: {HTTP_WORKERS} (state store: {os.environ['STATE_STORE_URL']})")
+        _run_workers("0.0.0.0", 8000, HTTP_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, access_log=False)
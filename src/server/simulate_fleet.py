@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+HTTP 펌웨어(src/firmware) fleet 시뮬레이터 - 서버 한 대가 디바이스 몇 대를 감당하는지 측정
+사용법: python simulate_fleet.py [max_devices] [step_duration] [server_url] [server_pid] [processes]
+예시: python main.py &
+      python simulate_fleet.py 3200 20 http://localhost:8000 $!
+
+디바이스 한 대는 펌웨어 loop()처럼 요청을 하나씩 순서대로 보낸다.
+    - GET /devices/{serial}/led: 1초마다 (LED_CHECK_INTERVAL_MS)
+    - GET /devices/{serial}/lcd: 2초마다 (FACE_EMOTION_CHECK_INTERVAL_MS)
+    - POST /sensor_data: 30초마다 (SENSOR_UPLOAD_INTERVAL_MS), form 필드는 test_client.sensor_payload
+부팅 시각은 디바이스마다 다르고(각 주기 안에서 무작위), loop 한 바퀴마다 0~20ms 지연이 더해진다.
+ESP32 HTTPClient처럼 요청마다 새 TCP 연결을 맺고 끊는다.
+서버가 느려지면 디바이스의 요청도 밀리므로 (loop가 블로킹), 실제 요청률이 기대값보다 떨어진다.
+
+디바이스 수를 25대부터 두 배씩 늘리며 단계마다 step_duration초 측정하고 다음을 출력한다.
+    - 엔드포인트별 요청률, 지연 p50 / p95 / p99
+    - 포화 여부: 실제 요청률이 기대값의 95% 미만이거나, 오류가 1% 이상이거나, LED polling p99가 1초(polling 주기)를 넘으면 포화
+    - server_pid를 주면 서버 CPU 사용률과 CPU 1코어당 디바이스 수 (디바이스 수 / 서버가 쓴 코어 수)
+      CPU는 server_pid와 자식 프로세스를 합산하므로 HTTP_WORKERS > 1이어도 worker 전체가 들어감
+포화되면 두 배씩 늘리기를 멈추고, 버틴 단계와 포화된 단계 사이를 이분 탐색으로 두 번 더 측정한 뒤
+마지막으로 버틴 단계를 결과로 출력한다.
+
+processes: 시뮬레이터 프로세스 수 (기본 1). 시뮬레이터 자체가 CPU를 많이 쓰면 늘린다.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time
+from urllib.parse import urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_client import poll_path, sensor_payload
+
+# 펌웨어(firmware.ino) 주기 (초)
+LED_INTERVAL = 1.0
+LCD_INTERVAL = 2.0
+UPLOAD_INTERVAL = 30.0
+LOOP_JITTER = 0.02
+
+REQUEST_TIMEOUT = 5.0  # HTTPClient 기본 타임아웃
+WARMUP = 3.0  # 단계 시작 후 측정 전 대기 (초)
+START_DEVICES = 25
+REFINE_STEPS = 2  # 포화 후 이분 탐색 횟수
+
+EXPECTED_RATE = 1 / LED_INTERVAL + 1 / LCD_INTERVAL + 1 / UPLOAD_INTERVAL  # 디바이스당 req/s
+MIN_RATE_RATIO = 0.95
+MAX_ERROR_RATIO = 0.01
+MAX_LED_P99 = LED_INTERVAL
+
+ENDPOINTS = ("led", "lcd", "sensor_data")
+
+
+def server_cpu_seconds(pid):
+    """pid와 그 자손 프로세스(HTTP_WORKERS > 1이면 spawn된 worker)의 CPU 시간 합 (초)"""
+    # pid -> (ppid, utime + stime clock tick)
+    procs = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue  # 그 사이 종료된 프로세스
+        procs[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]))
+
+    ticks = 0
+    tree = [pid]
+    while tree:
+        current = tree.pop()
+        ticks += procs.get(current, (0, 0))[1]
+        tree.extend(child for child, (ppid, _) in procs.items() if ppid == current)
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+async def http_request(host, port, method, path, body=b""):
+    """요청 하나를 새 연결로 보내고 status 반환"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n"
+        if body:
+            head += f"Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+        status_line = await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+        await reader.readexactly(length)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def device(serial, host, port, stats, measure_from, stop_at):
+    """디바이스 한 대의 loop (요청은 하나씩 순서대로)"""
+    rng = random.Random(serial)
+    now = time.monotonic()
+    due = {
+        "led": now + rng.uniform(0, LED_INTERVAL),
+        "lcd": now + rng.uniform(0, LCD_INTERVAL),
+        "sensor_data": now + rng.uniform(0, UPLOAD_INTERVAL),
+    }
+    temperature = rng.uniform(21.0, 25.0)
+    humidity = rng.uniform(45.0, 65.0)
+
+    while True:
+        endpoint = min(due, key=due.get)
+        wait = due[endpoint] - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait + rng.uniform(0, LOOP_JITTER))
+        start = time.monotonic()
+        if start >= stop_at:
+            return
+        if endpoint == "sensor_data":
+            # 업로드는 esp_timer 주기로 예약됨 (밀려도 다음 예약 시각은 그대로)
+            due[endpoint] += UPLOAD_INTERVAL
+            temperature += rng.gauss(0, 0.05)
+            humidity += rng.gauss(0, 0.2)
+            body = urlencode(sensor_payload(serial, temperature, humidity)).encode()
+            request = http_request(host, port, "POST", "/sensor_data", body)
+        else:
+            # polling은 요청 전에 마지막 확인 시각을 갱신 (요청이 느리면 다음 요청도 밀림)
+            due[endpoint] = start + (LED_INTERVAL if endpoint == "led" else LCD_INTERVAL)
+            request = http_request(host, port, "GET", poll_path(serial, endpoint))
+        try:
+            status = await asyncio.wait_for(request, REQUEST_TIMEOUT)
+            ok = status == 200
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            ok = False
+        end = time.monotonic()
+
+        if start >= measure_from and end <= stop_at:
+            latencies, errors = stats[endpoint]
+            if ok:
+                latencies.append(end - start)
+            else:
+                errors[0] += 1
+
+
+async def run_devices(serials, host, port, duration):
+    stats = {endpoint: ([], [0]) for endpoint in ENDPOINTS}
+    now = time.monotonic()
+    await asyncio.gather(*(
+        device(serial, host, port, stats, now + WARMUP, now + WARMUP + duration)
+        for serial in serials
+    ))
+    return {endpoint: (latencies, errors[0]) for endpoint, (latencies, errors) in stats.items()}
+
+
+def worker(serials, server_url, duration, results):
+    url = urlparse(server_url)
+    results.put(asyncio.run(run_devices(serials, url.hostname, url.port or 80, duration)))
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_step(devices, server_url, duration, pid, processes):
+    serials = [f"sim-{i:05d}" for i in range(devices)]
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=worker, args=(serials[i::processes], server_url, duration, results))
+        for i in range(processes)
+    ]
+    for p in procs:
+        p.start()
+
+    cpu = None
+    if pid:
+        time.sleep(WARMUP)
+        before = server_cpu_seconds(pid)
+        time.sleep(duration)
+        cpu = (server_cpu_seconds(pid) - before) / duration
+
+    merged = {endpoint: ([], 0) for endpoint in ENDPOINTS}
+    for _ in procs:
+        for endpoint, (latencies, errors) in results.get().items():
+            merged[endpoint] = (merged[endpoint][0] + latencies, merged[endpoint][1] + errors)
+    for p in procs:
+        p.join()
+    return merged, cpu
+
+
+def report(devices, merged, cpu, duration):
+    """단계 결과 출력. (포화 여부, 1코어당 디바이스 수) 반환"""
+    total = sum(len(latencies) + errors for latencies, errors in merged.values())
+    errors = sum(errors for _, errors in merged.values())
+    rate = total / duration
+    expected = devices * EXPECTED_RATE
+    led_p99 = percentile(merged["led"][0], 0.99)
+
+    line = f"디바이스 {devices:>6,}대: {rate:8,.1f} req/s (기대 {expected:8,.1f}), 오류 {errors}"
+    per_core = None
+    if cpu is not None:
+        per_core = devices / cpu if cpu > 0 else float("inf")
+        line += f", 서버 CPU {cpu:.0%}"
+    print(line)
+    for endpoint in ENDPOINTS:
+        latencies, _ = merged[endpoint]
+        print(
+            f"    {endpoint:<12} {len(latencies) / duration:8,.1f} req/s  "
+            f"p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+            f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  "
+            f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+        )
+
+    saturated = (
+        rate < expected * MIN_RATE_RATIO
+        or errors > total * MAX_ERROR_RATIO
+        or not led_p99 <= MAX_LED_P99
+    )
+    if saturated:
+        print("    -> 포화")
+    return saturated, per_core
+
+
+def main():
+    max_devices = int(sys.argv[1]) if len(sys.argv) > 1 else 3200
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    server_url = sys.argv[3] if len(sys.argv) > 3 else "http://localhost:8000"
+    pid = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    processes = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+
+    steps = []
+    devices = START_DEVICES
+    while devices < max_devices:
+        steps.append(devices)
+        devices *= 2
+    steps.append(max_devices)
+
+    print("=" * 50)
+    print(
+        f"디바이스당 LED {LED_INTERVAL:.0f}초, LCD {LCD_INTERVAL:.0f}초, 업로드 {UPLOAD_INTERVAL:.0f}초 "
+        f"(기대 {EXPECTED_RATE:.3f} req/s), 단계당 {duration:.0f}초, 시뮬레이터 프로세스 {processes}개"
+    )
+    print("-" * 50)
+    sustained = None
+    saturated_at = None
+    for devices in steps:
+        merged, cpu = run_step(devices, server_url, duration, pid, processes)
+        saturated, per_core = report(devices, merged, cpu, duration)
+        if saturated:
+            saturated_at = devices
+            break
+        sustained = (devices, per_core)
+
+    # 버틴 단계와 포화된 단계 사이를 이분 탐색으로 좁힘
+    for _ in range(REFINE_STEPS if sustained is not None and saturated_at is not None else 0):
+        devices = (sustained[0] + saturated_at) // 2
+        merged, cpu = run_step(devices, server_url, duration, pid, processes)
+        saturated, per_core = report(devices, merged, cpu, duration)
+        if saturated:
+            saturated_at = devices
+        else:
+            sustained = (devices, per_core)
+
+    print("-" * 50)
+    if sustained is None:
+        print(f"포화 지점: {steps[0]}대 미만")
+    else:
+        devices, per_core = sustained
+        if saturated_at is None:
+            print(f"{devices:,}대까지 포화 없음 (max_devices를 늘려서 다시 측정)")
+        else:
+            print(f"포화 지점: {devices:,}대 ~ {saturated_at:,}대 사이")
+        if per_core is not None:
+            print(f"버틴 단계 기준 서버 CPU 1코어당 디바이스: {per_core:,.0f}대")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
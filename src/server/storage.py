@@ -0,0 +1,339 @@
+"""
+센서 데이터 시계열 저장소 (SQLite)
+
+스키마:
+- readings_YYYYMM: 원본 reading. 월 단위 파티션 테이블이라 인덱스가 작게 유지되고,
+  오래된 원본은 DROP TABLE 한 번으로 정리할 수 있다.
+- rollup_1m / rollup_1h: (serial, bucket)별 count / min / max / sum.
+  insert 시 같은 트랜잭션에서 UPSERT로 계속 갱신되므로 조회 시 재계산이 필요 없다.
+
+- blocks: compact()로 오래된 원본을 (serial, UTC 날짜)별 Gorilla 압축 block으로 옮긴 것.
+  원본 조회 시 파티션 테이블과 함께 읽어서 합친다.
+
+조회는 step에 맞는 가장 거친 tier(1h -> 1m -> raw)를 골라 GROUP BY로 다시 묶는다.
+한 달치 30초 데이터(약 86,400건)를 1시간 step으로 보면 rollup_1h 720행만 읽는다.
+"""
+
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from gorilla import decode_block, encode_block, to_float
+
+# (tier 이름, bucket 크기(초), 테이블) - 거친 tier부터
+ROLLUP_TIERS = (("1h", 3600, "rollup_1h"), ("1m", 60, "rollup_1m"))
+
+# insert()에서 reading 자체가 잘못돼서 나는 오류 (다시 넣어도 같은 결과).
+# 그 밖의 오류(database is locked 등)는 일시 오류로 보고 write-behind 버퍼가 다시 시도
+DATA_ERRORS = (
+    KeyError,
+    TypeError,
+    ValueError,
+    sqlite3.IntegrityError,
+    sqlite3.InterfaceError,
+    sqlite3.DataError,
+)
+
+# 압축 block 하나에 담는 구간 (초)
+BLOCK_SPAN = 86400
+
+
+def _partition_name(ts: float) -> str:
+    month = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m")
+    return f"readings_{month}"
+
+
+class SensorStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._partitions = set()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for _, _, table in ROLLUP_TIERS:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    serial TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    t_min REAL, t_max REAL, t_sum REAL,
+                    h_min REAL, h_max REAL, h_sum REAL,
+                    PRIMARY KEY (serial, bucket)
+                ) WITHOUT ROWID
+                """
+            )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blocks (
+                serial TEXT NOT NULL,
+                start REAL NOT NULL,
+                end REAL NOT NULL,
+                count INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS blocks_serial_start ON blocks (serial, start)")
+        self._refresh_partitions(conn)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 연결 (WAL 모드라 읽기는 쓰기와 동시에 가능)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _refresh_partitions(self, conn: sqlite3.Connection):
+        """다른 프로세스(uvicorn worker)가 만들거나 compact로 지운 파티션을 반영하도록 목록을 다시 읽음"""
+        rows = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'readings_%'"
+        )
+        self._partitions = {name for (name,) in rows}
+
+    def _ensure_partition(self, conn: sqlite3.Connection, name: str):
+        if name in self._partitions:
+            return
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {name} (
+                serial TEXT NOT NULL,
+                ts REAL NOT NULL,
+                temperature REAL NOT NULL,
+                humidity REAL NOT NULL,
+                illuminance TEXT
+            )
+            """
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_serial_ts ON {name} (serial, ts)")
+        self._partitions.add(name)
+
+    def insert(self, readings: list):
+        """reading 목록을 원본 파티션에 넣고 rollup을 같은 트랜잭션에서 갱신"""
+        if not readings:
+            return
+
+        by_partition = defaultdict(list)
+        # (tier table, serial, bucket) -> [count, t_min, t_max, t_sum, h_min, h_max, h_sum]
+        rollups = {}
+        for r in readings:
+            ts, t, h = r["timestamp"], r["temperature"], r["humidity"]
+            by_partition[_partition_name(ts)].append(
+                (r["serial"], ts, t, h, r.get("illuminance"))
+            )
+            for _, size, table in ROLLUP_TIERS:
+                key = (table, r["serial"], int(ts // size) * size)
+                agg = rollups.get(key)
+                if agg is None:
+                    rollups[key] = [1, t, t, t, h, h, h]
+                else:
+                    agg[0] += 1
+                    agg[1] = min(agg[1], t)
+                    agg[2] = max(agg[2], t)
+                    agg[3] += t
+                    agg[4] = min(agg[4], h)
+                    agg[5] = max(agg[5], h)
+                    agg[6] += h
+
+        by_table = defaultdict(list)
+        for (table, serial, bucket), agg in rollups.items():
+            by_table[table].append((serial, bucket, *agg))
+
+        conn = self._connect()
+        with self._write_lock, conn:
+            for name, rows in by_partition.items():
+                self._ensure_partition(conn, name)
+                try:
+                    conn.executemany(f"INSERT INTO {name} VALUES (?, ?, ?, ?, ?)", rows)
+                except sqlite3.OperationalError as e:
+                    if "no such table" not in str(e):
+                        raise
+                    # 다른 프로세스의 compact()가 비워서 지운 파티션: 다시 만들고 넣음
+                    self._partitions.discard(name)
+                    self._ensure_partition(conn, name)
+                    conn.executemany(f"INSERT INTO {name} VALUES (?, ?, ?, ?, ?)", rows)
+            for table, rows in by_table.items():
+                conn.executemany(
+                    f"""
+                    INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (serial, bucket) DO UPDATE SET
+                        count = count + excluded.count,
+                        t_min = min(t_min, excluded.t_min),
+                        t_max = max(t_max, excluded.t_max),
+                        t_sum = t_sum + excluded.t_sum,
+                        h_min = min(h_min, excluded.h_min),
+                        h_max = max(h_max, excluded.h_max),
+                        h_sum = h_sum + excluded.h_sum
+                    """,
+                    rows,
+                )
+
+    def _raw_partitions(self, start: float, end: float) -> list:
+        """[start, end) 구간과 겹치는 월 파티션 목록"""
+        names = []
+        month = datetime.fromtimestamp(start, tz=timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0
+        )
+        while month.timestamp() < end:
+            name = f"readings_{month.strftime('%Y%m')}"
+            if name in self._partitions:
+                names.append(name)
+            month = month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+        return names
+
+    def query(self, serial: str, start: float, end: float, step: int) -> tuple:
+        """
+        [start, end) 구간을 step초 bucket으로 묶어 min/avg/max 반환
+
+        Returns:
+            tuple: (사용한 tier 이름, points list)
+        """
+        for tier, size, table in ROLLUP_TIERS:
+            if step % size == 0:
+                sql = f"""
+                    SELECT (bucket / :step) * :step AS t, SUM(count),
+                           MIN(t_min), MAX(t_max), SUM(t_sum),
+                           MIN(h_min), MAX(h_max), SUM(h_sum)
+                    FROM {table}
+                    WHERE serial = :serial AND bucket >= :start AND bucket < :end
+                    GROUP BY t ORDER BY t
+                """
+                # rollup bucket 경계에 맞춰 조회 범위를 넓힘
+                params = {
+                    "serial": serial,
+                    "step": step,
+                    "start": int(start // size) * size,
+                    "end": end,
+                }
+                break
+        else:
+            return "raw", self._query_raw(serial, start, end, step)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return tier, [_point(*row) for row in rows]
+
+    def _query_raw(self, serial: str, start: float, end: float, step: int) -> list:
+        """파티션 테이블(SQL 집계)과 압축 block(디코딩 후 집계)을 bucket별로 합침"""
+        conn = self._connect()
+        self._refresh_partitions(conn)
+        params = {"serial": serial, "step": step, "start": start, "end": end}
+
+        # t -> [count, t_min, t_max, t_sum, h_min, h_max, h_sum]
+        buckets = {}
+        partitions = self._raw_partitions(start, end)
+        if partitions:
+            union = " UNION ALL ".join(
+                f"SELECT ts, temperature, humidity FROM {name} "
+                "WHERE serial = :serial AND ts >= :start AND ts < :end"
+                for name in partitions
+            )
+            sql = f"""
+                SELECT CAST(ts / :step AS INTEGER) * :step AS t, COUNT(*),
+                       MIN(temperature), MAX(temperature), SUM(temperature),
+                       MIN(humidity), MAX(humidity), SUM(humidity)
+                FROM ({union})
+                GROUP BY t
+            """
+            for t, *agg in conn.execute(sql, params):
+                buckets[t] = agg
+
+        blocks = conn.execute(
+            "SELECT data FROM blocks WHERE serial = :serial AND start < :end AND end >= :start",
+            params,
+        )
+        for (data,) in blocks:
+            timestamps, (temps, hums, _) = decode_block(data)
+            for ts, temp, hum in zip(timestamps, temps, hums):
+                if not start <= ts < end:
+                    continue
+                key = int(ts // step) * step
+                agg = [1, temp, temp, temp, hum, hum, hum]
+                if key in buckets:
+                    _merge_agg(buckets[key], agg)
+                else:
+                    buckets[key] = agg
+
+        return [_point(t, *buckets[t]) for t in sorted(buckets)]
+
+    def compact(self, before: float) -> int:
+        """
+        before 이전의 원본 reading을 (serial, UTC 날짜)별 Gorilla block으로 옮기고 원본은 삭제
+
+        달 전체가 before 이전인 파티션은 DROP TABLE로 정리한다. rollup은 그대로 유지.
+
+        Returns:
+            int: 압축한 reading 수
+        """
+        conn = self._connect()
+        compacted = 0
+        with self._write_lock, conn:
+            self._refresh_partitions(conn)
+            for name in sorted(self._partitions):
+                rows = conn.execute(
+                    f"SELECT serial, ts, temperature, humidity, illuminance FROM {name} "
+                    "WHERE ts < ? ORDER BY serial, ts",
+                    (before,),
+                ).fetchall()
+                if not rows:
+                    continue
+
+                groups = defaultdict(list)
+                for row in rows:
+                    groups[(row[0], int(row[1] // BLOCK_SPAN))].append(row)
+                conn.executemany(
+                    "INSERT INTO blocks VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            serial,
+                            group[0][1],
+                            group[-1][1],
+                            len(group),
+                            encode_block(
+                                [r[1] for r in group],
+                                [
+                                    [r[2] for r in group],
+                                    [r[3] for r in group],
+                                    [to_float(r[4]) for r in group],
+                                ],
+                            ),
+                        )
+                        for (serial, _), group in groups.items()
+                    ],
+                )
+                conn.execute(f"DELETE FROM {name} WHERE ts < ?", (before,))
+                if conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] == 0:
+                    conn.execute(f"DROP TABLE {name}")
+                    self._partitions.discard(name)
+                compacted += len(rows)
+        return compacted
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _merge_agg(agg: list, other: list):
+    agg[0] += other[0]
+    agg[1] = min(agg[1], other[1])
+    agg[2] = max(agg[2], other[2])
+    agg[3] += other[3]
+    agg[4] = min(agg[4], other[4])
+    agg[5] = max(agg[5], other[5])
+    agg[6] += other[6]
+
+
+def _point(t, count, t_min, t_max, t_sum, h_min, h_max, h_sum) -> dict:
+    return {
+        "t": t,
+        "count": count,
+        "temperature": {"min": t_min, "avg": round(t_sum / count, 3), "max": t_max},
+        "humidity": {"min": h_min, "avg": round(h_sum / count, 3), "max": h_max},
+    }
@@ -5,6 +5,7 @@
 import requests
 import time
 import random
+from urllib.parse import quote
 
 SERVER_URL = "http://localhost:8000"
 
@@ -22,22 +23,35 @@ def test_health_check():
         return False
 
 
-def test_sensor_data(temperature=None, humidity=None, device_id="test-device"):
-    """센서 데이터 전송 테스트"""
+def sensor_payload(serial, temperature=None, humidity=None, illuminance="0"):
+    """
+    펌웨어(SensorManager::uploadSensorData)와 같은 POST /sensor_data form 필드
+    값은 소수 둘째 자리 문자열로 보냄 (String(value, 2))
+    """
     if temperature is None:
-        temperature = round(random.uniform(20.0, 30.0), 2)
+        temperature = random.uniform(20.0, 30.0)
     if humidity is None:
-        humidity = round(random.uniform(40.0, 80.0), 2)
-    
-    data = {
-        "temperature": temperature,
-        "humidity": humidity,
-        "device_id": device_id
+        humidity = random.uniform(40.0, 80.0)
+    return {
+        "serial": serial,
+        "temperature": f"{temperature:.2f}",
+        "humidity": f"{humidity:.2f}",
+        "illuminance": illuminance,
     }
-    
+
+
+def poll_path(serial, kind):
+    """펌웨어가 polling하는 경로 (kind: "led" 1초마다, "lcd" 2초마다)"""
+    return f"/devices/{quote(serial, safe='')}/{kind}"
+
+
+def test_sensor_data(temperature=None, humidity=None, serial="test-device"):
+    """센서 데이터 전송 테스트"""
+    data = sensor_payload(serial, temperature, humidity)
+
     print(f"\nSending sensor data: {data}")
     try:
-        response = requests.post(f"{SERVER_URL}/sensor/data", json=data)
+        response = requests.post(f"{SERVER_URL}/sensor_data", data=data)
         print(f"Status: {response.status_code}")
         print(f"Response: {response.json()}")
         return response.status_code == 200
@@ -46,6 +60,20 @@ def test_sensor_data(temperature=None, humidity=None, device_id="test-device"):
         return False
 
 
+def test_poll(serial="test-device"):
+    """LED / LCD 상태 polling 테스트"""
+    ok = True
+    for kind in ("led", "lcd"):
+        try:
+            response = requests.get(f"{SERVER_URL}{poll_path(serial, kind)}")
+            print(f"GET /{kind}: {response.status_code} {response.json()}")
+            ok = ok and response.status_code == 200
+        except Exception as e:
+            print(f"Error: {e}")
+            ok = False
+    return ok
+
+
 def main():
     print("=" * 50)
     print("Citonphyde Sensor Server Test Client")
@@ -63,13 +91,14 @@ def main():
     print("\n" + "=" * 50)
     print("Testing single sensor data transmission...")
     test_sensor_data(25.5, 60.0, "ESP32-S3-001")
+    test_poll("ESP32-S3-001")
     
     # 여러 번 데이터 전송 (시뮬레이션)
     print("\n" + "=" * 50)
     print("Simulating multiple sensor readings...")
     for i in range(5):
         print(f"\n--- Reading {i+1}/5 ---")
-        test_sensor_data(device_id=f"ESP32-S3-{i+1:03d}")
+        test_sensor_data(serial=f"ESP32-S3-{i+1:03d}")
         time.sleep(1)
     
     print("\n" + "=" * 50)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+HTTP PATCH -> TCP 디바이스 state_update push 지연 측정 스크립트
+사용법: python bench_state_push.py [count] [http_url] [tcp_host] [tcp_port]
+예시: python bench_state_push.py 200
+
+먼저 broker와 두 서버를 같은 STATE_STORE_URL로 띄워 둔다:
+    python src/common/statebroker.py
+    STATE_STORE_URL=tcp://127.0.0.1:9100 python src/server/main.py
+    STATE_STORE_URL=tcp://127.0.0.1:9100 python src/server_tcp/main.py
+
+TCP로 hello를 보낸 디바이스 하나를 흉내 내고, HTTP 서버에 PATCH(led_face)를
+count번 보낸다. 매번 고유한 face 토큰을 쓰고, 디바이스 쪽 수신 스레드가
+같은 토큰의 state_update를 받은 시각과 PATCH 전송 시각의 차이를 잰다.
+"""
+
+import json
+import socket
+import sys
+import threading
+import time
+
+import requests
+
+SERIAL = "bench-push-0001"
+PUSH_TIMEOUT = 5.0  # seconds
+
+# face 토큰 -> state_update 수신 시각
+received = {}
+received_cond = threading.Condition()
+
+
+def device_reader(sock: socket.socket):
+    """서버가 보내는 메시지를 읽어 state_update 수신 시각을 기록하고 ping에 응답"""
+    buf = b""
+    while True:
+        try:
+            chunk = sock.recv(4096)
+        except OSError:
+            return
+        if not chunk:
+            return
+        buf += chunk
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            now = time.perf_counter()
+            msg = json.loads(line)
+            if msg.get("type") == "state_update" and "face" in msg:
+                with received_cond:
+                    received[msg["face"]] = now
+                    received_cond.notify_all()
+            elif msg.get("type") == "ping":
+                sock.sendall(b'{"type":"pong"}\n')
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    http_url = sys.argv[2] if len(sys.argv) > 2 else "http://localhost:8000"
+    tcp_host = sys.argv[3] if len(sys.argv) > 3 else "localhost"
+    tcp_port = int(sys.argv[4]) if len(sys.argv) > 4 else 9000
+
+    sock = socket.create_connection((tcp_host, tcp_port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.sendall(json.dumps({"type": "hello", "serial": SERIAL}).encode() + b"\n")
+    threading.Thread(target=device_reader, args=(sock,), daemon=True).start()
+    time.sleep(0.5)
+
+    session = requests.Session()
+    latencies = []
+    patch_rtts = []
+    missed = 0
+
+    for i in range(count):
+        token = f"BENCH{i:05d}"
+        sent_at = time.perf_counter()
+        response = session.patch(f"{http_url}/devices/{SERIAL}", data={"led_face": token})
+        patch_rtts.append(time.perf_counter() - sent_at)
+        response.raise_for_status()
+
+        with received_cond:
+            if not received_cond.wait_for(lambda: token in received, PUSH_TIMEOUT):
+                missed += 1
+                continue
+            latencies.append(received[token] - sent_at)
+
+    sock.close()
+
+    print("=" * 50)
+    print(f"PATCH {count}회  push 수신 {len(latencies)}회  누락 {missed}회")
+    if latencies:
+        print(
+            "PATCH -> state_update (ms): "
+            f"p50 {percentile(latencies, 50) * 1000:.2f}  "
+            f"p95 {percentile(latencies, 95) * 1000:.2f}  "
+            f"max {max(latencies) * 1000:.2f}"
+        )
+    print(
+        "PATCH 응답 (ms): "
+        f"p50 {percentile(patch_rtts, 50) * 1000:.2f}  "
+        f"p95 {percentile(patch_rtts, 95) * 1000:.2f}"
+    )
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Fleet simulator - 여러 TCP 디바이스를 흉내 내서 server_tcp에 부하를 건다.
+
+각 가상 디바이스는 hello -> hello_ack 후 업로드 주기마다 sensor_data를 보내고,
+ping에는 pong으로 답하며, config_update를 받으면 업로드 주기를 바꾼다
+(--fixed 이면 무시하고 30초 고정 = 기존 펌웨어 동작).
+
+환경 모델:
+  flat      실내 화분. 거의 변하지 않는 온습도 + 센서 노이즈
+  shifting  주기적으로 창문 열기/난방 같은 급변 이벤트 발생
+  mixed     디바이스마다 flat/shifting 중 하나 (기본값)
+
+시간 가속(--speed)을 쓰면 시뮬레이션 시간 1시간을 몇 분 안에 돌릴 수 있다.
+서버의 부하 측정은 실제 시간 기준이므로 가속하면 서버가 보는 메시지율도
+speed배가 된다 (과부하 시 주기 늘리기 동작을 보려면 --speed를 키우면 됨).
+
+사용:
+  python fleet_sim.py --devices 200 --duration 3600 --speed 60
+  python fleet_sim.py --devices 200 --duration 3600 --speed 60 --fixed
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+DEFAULT_INTERVAL_MS = 30000
+
+
+class Environment:
+    """Synthetic temperature/humidity source for one plant pot."""
+
+    def __init__(self, profile: str, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.base_temp = rng.uniform(21.0, 25.0)
+        self.base_hum = rng.uniform(45.0, 60.0)
+        self.event_until = -1.0
+        self.event_temp = 0.0
+        self.event_hum = 0.0
+        self.last_t = 0.0
+
+    def sample(self, sim_t: float) -> tuple[float, float]:
+        dt, self.last_t = sim_t - self.last_t, sim_t
+        if self.profile == "shifting":
+            # 평균 20분마다 5~15분짜리 급변 이벤트
+            if sim_t > self.event_until and self.rng.random() < dt / 1200:
+                self.event_until = sim_t + self.rng.uniform(300, 900)
+                self.event_temp = self.rng.uniform(-4.0, 4.0)
+                self.event_hum = self.rng.uniform(-15.0, 15.0)
+        in_event = sim_t <= self.event_until
+        temp = self.base_temp + (self.event_temp if in_event else 0.0)
+        hum = self.base_hum + (self.event_hum if in_event else 0.0)
+        if in_event:
+            # 이벤트 중에는 값이 계속 흔들림
+            temp += self.rng.gauss(0, 0.8)
+            hum += self.rng.gauss(0, 3.0)
+        return (
+            round(temp + self.rng.gauss(0, 0.03), 2),
+            round(hum + self.rng.gauss(0, 0.15), 2),
+        )
+
+
+class SimDevice:
+    def __init__(self, serial: str, env: Environment, fixed: bool):
+        self.serial = serial
+        self.env = env
+        self.fixed = fixed
+        self.interval_ms = DEFAULT_INTERVAL_MS
+        self.interval_changed = asyncio.Event()
+        self.sent = 0
+        self.config_updates = 0
+
+    def apply_interval(self, interval_ms):
+        if self.fixed or not isinstance(interval_ms, int) or interval_ms <= 0:
+            return
+        if interval_ms != self.interval_ms:
+            self.interval_ms = interval_ms
+            self.interval_changed.set()
+
+    async def reader_loop(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            msg_type = msg.get("type")
+            if msg_type == "ping":
+                writer.write(b'{"type":"pong"}\n')
+            elif msg_type in ("hello_ack", "config_update"):
+                if msg_type == "config_update":
+                    self.config_updates += 1
+                self.apply_interval(msg.get("upload_interval_ms"))
+
+    async def run(self, host: str, port: int, sim_clock, sim_end: float, speed: float):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write((json.dumps({"type": "hello", "serial": self.serial}) + "\n").encode())
+        await writer.drain()
+        read_task = asyncio.create_task(self.reader_loop(reader, writer))
+
+        # 부팅 시각을 흩뿌려서 모든 디바이스가 동시에 업로드하지 않게 함
+        next_upload = sim_clock() + random.uniform(0, DEFAULT_INTERVAL_MS / 1000)
+        try:
+            while sim_clock() < sim_end:
+                wait = (next_upload - sim_clock()) / speed
+                if wait > 0:
+                    self.interval_changed.clear()
+                    try:
+                        # config_update가 오면 펌웨어처럼 타이머를 새 주기로 재시작
+                        await asyncio.wait_for(self.interval_changed.wait(), wait)
+                        next_upload = sim_clock() + self.interval_ms / 1000
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+                if sim_clock() >= sim_end:
+                    break
+                temp, hum = self.env.sample(sim_clock())
+                msg = {
+                    "type": "sensor_data",
+                    "serial": self.serial,
+                    "temperature": temp,
+                    "humidity": hum,
+                    "illuminance": 0,
+                }
+                writer.write((json.dumps(msg, separators=(",", ":")) + "\n").encode())
+                await writer.drain()
+                self.sent += 1
+                next_upload += self.interval_ms / 1000
+        finally:
+            read_task.cancel()
+            writer.close()
+
+
+async def simulate(args):
+    rng = random.Random(args.seed)
+    start = time.monotonic()
+
+    def sim_clock() -> float:
+        return (time.monotonic() - start) * args.speed
+
+    devices: list[SimDevice] = []
+    for i in range(args.devices):
+        profile = args.profile
+        if profile == "mixed":
+            profile = "shifting" if rng.random() < args.shifting_ratio else "flat"
+        env = Environment(profile, random.Random(rng.random()))
+        devices.append(SimDevice(f"sim-{i:05d}", env, args.fixed))
+
+    await asyncio.gather(*(
+        d.run(args.host, args.port, sim_clock, args.duration, args.speed) for d in devices
+    ))
+
+    hours = args.duration / 3600
+    baseline = len(devices) * args.duration / (DEFAULT_INTERVAL_MS / 1000)
+    total = sum(d.sent for d in devices)
+
+    print("=" * 50)
+    print(f"Devices: {len(devices)}  simulated: {args.duration:.0f}s  speed: x{args.speed:g}")
+    print(f"Mode: {'fixed 30s' if args.fixed else 'adaptive (config_update)'}")
+    for profile in ("flat", "shifting"):
+        group = [d for d in devices if d.env.profile == profile]
+        if not group:
+            continue
+        sent = sum(d.sent for d in group)
+        intervals = sorted(d.interval_ms // 1000 for d in group)
+        print(
+            f"  {profile:<8} n={len(group):<5} msgs/device/h={sent / len(group) / hours:7.1f}"
+            f"  final interval p50={intervals[len(intervals) // 2]}s"
+            f" min={intervals[0]}s max={intervals[-1]}s"
+        )
+    print(f"Total sensor_data: {total} (fixed 30s baseline ~{baseline:.0f}, "
+          f"{total / baseline * 100 if baseline else 0:.1f}%)")
+    print(f"config_update received: {sum(d.config_updates for d in devices)}")
+    print("=" * 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="server_tcp fleet simulator")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=3600, help="simulated seconds")
+    parser.add_argument("--speed", type=float, default=60, help="simulated seconds per real second")
+    parser.add_argument("--profile", choices=("flat", "shifting", "mixed"), default="mixed")
+    parser.add_argument("--shifting-ratio", type=float, default=0.2)
+    parser.add_argument("--fixed", action="store_true", help="ignore config_update (legacy firmware)")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(simulate(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,33 +7,86 @@ ESP32 디바이스와 외부 제어 클라이언트를 위한 TCP 서버.
 
 import asyncio
 import json
-import logging
+import math
+import os
+import statistics
+import sys
+import time
+from collections import deque
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from common.deadband import DeadbandFilter
+from common.deviceindex import DEFAULT_LIMIT, DeviceIndex
+from common.eventlog import log_event, parse_sample_rates, setup_logging
+from common.latest import open_latest_readings
+from common.plantstatus import PlantStatusEvaluator, issue_codes, parse_species, status_face
+from common.statestore import open_state_store
+
 HOST = "0.0.0.0"
 PORT = 9000
 PING_INTERVAL = 30  # seconds
 PONG_TIMEOUT = 60  # seconds
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-log = logging.getLogger("server_tcp")
+# 센서 업로드 주기 (서버가 디바이스별로 추천해서 push)
+UPLOAD_INTERVAL_DEFAULT = 30  # seconds, 펌웨어 기본값과 동일
+UPLOAD_INTERVAL_MIN = 10  # seconds
+UPLOAD_INTERVAL_MAX = 300  # seconds
+INTERVAL_WINDOW = 10  # 변동성 계산에 쓰는 최근 샘플 수
+TEMP_STABLE_STDDEV = 0.2  # °C, 이 정도 흔들림이면 기본 주기 유지
+HUM_STABLE_STDDEV = 1.0  # %RH
+INTERVAL_CHANGE_RATIO = 0.2  # 현재 주기와 20% 이상 차이날 때만 config_update push
+SENSOR_RATE_TARGET = 200.0  # msgs/sec, 이 이상이면 전체적으로 주기를 늘림
+SENSOR_RATE_WINDOW = 10.0  # seconds
+
+# 센서 로그 deadband: 직전 기록값과 차이가 이 이내면 로그 없이 개수만 셈 (0이면 끔)
+SENSOR_DEADBAND_TEMP = float(os.environ.get("SENSOR_DEADBAND_TEMP", "0.1"))  # °C
+SENSOR_DEADBAND_HUM = float(os.environ.get("SENSOR_DEADBAND_HUM", "0.5"))  # %RH
+SENSOR_HEARTBEAT = float(os.environ.get("SENSOR_HEARTBEAT", "600"))  # seconds
+
+# 구조화 로그 (JSON lines + 콘솔). 쓰기는 백그라운드 스레드에서 처리
+# LOG_SAMPLE_RATES: event별 샘플링 비율 (예: "sensor_data=100" -> 100건 중 1건만 기록)
+LOG_PATH = os.environ.get("LOG_PATH", "logs/server_tcp.jsonl")
+LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", "sensor_data=100"))
+
+log = setup_logging("server_tcp", LOG_PATH, sample_rates=LOG_SAMPLE_RATES)
 
 # --- State ---
 
 # serial -> StreamWriter (접속 중인 디바이스)
 device_connections: dict[str, asyncio.StreamWriter] = {}
 
-# serial -> {"is_led_on": bool, "face": str}
-device_states: dict[str, dict] = {}
+# serial -> {"is_led_on": bool, "face": str, "version": int, ...}
+# STATE_STORE_URL=tcp://127.0.0.1:9100 이면 statebroker를 통해 HTTP 서버(src/server)와 공유
+STATE_STORE_URL = os.environ.get("STATE_STORE_URL", "")
+state_store = open_state_store(STATE_STORE_URL)
+
+# serial -> 마지막 센서 reading (get_sensor 응답용)
+# SENSOR_LATEST_URL=shm:// 이면 같은 호스트의 HTTP 서버와 공유
+SENSOR_LATEST_URL = os.environ.get("SENSOR_LATEST_URL", "")
+
+# 식물 상태 (reading마다 판단, HTTP 서버와 같은 설정)
+# PLANT_STATUS_FACE=1 이면 상태가 바뀔 때 LCD 표정을 바꿔서 state_update로 push
+PLANT_SPECIES = os.environ.get("PLANT_SPECIES", "basil")
+PLANT_STATUS_FACE = os.environ.get("PLANT_STATUS_FACE", "0").lower() in ("1", "true", "yes")
+plant_status = PlantStatusEvaluator(*parse_species(PLANT_SPECIES))
+sensor_latest = open_latest_readings(SENSOR_LATEST_URL, evaluator=plant_status)
+
+# list_devices 조회용 인덱스 (마지막 메시지 시각, 마지막 센서 시각, LED/표정)
+# 디바이스는 PING_INTERVAL마다 pong을 보내므로 PONG_TIMEOUT 안에 메시지가 있으면 online
+DEVICE_ONLINE_WINDOW = float(os.environ.get("DEVICE_ONLINE_WINDOW", str(PONG_TIMEOUT)))  # seconds
+SENSOR_STALE_AFTER = float(os.environ.get("SENSOR_STALE_AFTER", "900"))  # seconds
+device_index = DeviceIndex()
 
 # serial -> last pong timestamp (monotonic)
 device_last_pong: dict[str, float] = {}
 
-DEFAULT_STATE = {"is_led_on": False, "face": "NEUTRAL"}
+# serial -> 최근 (temperature, humidity) 샘플
+device_readings: dict[str, deque[tuple[float, float]]] = {}
+
+# serial -> 현재 적용 중인 업로드 주기 (seconds)
+device_upload_interval: dict[str, int] = {}
 
 
 # --- Helpers ---
@@ -49,8 +102,93 @@ async def send_json(writer: asyncio.StreamWriter, data: dict) -> bool:
         return False
 
 
-def get_state(serial: str) -> dict:
-    return device_states.setdefault(serial, {**DEFAULT_STATE})
+def on_state_changed(serial: str, state: dict, changed: dict):
+    """상태 저장소 변경 콜백. HTTP PATCH 등 다른 프로세스의 변경도 여기로 들어옴"""
+    device_index.set_state(serial, state["is_led_on"], state["face"])
+    writer = device_connections.get(serial)
+    if writer is None or not changed:
+        return
+    # 콜백은 동기 호출이라 drain 없이 버퍼에 쓰기만 함 (메시지가 작고 순서가 보장됨)
+    try:
+        msg = json.dumps({"type": "state_update", **changed}, separators=(",", ":")) + "\n"
+        writer.write(msg.encode())
+    except (ConnectionError, OSError):
+        pass
+
+
+state_store.subscribe(on_state_changed)
+
+
+class RateMeter:
+    """Counts events in fixed windows and reports the last full window's rate."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self.window_start = 0.0
+        self.count = 0
+        self.rate = 0.0
+
+    def _roll(self, now: float):
+        elapsed = now - self.window_start
+        if elapsed >= self.window:
+            # 한 윈도우 이상 비어 있었으면 rate는 0에 가깝게 떨어짐
+            self.rate = self.count / elapsed if elapsed < 2 * self.window else 0.0
+            self.window_start = now
+            self.count = 0
+
+    def hit(self, now: float):
+        self._roll(now)
+        self.count += 1
+
+    def current(self, now: float) -> float:
+        self._roll(now)
+        return self.rate
+
+
+sensor_rate = RateMeter(SENSOR_RATE_WINDOW)
+sensor_deadband = DeadbandFilter(SENSOR_DEADBAND_TEMP, SENSOR_DEADBAND_HUM, SENSOR_HEARTBEAT)
+
+
+def recommend_upload_interval(serial: str, now: float) -> int:
+    """Recommended upload interval (seconds) from recent variance and global load.
+
+    변동성이 기준(TEMP/HUM_STABLE_STDDEV)과 같으면 기본 주기,
+    평탄하면 비례해서 길게, 급변하면 짧게. 서버 부하가 목표치를 넘으면
+    부하 비율만큼 모든 디바이스의 주기를 늘린다.
+    """
+    readings = device_readings.get(serial)
+    if not readings or len(readings) < 3:
+        interval = float(UPLOAD_INTERVAL_DEFAULT)
+    else:
+        temps = [r[0] for r in readings]
+        hums = [r[1] for r in readings]
+        variability = max(
+            statistics.pstdev(temps) / TEMP_STABLE_STDDEV,
+            statistics.pstdev(hums) / HUM_STABLE_STDDEV,
+        )
+        if variability <= 0:
+            interval = float(UPLOAD_INTERVAL_MAX)
+        else:
+            interval = UPLOAD_INTERVAL_DEFAULT / variability
+
+    load = sensor_rate.current(now) / SENSOR_RATE_TARGET
+    if load > 1.0:
+        interval *= load
+
+    return int(min(max(interval, UPLOAD_INTERVAL_MIN), UPLOAD_INTERVAL_MAX))
+
+
+def _is_reading(value) -> bool:
+    """True if value is a finite number (bool, NaN, Infinity excluded)."""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def get_upload_interval(serial: str) -> int:
+    return device_upload_interval.setdefault(serial, UPLOAD_INTERVAL_DEFAULT)
 
 
 # --- Message handlers ---
@@ -69,29 +207,67 @@ async def handle_hello(data: dict, writer: asyncio.StreamWriter) -> str | None:
 
     device_connections[serial] = writer
     device_last_pong[serial] = asyncio.get_event_loop().time()
+    device_index.seen(serial, time.time())
 
-    state = get_state(serial)
+    state = state_store.get(serial)
     await send_json(writer, {
         "type": "hello_ack",
         "is_led_on": state["is_led_on"],
         "face": state["face"],
+        "upload_interval_ms": get_upload_interval(serial) * 1000,
     })
     log.info("Device connected: %s", serial)
     return serial
 
 
-async def handle_sensor_data(data: dict, writer: asyncio.StreamWriter):
-    serial = data.get("serial", "?")
+async def handle_sensor_data(data: dict, writer: asyncio.StreamWriter, connection_serial: str | None):
+    # serial이 없으면 이 연결이 hello로 등록한 serial (둘 다 없으면 인덱스 / 캐시에 넣지 않음)
+    serial = data.get("serial", connection_serial)
+    if not serial or not isinstance(serial, str):
+        await send_json(writer, {"type": "error", "message": "missing serial"})
+        return
     temp = data.get("temperature")
     hum = data.get("humidity")
     illu = data.get("illuminance", 0)
 
-    log.info(
-        "Sensor [%s] temp=%.2f hum=%.2f illu=%s",
-        serial, temp or 0, hum or 0, illu,
-    )
     await send_json(writer, {"type": "ack"})
 
+    now = asyncio.get_event_loop().time()
+    sensor_rate.hit(now)
+    if not _is_reading(temp) or not _is_reading(hum):
+        # NaN / Infinity(json.loads가 받아 줌)가 들어가면 주기 추천의 pstdev가 예외를 냄
+        log_event(log, "sensor_data", serial=serial, temperature=temp, humidity=hum, illuminance=illu)
+        return
+
+    received_at = time.time()
+    device_index.sensor(serial, received_at)
+    try:
+        change = sensor_latest.update(serial, received_at, float(temp), float(hum), illu)
+    except (ValueError, RuntimeError):
+        change = None
+    if change is not None:
+        await handle_plant_status_change(serial, *change)
+
+    # 직전 기록값과 deadband 이내면 로그 없이 개수만 셈 (주기 추천에는 모든 샘플 사용)
+    if sensor_deadband.offer(serial, received_at, float(temp), float(hum)):
+        log_event(log, "sensor_data", serial=serial, temperature=temp, humidity=hum, illuminance=illu)
+
+    readings = device_readings.get(serial)
+    if readings is None:
+        readings = device_readings[serial] = deque(maxlen=INTERVAL_WINDOW)
+    readings.append((float(temp), float(hum)))
+
+    # 추천 주기가 현재 주기와 충분히 다를 때만 push (잦은 타이머 재설정 방지)
+    current = get_upload_interval(serial)
+    recommended = recommend_upload_interval(serial, now)
+    if abs(recommended - current) >= current * INTERVAL_CHANGE_RATIO:
+        device_upload_interval[serial] = recommended
+        log.info("config_update [%s] upload_interval %ds -> %ds", serial, current, recommended)
+        await send_json(writer, {
+            "type": "config_update",
+            "upload_interval_ms": recommended * 1000,
+        })
+
 
 async def handle_set_device(data: dict, writer: asyncio.StreamWriter):
     serial = data.get("serial")
@@ -99,19 +275,16 @@ async def handle_set_device(data: dict, writer: asyncio.StreamWriter):
         await send_json(writer, {"type": "error", "message": "missing serial"})
         return
 
-    state = get_state(serial)
     update: dict = {}
 
     if "is_led_on" in data:
         val = data["is_led_on"]
         if isinstance(val, str):
             val = val.lower() in ("true", "1", "on", "yes")
-        state["is_led_on"] = bool(val)
-        update["is_led_on"] = state["is_led_on"]
+        update["is_led_on"] = bool(val)
 
     if "face" in data:
-        state["face"] = str(data["face"]).upper()
-        update["face"] = state["face"]
+        update["face"] = str(data["face"]).upper()
 
     if not update:
         await send_json(writer, {"type": "error", "message": "no fields to update"})
@@ -119,17 +292,118 @@ async def handle_set_device(data: dict, writer: asyncio.StreamWriter):
 
     log.info("set_device [%s] %s", serial, update)
 
-    # 디바이스가 접속 중이면 push
-    dev_writer = device_connections.get(serial)
-    if dev_writer:
-        await send_json(dev_writer, {"type": "state_update", **update})
+    # 디바이스가 접속 중이면 변경 콜백(on_state_changed)에서 push
+    try:
+        await state_store.update(serial, update)
+    except (ConnectionError, RuntimeError) as e:
+        # RuntimeError: shm 상태 테이블이 가득 찼거나 slot이 계속 쓰는 중
+        await send_json(writer, {"type": "error", "message": f"state store unavailable: {e}"})
+        return
+    except ValueError as e:
+        await send_json(writer, {"type": "error", "message": str(e)})
+        return
 
     await send_json(writer, {"type": "ack"})
 
 
+async def handle_plant_status_change(serial: str, previous, issues: int):
+    status = plant_status.describe(serial, issues)
+    log_event(
+        log,
+        "plant_status",
+        f"[{serial}] 식물 상태 {status['status']} {status['codes']}",
+        serial=serial,
+        species=status["species"],
+        status=status["status"],
+        issues=status["codes"],
+        previous=issue_codes(previous) if previous is not None else None,
+    )
+    if PLANT_STATUS_FACE:
+        try:
+            await state_store.update(serial, {"face": status_face(issues)})
+        except (ConnectionError, ValueError, RuntimeError) as e:
+            log.warning("plant status face [%s] 실패: %s", serial, e)
+
+
+async def handle_get_sensor(data: dict, writer: asyncio.StreamWriter):
+    """마지막 센서 reading을 메모리에서 바로 응답 (DB 조회 없음)"""
+    serial = data.get("serial")
+    if not serial or not isinstance(serial, str):
+        await send_json(writer, {"type": "error", "message": "missing serial"})
+        return
+
+    reading = sensor_latest.get(serial)
+    if reading is None:
+        await send_json(writer, {"type": "error", "message": "no sensor data"})
+        return
+
+    await send_json(writer, {
+        "type": "sensor_latest",
+        "serial": serial,
+        "temperature": reading["temperature"],
+        "humidity": reading["humidity"],
+        "illuminance": reading["illuminance"],
+        "timestamp": reading["timestamp"],
+        "age": round(max(time.time() - reading["timestamp"], 0.0), 3),
+        "plant_status": plant_status.describe(serial, reading["issues"], reading["status_since"]),
+    })
+
+
 async def handle_pong(serial: str | None):
     if serial:
         device_last_pong[serial] = asyncio.get_event_loop().time()
+        device_index.seen(serial, time.time())
+
+
+async def handle_list_devices(data: dict, writer: asyncio.StreamWriter):
+    """
+    디바이스 목록 조회 (HTTP GET /devices와 같은 필터)
+
+    online, stale_sensor, is_led_on: true/false, face: 표정, cursor, limit (최대 1000)
+    """
+    filters = {}
+    for key in ("online", "stale_sensor", "is_led_on"):
+        value = data.get(key)
+        if value is not None and not isinstance(value, bool):
+            await send_json(writer, {"type": "error", "message": f"{key} must be true or false"})
+            return
+        filters[key] = value
+    face = data.get("face")
+    cursor = data.get("cursor")
+    limit = data.get("limit", DEFAULT_LIMIT)
+    stale_after = data.get("stale_after", SENSOR_STALE_AFTER)
+    if (
+        (face is not None and not isinstance(face, str))
+        or (cursor is not None and not isinstance(cursor, str))
+        or not isinstance(limit, int)
+        or limit < 1
+        or not isinstance(stale_after, (int, float))
+        or stale_after <= 0
+    ):
+        await send_json(writer, {"type": "error", "message": "invalid list_devices query"})
+        return
+
+    now = time.time()
+    serials, next_cursor = device_index.find(
+        now,
+        face=face,
+        cursor=cursor,
+        limit=limit,
+        online_window=DEVICE_ONLINE_WINDOW,
+        stale_after=stale_after,
+        **filters,
+    )
+    devices = []
+    for serial in serials:
+        device = device_index.describe(serial, now, DEVICE_ONLINE_WINDOW)
+        device["connected"] = serial in device_connections
+        devices.append(device)
+    await send_json(writer, {
+        "type": "device_list",
+        "devices": devices,
+        "next_cursor": next_cursor,
+        "total": len(device_index),
+    })
 
 
 # --- Connection handler ---
@@ -161,9 +435,13 @@ async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
             if msg_type == "hello":
                 serial = await handle_hello(data, writer)
             elif msg_type == "sensor_data":
-                await handle_sensor_data(data, writer)
+                await handle_sensor_data(data, writer, serial)
             elif msg_type == "set_device":
                 await handle_set_device(data, writer)
+            elif msg_type == "get_sensor":
+                await handle_get_sensor(data, writer)
+            elif msg_type == "list_devices":
+                await handle_list_devices(data, writer)
             elif msg_type == "pong":
                 await handle_pong(serial)
             else:
@@ -176,6 +454,8 @@ async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
         if serial and device_connections.get(serial) is writer:
             del device_connections[serial]
             device_last_pong.pop(serial, None)
+            device_readings.pop(serial, None)
+            sensor_deadband.forget(serial)
             log.info("Device disconnected: %s", serial)
         writer.close()
         log.info("Connection closed: %s", addr)
@@ -185,6 +465,7 @@ async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWrit
 
 async def ping_loop():
     """Periodically ping devices and drop unresponsive ones."""
+    last_received = 0
     while True:
         await asyncio.sleep(PING_INTERVAL)
         now = asyncio.get_event_loop().time()
@@ -201,13 +482,24 @@ async def ping_loop():
             log.warning("Device timeout, closing: %s", serial)
             writer = device_connections.pop(serial, None)
             device_last_pong.pop(serial, None)
+            device_readings.pop(serial, None)
+            sensor_deadband.forget(serial)
             if writer:
                 writer.close()
 
+        # deadband로 기록하지 않은 센서 메시지 수를 주기적으로 남김
+        stats = sensor_deadband.stats()
+        if stats["received"] != last_received:
+            last_received = stats["received"]
+            log_event(log, "sensor_ingest", **stats)
+
 
 # --- Main ---
 
 async def main():
+    await state_store.start()
+    for serial, state in state_store.items():
+        device_index.set_state(serial, state["is_led_on"], state["face"])
     server = await asyncio.start_server(handle_client, HOST, PORT)
     log.info("TCP server listening on %s:%d", HOST, PORT)
 
@@ -218,6 +510,7 @@ async def main():
             await server.serve_forever()
     finally:
         ping_task.cancel()
+        await state_store.stop()
 
 
 if __name__ == "__main__":